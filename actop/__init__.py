@@ -1,6 +1,7 @@
 import importlib.metadata
 
 from .api import AsyncMonitor, Monitor, Profiler
+from .energy import energy_stats, profile_energy
 from .models import CoreSample, SystemSnapshot
 
 try:
@@ -14,5 +15,7 @@ __all__ = [
     "AsyncMonitor",
     "SystemSnapshot",
     "CoreSample",
+    "profile_energy",
+    "energy_stats",
     "__version__",
 ]
@@ -1,7 +1,9 @@
 import argparse
+import math
 import re
 
 from actop import __version__
+from actop.pacing import MIN_INTERVAL_S
 
 
 def build_parser():
@@ -13,9 +15,11 @@ def build_parser():
     )
     parser.add_argument(
         "--interval",
-        type=int,
+        type=_validate_interval,
         default=2,
-        help="Display and sampling interval in seconds",
+        help="Display and sampling interval in seconds (fractional, >= {})".format(
+            MIN_INTERVAL_S
+        ),
     )
     parser.add_argument(
         "--avg", type=int, default=30, help="Interval for averaged values (seconds)"
@@ -26,6 +30,13 @@ def build_parser():
         default=1,
         help="Number of internal sampler deltas per interval (>=1)",
     )
+    parser.add_argument(
+        "--overrun",
+        choices=["skip", "catch-up"],
+        default="skip",
+        help="When a tick overruns its interval: skip the missed deadlines "
+        "(keep phase) or catch-up by sampling them back-to-back (keep count)",
+    )
     parser.add_argument(
         "--show_cores",
         action=argparse.BooleanOptionalAction,
@@ -100,6 +111,50 @@ def build_parser():
         default=False,
         help="Stream metrics as NDJSON to stdout instead of launching the TUI",
     )
+    parser.add_argument(
+        "--buffer-records",
+        type=_validate_record_count,
+        default=1024,
+        metavar="N",
+        help="With --json, queue up to N records for a slow consumer",
+    )
+    parser.add_argument(
+        "--flush-records",
+        type=_validate_record_count,
+        default=64,
+        metavar="N",
+        help="With --json, flush stdout after N buffered records",
+    )
+    parser.add_argument(
+        "--flush-ms",
+        type=_validate_flush_ms,
+        default=100,
+        metavar="MS",
+        help="With --json, flush stdout at most MS milliseconds after a "
+        "record is written (0 flushes every record)",
+    )
+    parser.add_argument(
+        "--backpressure",
+        choices=("drop-oldest", "block"),
+        default="drop-oldest",
+        help="With --json, when the buffer is full: drop the oldest record "
+        "(counted on stderr at exit) or wait for the consumer",
+    )
+    parser.add_argument(
+        "--format",
+        choices=("json", "binary"),
+        default="json",
+        help="Stream format: NDJSON, or a schema header followed by "
+        "fixed-layout binary records (read with actop.export.BinaryReader); "
+        "binary implies streaming to stdout",
+    )
+    parser.add_argument(
+        "--delta",
+        action="store_true",
+        default=False,
+        help="With --format binary, encode each record as the fields that "
+        "changed since the previous one",
+    )
     parser.add_argument(
         "--serve",
         type=_validate_port,
@@ -107,6 +162,34 @@ def build_parser():
         metavar="PORT",
         help="Serve Prometheus metrics on http://0.0.0.0:PORT/metrics (no TUI)",
     )
+    parser.add_argument(
+        "--async-http",
+        action="store_true",
+        default=False,
+        help="With --serve, use the asyncio server: keep-alive connections on "
+        "one thread, plus /snapshot, /healthz and a Server-Sent-Events /stream",
+    )
+    parser.add_argument(
+        "--openmetrics",
+        action="store_true",
+        default=False,
+        help="With --serve, answer scrapers that accept OpenMetrics with "
+        "energy counters, DVFS residency and sample exemplars",
+    )
+    parser.add_argument(
+        "--percentiles",
+        action="store_true",
+        default=False,
+        help="With --json/--serve, also publish session p50/p90/p99 of power, "
+        "utilization, bandwidth and temperature",
+    )
+    parser.add_argument(
+        "--alerts",
+        action="store_true",
+        default=False,
+        help="With --json/--serve, also publish the dashboard's active alerts "
+        "(thresholds from the --alert-* options)",
+    )
     return parser
 
 
@@ -166,6 +249,18 @@ def _validate_port(value):
     return port
 
 
+def _validate_interval(value):
+    try:
+        interval = float(value)
+    except (TypeError, ValueError) as error:
+        raise argparse.ArgumentTypeError("interval must be a number") from error
+    if not math.isfinite(interval) or interval < MIN_INTERVAL_S:
+        raise argparse.ArgumentTypeError(
+            "interval must be a finite number >= {}".format(MIN_INTERVAL_S)
+        )
+    return interval
+
+
 def _validate_subsamples(value):
     try:
         subsamples = int(value)
@@ -176,6 +271,26 @@ def _validate_subsamples(value):
     return subsamples
 
 
+def _validate_record_count(value):
+    try:
+        count = int(value)
+    except (TypeError, ValueError) as error:
+        raise argparse.ArgumentTypeError("record count must be an integer") from error
+    if count < 1:
+        raise argparse.ArgumentTypeError("record count must be >= 1")
+    return count
+
+
+def _validate_flush_ms(value):
+    try:
+        flush_ms = float(value)
+    except (TypeError, ValueError) as error:
+        raise argparse.ArgumentTypeError("flush interval must be a number") from error
+    if not math.isfinite(flush_ms) or flush_ms < 0:
+        raise argparse.ArgumentTypeError("flush interval must be a finite number >= 0")
+    return flush_ms
+
+
 def _run_dashboard(args, runtime_state):
     from actop.tui.app import ActopApp
 
@@ -183,17 +298,67 @@ def _run_dashboard(args, runtime_state):
     app.run()
 
 
+def _export_alerts(args):
+    """The dashboard's alert rules, for the exporters."""
+    from actop.alerts import dashboard_alerts
+    from actop.config import create_dashboard_config
+    from actop.utils import get_soc_info
+
+    return dashboard_alerts(create_dashboard_config(args, get_soc_info()))
+
+
 def _run_export(args):
     """Route to a non-TUI export backend. Returns an exit code."""
     from actop import export
 
-    interval_s = max(1, int(args.interval))
+    interval_s = float(args.interval)
     subsamples = max(1, int(args.subsamples))
     try:
-        if args.serve is not None:
-            export.serve_prometheus(args.serve, interval_s, subsamples)
+        overrun = getattr(args, "overrun", "skip")
+        percentiles = getattr(args, "percentiles", False)
+        alerts = _export_alerts(args) if getattr(args, "alerts", False) else None
+        openmetrics = getattr(args, "openmetrics", False)
+        if args.serve is not None and getattr(args, "async_http", False):
+            from actop.server import serve_async
+
+            serve_async(
+                args.serve,
+                interval_s,
+                subsamples,
+                overrun=overrun,
+                percentiles=percentiles,
+                alerts=alerts,
+                openmetrics=openmetrics,
+            )
+        elif args.serve is not None:
+            export.serve_prometheus(
+                args.serve,
+                interval_s,
+                subsamples,
+                overrun=overrun,
+                percentiles=percentiles,
+                alerts=alerts,
+                openmetrics=openmetrics,
+            )
+        elif getattr(args, "format", "json") == "binary":
+            export.run_binary_stream(
+                interval_s,
+                subsamples,
+                overrun=overrun,
+                delta=getattr(args, "delta", False),
+            )
         else:
-            export.run_json_stream(interval_s, subsamples)
+            export.run_json_stream(
+                interval_s,
+                subsamples,
+                overrun=overrun,
+                percentiles=percentiles,
+                alerts=alerts,
+                buffer=getattr(args, "buffer_records", 1024),
+                flush_every=getattr(args, "flush_records", 64),
+                flush_interval_s=getattr(args, "flush_ms", 100) / 1000.0,
+                backpressure=getattr(args, "backpressure", "drop-oldest"),
+            )
         return 0
     except KeyboardInterrupt:
         return 130
@@ -202,7 +367,11 @@ def _run_export(args):
 def main(args=None):
     if args is None:
         args = build_parser().parse_args()
-    if getattr(args, "json", False) or getattr(args, "serve", None) is not None:
+    if (
+        getattr(args, "json", False)
+        or getattr(args, "format", "json") == "binary"
+        or getattr(args, "serve", None) is not None
+    ):
         return _run_export(args)
     runtime_state = {"monitor": None, "cursor_hidden": False}
     try:
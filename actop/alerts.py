@@ -0,0 +1,370 @@
+"""Alert rules compiled into one evaluator over snapshots.
+
+An `AlertRule` compares a signal derived from one metric against a
+threshold. The signal is the metric's value, its change over the last
+`window` samples, or its mean over them; `sustain=N` requires the comparison
+to hold for N consecutive samples, and `clear` adds hysteresis (once firing,
+the rule stays active until the signal crosses back past `clear`). Metrics
+are numeric SystemSnapshot fields or named callables of the snapshot.
+
+`AlertEngine(rules)` compiles the rules once:
+
+- every metric is read once per snapshot, the plain fields with a single
+  attrgetter call;
+- each distinct (metric, kind, window) signal and each sustain window is
+  computed once, however many rules share it;
+- rules on the same signal and operator are sorted by threshold, so the
+  ones that fire are one bisection and a slice. Holding "value >= t for N
+  samples" for every t up to the window minimum is the same test, and a
+  hysteresis rule is active when it passes its threshold or, latched, its
+  clear level: two bisections and a set intersection per group.
+
+Evaluation therefore grows with the number of distinct signals and firing
+rules, not with the number of rules. Profiler.register_alert, the TUI status line and the exporters'
+alert output all run on it.
+"""
+
+from bisect import bisect_left, bisect_right
+from collections import deque
+from collections.abc import Callable
+from itertools import repeat
+from operator import attrgetter
+from typing import NamedTuple
+
+from .models import SystemSnapshot
+from .power_scaling import clamp_percent
+
+_OPS = (">=", ">", "<=", "<")
+_KINDS = ("value", "change", "mean")
+_NUMERIC_TYPES = (float, int, bool)
+
+
+class AlertRule(NamedTuple):
+    name: str
+    metric: str  # SystemSnapshot field or key of AlertEngine(metrics=...)
+    threshold: float
+    op: str = ">="  # one of >=, >, <=, <
+    kind: str = "value"  # value, change (over window samples), mean (of window)
+    window: int = 1  # samples spanned by a change / averaged by a mean
+    sustain: int = 1  # consecutive samples the comparison must hold
+    clear: float | None = None  # hysteresis: active until the signal passes this
+
+
+class _Signal:
+    """Per-sample signal of one metric: its value, change or windowed mean.
+
+    None while the window is filling or when the metric has no reading; a
+    missing reading restarts the window.
+    """
+
+    __slots__ = ("slot", "kind", "_window")
+
+    def __init__(self, slot, kind, window):
+        self.slot = slot
+        self.kind = kind
+        size = window + 1 if kind == "change" else window
+        self._window = deque(maxlen=size) if kind != "value" else None
+
+    def update(self, value):
+        if self._window is None:
+            return value
+        window = self._window
+        if value is None:
+            window.clear()
+            return None
+        window.append(value)
+        if len(window) < window.maxlen:
+            return None
+        if self.kind == "change":
+            return window[-1] - window[0]
+        return sum(window) / len(window)
+
+    def reset(self):
+        if self._window is not None:
+            self._window.clear()
+
+
+class _Sustain:
+    """The value a signal has held for N consecutive samples: the window
+    minimum for rising comparisons, the maximum for falling ones."""
+
+    __slots__ = ("source", "_window", "_reduce")
+
+    def __init__(self, source, sustain, rising):
+        self.source = source
+        self._window = deque(maxlen=sustain) if sustain > 1 else None
+        self._reduce = min if rising else max
+
+    def update(self, value):
+        window = self._window
+        if window is None:
+            return value
+        if value is None:
+            window.clear()
+            return None
+        window.append(value)
+        if len(window) < window.maxlen:
+            return None
+        return self._reduce(window)
+
+    def reset(self):
+        if self._window is not None:
+            self._window.clear()
+
+
+def _check(rule, known):
+    if rule.op not in _OPS:
+        raise ValueError("{}: op must be one of {}".format(rule.name, ", ".join(_OPS)))
+    if rule.kind not in _KINDS:
+        raise ValueError(
+            "{}: kind must be one of {}".format(rule.name, ", ".join(_KINDS))
+        )
+    if rule.window < 1 or rule.sustain < 1:
+        raise ValueError("{}: window and sustain must be >= 1".format(rule.name))
+    if rule.metric not in known:
+        field = SystemSnapshot.__dataclass_fields__.get(rule.metric)
+        if field is None:
+            raise ValueError("Unknown SystemSnapshot field: {!r}".format(rule.metric))
+        if field.type not in _NUMERIC_TYPES:
+            raise ValueError(
+                "Non-numeric SystemSnapshot field: {!r}".format(rule.metric)
+            )
+    if rule.clear is not None:
+        rising = rule.op in (">=", ">")
+        if (rising and rule.clear > rule.threshold) or (
+            not rising and rule.clear < rule.threshold
+        ):
+            raise ValueError(
+                "{}: clear must be on the far side of the threshold".format(rule.name)
+            )
+
+
+class AlertEngine:
+    """Compiled evaluator for a set of AlertRules.
+
+    `metrics` maps extra metric names to fn(snapshot) -> number or None (no
+    reading: the rule is inactive and its windows restart). Rule names need
+    not be unique; `active` is keyed by name.
+    """
+
+    def __init__(self, rules=(), metrics: dict[str, Callable] | None = None):
+        self.rules = tuple(rules)
+        self._metrics = dict(metrics or {})
+        for rule in self.rules:
+            _check(rule, self._metrics)
+        self._fired: list = []
+        self._compile()
+
+    @property
+    def active(self) -> dict:
+        """{rule name: signal value} for the rules active after the last
+        evaluate()."""
+        return {rule.name: value for rule, value in self._fired}
+
+    def _compile(self):
+        derived = sorted({r.metric for r in self.rules if r.metric in self._metrics})
+        fields = sorted({r.metric for r in self.rules} - set(derived))
+        slots = {name: n for n, name in enumerate(fields + derived)}
+        if len(fields) == 1:
+            single = attrgetter(fields[0])
+            self._read_fields = lambda snapshot: [single(snapshot)]
+        elif fields:
+            getter = attrgetter(*fields)
+            self._read_fields = lambda snapshot: list(getter(snapshot))
+        else:
+            self._read_fields = lambda snapshot: []
+        self._derived = tuple(self._metrics[name] for name in derived)
+
+        # Shared nodes, each keyed to its position in the evaluation order.
+        signals: dict = {}  # (metric, kind, window) -> index
+        sustains: dict = {}  # (signal key, sustain, rising) -> index
+        signal_nodes = []
+        sustain_nodes = []
+        groups: dict = {}
+        for rule in self.rules:
+            window = rule.window if rule.kind != "value" else 1
+            signal_key = (rule.metric, rule.kind, window)
+            if signal_key not in signals:
+                signals[signal_key] = len(signal_nodes)
+                signal_nodes.append(_Signal(slots[rule.metric], rule.kind, window))
+            rising = rule.op in (">=", ">")
+            sustain_key = (signal_key, rule.sustain, rising)
+            if sustain_key not in sustains:
+                sustains[sustain_key] = len(sustain_nodes)
+                sustain_nodes.append(
+                    _Sustain(signals[signal_key], rule.sustain, rising)
+                )
+            source = sustains[sustain_key]
+            groups.setdefault((source, rule.op, rule.clear is not None), []).append(
+                rule
+            )
+        self._signals = tuple(signal_nodes)
+        self._sustains = tuple(sustain_nodes)
+        plain = []
+        hysteresis = []
+        for (source, op, latching), rules in groups.items():
+            rules.sort(key=lambda r: r.threshold)
+            thresholds = [r.threshold for r in rules]
+            if not latching:
+                plain.append((source, op, thresholds, rules))
+                continue
+            # Positions (in threshold order) sorted by clear level.
+            by_clear = sorted(range(len(rules)), key=lambda n: rules[n].clear)
+            clears = [rules[n].clear for n in by_clear]
+            hysteresis.append((source, op, thresholds, rules, clears, by_clear))
+        self._groups = tuple(plain)
+        self._hysteresis = tuple(hysteresis)
+        self._latched = [set() for _ in hysteresis]
+
+    def reset(self):
+        """Forget every window, sustain count and latched hysteresis rule."""
+        for node in self._signals + self._sustains:
+            node.reset()
+        self._latched = [set() for _ in self._hysteresis]
+        self._fired = []
+
+    def evaluate(self, snapshot) -> list:
+        """Feed one snapshot; return [(rule, signal value)] for the rules
+        active after it."""
+        values = self._read_fields(snapshot)
+        for fn in self._derived:
+            values.append(fn(snapshot))
+        signals = [node.update(values[node.slot]) for node in self._signals]
+        held = [node.update(signals[node.source]) for node in self._sustains]
+
+        fired = []
+        for source, op, thresholds, rules in self._groups:
+            value = held[source]
+            if value is not None:
+                fired.extend(zip(rules[_passing(op, thresholds, value)], repeat(value)))
+
+        for n, (source, op, thresholds, rules, clears, by_clear) in enumerate(
+            self._hysteresis
+        ):
+            value = held[source]
+            if value is None:
+                self._latched[n] = set()
+                continue
+            # Active: past the threshold now, or latched and not yet back
+            # past the clear level.
+            on = set(range(len(rules))[_passing(op, thresholds, value)])
+            on |= self._latched[n].intersection(by_clear[_passing(op, clears, value)])
+            self._latched[n] = on
+            fired.extend((rules[i], value) for i in sorted(on))
+
+        self._fired = fired
+        return fired
+
+
+def _passing(op, keys, value) -> slice:
+    """The slice of ascending `keys` for which `value op key` holds."""
+    if op == ">=":
+        return slice(0, bisect_right(keys, value))
+    if op == ">":
+        return slice(0, bisect_left(keys, value))
+    if op == "<=":
+        return slice(bisect_left(keys, value), None)
+    return slice(bisect_right(keys, value), None)
+
+
+# Throttle detection gates (heuristics). A cluster is only "throttling" when it is
+# working hard yet held below its DVFS ceiling while hot — an idle or power-capped
+# cluster at low freq is not throttling. The thermal-pressure signal is the primary
+# "hot" test; the die-temp gate is a fallback for machines whose SMC temps read 0.
+_THROTTLE_UTIL_GATE = 80.0  # percent: cluster must be at least this busy
+_THROTTLE_TEMP_C = 90.0  # °C: die-temp fallback when thermal_state stays Nominal
+
+
+def _domain_throttling(util, freq, max_freq, temp, thermal_state, cfg) -> bool:
+    """True when a silicon domain is busy + slow + hot (see gates above).
+
+    slow = current freq below `alert_throttle_freq_percent`% of the DVFS ceiling.
+    Returns False when the ceiling is unknown (max_freq <= 0) — the ratio is
+    uncomputable, so we cannot claim throttling.
+    """
+    if max_freq <= 0:
+        return False
+    busy = util >= _THROTTLE_UTIL_GATE
+    slow = freq < (cfg.alert_throttle_freq_percent / 100.0) * max_freq
+    hot = thermal_state not in ("Nominal", "Unknown") or temp >= _THROTTLE_TEMP_C
+    return busy and slow and hot
+
+
+def bandwidth_percent(snapshot, cfg) -> float:
+    """Memory bandwidth as a percent of summed CPU+GPU channel capacity.
+
+    Returns 0 when bandwidth is unavailable. Shared by the chart and the
+    saturation alert so both normalise against the same reference.
+    """
+    total_bw_ref = max(cfg.max_cpu_bw + cfg.max_gpu_bw, 1.0)
+    if not snapshot.bandwidth_available:
+        return 0
+    return clamp_percent(snapshot.bandwidth_gbps / total_bw_ref * 100)
+
+
+def package_power_percent(snapshot, cfg) -> float:
+    """Package power as a percent of the SoC reference rail.
+
+    Shared by the chart and the PKG alert so both normalise against the
+    same reference.
+    """
+    return clamp_percent(snapshot.package_watts / max(cfg.package_ref_w, 1.0) * 100)
+
+
+def dashboard_alerts(cfg) -> AlertEngine:
+    """The dashboard's alerts for a DashboardConfig: thermal, throttle_cpu,
+    throttle_gpu, bandwidth (saturation percent), swap (GB risen over the
+    sustain window) and package (percent of the reference rail)."""
+    sustain = cfg.alert_sustain_samples
+    metrics = {
+        "thermal_elevated": lambda s: float(
+            s.thermal_state not in ("Nominal", "Unknown")
+        ),
+        "cpu_throttling": lambda s: float(
+            _domain_throttling(
+                s.pcpu_util_pct,
+                s.pcpu_freq_mhz,
+                s.pcpu_max_freq_mhz,
+                s.cpu_temp_c,
+                s.thermal_state,
+                cfg,
+            )
+        ),
+        "gpu_throttling": lambda s: float(
+            _domain_throttling(
+                s.gpu_util_pct,
+                s.gpu_freq_mhz,
+                s.gpu_max_freq_mhz,
+                s.gpu_temp_c,
+                s.thermal_state,
+                cfg,
+            )
+        ),
+        # No reading while bandwidth is unavailable, which restarts the count.
+        "bandwidth_percent": lambda s: (
+            bandwidth_percent(s, cfg) if s.bandwidth_available else None
+        ),
+        "package_percent": lambda s: package_power_percent(s, cfg),
+        "swap_gb": lambda s: max(0.0, float(s.swap_used_gb or 0.0)),
+    }
+    rules = (
+        AlertRule("thermal", "thermal_elevated", 1.0),
+        AlertRule("throttle_cpu", "cpu_throttling", 1.0, sustain=sustain),
+        AlertRule("throttle_gpu", "gpu_throttling", 1.0, sustain=sustain),
+        AlertRule(
+            "bandwidth",
+            "bandwidth_percent",
+            cfg.alert_bw_sat_percent,
+            sustain=sustain,
+        ),
+        AlertRule(
+            "swap", "swap_gb", cfg.alert_swap_rise_gb, kind="change", window=sustain
+        ),
+        AlertRule(
+            "package",
+            "package_percent",
+            cfg.alert_package_power_percent,
+            sustain=sustain,
+        ),
+    )
+    return AlertEngine(rules, metrics)
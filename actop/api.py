@@ -1,61 +1,90 @@
 """Public Python API for actop hardware profiling."""
 
-import dataclasses
 import threading
 import time
+from contextlib import contextmanager
 
-from .models import _EMPTY_RESIDENCY, CoreSample, SystemSnapshot
+from .alerts import AlertEngine, AlertRule
+from .hub import get_hub
+from .models import CoreSample, SystemSnapshot
+from .pacing import MIN_INTERVAL_S, DeadlineTicker, PacingStats
 from .sampler import SampleResult, create_sampler
+from .spans import SPAN_COLUMNS, Span, SpanIndex, spans_from_marks
+from .spill import SpillFile, SpillWriter, merge_columns, merge_numpy
+from .stats import SessionSummary
+from .store import SampleStore
 from .utils import get_ram_metrics_dict
 
+# In-memory samples kept by a spilling Profiler when max_in_memory is not
+# given: an hour at the default 1 s interval (~1 MiB on a 16-core chip).
+_DEFAULT_MAX_IN_MEMORY = 3600
 
-def _sample_to_snapshot(
-    sample: SampleResult, ram: dict, interval_s: float
-) -> SystemSnapshot:
+
+# (SampleResult field, SystemSnapshot field) for the per-interval extremes.
+_EXTREME_SNAPSHOT_FIELDS = (
+    ("cpu_w", "cpu_watts"),
+    ("gpu_w", "gpu_watts"),
+    ("ane_w", "ane_watts"),
+    ("package_w", "package_watts"),
+    ("ecpu_active_pct", "ecpu_util_pct"),
+    ("pcpu_active_pct", "pcpu_util_pct"),
+    ("gpu_active_pct", "gpu_util_pct"),
+    ("bandwidth_gbps", "bandwidth_gbps"),
+)
+
+
+def _snapshot_extremes(sample, extremes, bw_avail):
+    """Map SampleResult interval_min/max to SystemSnapshot names.
+
+    extremes is None for a single-shot sample: the reading is its own min/max.
+    """
+    out = {}
+    for src, dst in _EXTREME_SNAPSHOT_FIELDS:
+        value = getattr(sample, src) if extremes is None else extremes[src]
+        if dst == "bandwidth_gbps" and not bw_avail:
+            value = 0.0
+        out[dst] = float(value)
+    return out
+
+
+def _sample_to_snapshot(sample: SampleResult, ram: dict) -> SystemSnapshot:
     """Map raw SampleResult + RAM dict to a clean SystemSnapshot."""
-    cm = sample.cpu_metrics
-    gm = sample.gpu_metrics
-    bw = sample.bandwidth_metrics
-    bw_avail = bool(isinstance(bw, dict) and bw.get("_available", False))
-    # total_gbps is a residency-weighted average already in GB/s — not a
+    bw_avail = bool(sample.bandwidth_available)
+    # bandwidth_gbps is a residency-weighted average already in GB/s — not a
     # byte counter, so it is not divided by the sample interval.
-    total_bw = float(bw.get("total_gbps", 0.0)) if bw_avail else 0.0
+    total_bw = float(sample.bandwidth_gbps) if bw_avail else 0.0
     e_cores = [
-        CoreSample(
-            index=sys_idx,
-            active_pct=int(cm.get("E-Cluster" + str(sys_idx) + "_active", 0)),
-            freq_mhz=int(cm.get("E-Cluster" + str(sys_idx) + "_freq_MHz", 0)),
+        CoreSample(index=idx, active_pct=active, freq_mhz=freq)
+        for idx, active, freq in zip(
+            sample.e_core_index, sample.e_core_active_pct, sample.e_core_freq_mhz
         )
-        for sys_idx in cm.get("e_core", [])
     ]
     p_cores = [
-        CoreSample(
-            index=sys_idx,
-            active_pct=int(cm.get("P-Cluster" + str(sys_idx) + "_active", 0)),
-            freq_mhz=int(cm.get("P-Cluster" + str(sys_idx) + "_freq_MHz", 0)),
+        CoreSample(index=idx, active_pct=active, freq_mhz=freq)
+        for idx, active, freq in zip(
+            sample.p_core_index, sample.p_core_active_pct, sample.p_core_freq_mhz
         )
-        for sys_idx in cm.get("p_core", [])
     ]
     return SystemSnapshot(
         timestamp=sample.timestamp,
-        cpu_watts=cm["cpu_W"] / interval_s,
-        gpu_watts=cm["gpu_W"] / interval_s,
-        ane_watts=cm["ane_W"] / interval_s,
-        package_watts=cm["package_W"] / interval_s,
-        ecpu_util_pct=float(cm["E-Cluster_active"]),
-        pcpu_util_pct=float(cm["P-Cluster_active"]),
-        gpu_util_pct=float(gm["active"]),
+        cpu_watts=sample.cpu_w,
+        gpu_watts=sample.gpu_w,
+        ane_watts=sample.ane_w,
+        package_watts=sample.package_w,
+        ecpu_util_pct=float(sample.ecpu_active_pct),
+        pcpu_util_pct=float(sample.pcpu_active_pct),
+        gpu_util_pct=float(sample.gpu_active_pct),
         cpu_temp_c=sample.cpu_temp_c,
         gpu_temp_c=sample.gpu_temp_c,
-        ecpu_freq_mhz=int(cm["E-Cluster_freq_MHz"]),
-        pcpu_freq_mhz=int(cm["P-Cluster_freq_MHz"]),
-        gpu_freq_mhz=int(gm["freq_MHz"]),
-        ecpu_max_freq_mhz=int(cm.get("E-Cluster_max_freq_MHz", 0)),
-        pcpu_max_freq_mhz=int(cm.get("P-Cluster_max_freq_MHz", 0)),
-        gpu_max_freq_mhz=int(gm.get("max_freq_MHz", 0)),
-        ecpu_residency_pct=dict(cm.get("E-Cluster_residency_pct", _EMPTY_RESIDENCY)),
-        pcpu_residency_pct=dict(cm.get("P-Cluster_residency_pct", _EMPTY_RESIDENCY)),
-        gpu_residency_pct=dict(gm.get("residency_pct", _EMPTY_RESIDENCY)),
+        ecpu_freq_mhz=sample.ecpu_freq_mhz,
+        pcpu_freq_mhz=sample.pcpu_freq_mhz,
+        gpu_freq_mhz=sample.gpu_freq_mhz,
+        ecpu_max_freq_mhz=sample.ecpu_max_freq_mhz,
+        pcpu_max_freq_mhz=sample.pcpu_max_freq_mhz,
+        gpu_max_freq_mhz=sample.gpu_max_freq_mhz,
+        ecpu_residency_pct=dict(sample.ecpu_residency_pct),
+        pcpu_residency_pct=dict(sample.pcpu_residency_pct),
+        gpu_residency_pct=dict(sample.gpu_residency_pct),
         ram_used_gb=float(ram.get("used_GB", 0.0)),
         swap_used_gb=float(ram.get("swap_used_GB", 0.0)),
         thermal_state=sample.thermal_pressure,
@@ -63,36 +92,70 @@ def _sample_to_snapshot(
         bandwidth_available=bw_avail,
         e_cores=e_cores,
         p_cores=p_cores,
+        interval_min=_snapshot_extremes(sample, sample.interval_min, bw_avail),
+        interval_max=_snapshot_extremes(sample, sample.interval_max, bw_avail),
+        elapsed_s=sample.elapsed_s,
+        monotonic_s=sample.monotonic_s,
     )
 
 
 class Monitor:
     """Synchronous, single-sample hardware monitor."""
 
-    def __init__(self, interval_s: float = 1.0, subsamples: int = 1):
-        self._interval_s = max(1, int(interval_s))
-        self._sampler, _ = create_sampler(self._interval_s, subsamples=subsamples)
+    def __init__(
+        self, interval_s: float = 1.0, subsamples: int = 1, overrun: str = "skip"
+    ):
+        # Float intervals down to MIN_INTERVAL_S; watts come from each delta's
+        # measured elapsed time, so short or late ticks report true power.
+        self._interval_s = max(MIN_INTERVAL_S, float(interval_s))
+        self._sampler, _ = create_sampler(
+            self._interval_s, subsamples=subsamples, overrun=overrun
+        )
         # Prime delta: first sample() always returns None
         self._sampler.sample()
+        # Snapshot deadlines run from the priming sample: the caller's work
+        # between get_snapshot() calls comes out of the interval, not on top.
+        self._ticker = DeadlineTicker(self._interval_s, overrun)
 
     @property
     def manages_timing(self) -> bool:
         """True if the underlying sampler manages its own sleep timing."""
         return bool(getattr(self._sampler, "manages_timing", False))
 
-    def get_snapshot(self) -> SystemSnapshot:
-        """Block for interval_s (unless sampler manages timing), return SystemSnapshot."""
+    @property
+    def pacing_stats(self) -> PacingStats:
+        """Deadline/jitter statistics of whichever loop paces this monitor."""
+        if self.manages_timing:
+            stats = getattr(self._sampler, "pacing_stats", None)
+            return stats if stats is not None else PacingStats(0, 0, 0, 0.0, 0.0)
+        return self._ticker.stats
+
+    def get_snapshot(self, stop_event=None) -> SystemSnapshot | None:
+        """Block until the next interval deadline, return SystemSnapshot.
+
+        Deadlines are fixed on the monotonic clock (see actop.pacing), so time
+        the caller spends between calls does not delay the schedule. A sampler
+        that manages timing (subsamples > 1) paces itself the same way.
+
+        stop_event: optional threading.Event; setting it ends the deadline
+        wait early and returns None, so a sampling thread can stop without
+        waiting out the interval.
+        """
         if not self.manages_timing:
-            time.sleep(self._interval_s)
+            if not self._ticker.wait(stop_event):
+                return None
+        return self._take_snapshot()
+
+    def _take_snapshot(self) -> SystemSnapshot:
+        """Sample and convert now, without waiting for a deadline."""
         sample = self._sampler.sample()
         while sample is None:
             # A None sample means the delta interval was non-positive; sleep
-            # briefly so the re-sample sees a meaningful elapsed time (avoids a
-            # frame with an inflated interval/elapsed power scale).
+            # briefly so the re-sample covers a meaningful elapsed time.
             time.sleep(0.01)
             sample = self._sampler.sample()
         ram = get_ram_metrics_dict()
-        return _sample_to_snapshot(sample, ram, self._interval_s)
+        return _sample_to_snapshot(sample, ram)
 
     def close(self):
         self._sampler.close()
@@ -105,16 +168,56 @@ class Monitor:
 
 
 class Profiler:
-    """Threaded background collector. Use as a context manager."""
+    """Background collector. Use as a context manager.
+
+    Snapshots come from the process-wide SamplerHub for its interval (see
+    actop.hub), so a Profiler running next to an exporter or another
+    Profiler with the same settings shares their sampler.
+
+    Samples are kept in a columnar SampleStore. Two ways to bound memory on
+    long runs: `capacity` makes the store a ring holding only the most recent
+    samples; `spill_path` keeps every sample but at most `max_in_memory` in
+    RAM, appending older ones to that file in the background (see
+    actop.spill) — every read method then covers spilled and resident
+    samples alike, decoding the file chunk by chunk.
 
-    def __init__(self, interval_s: float = 1.0):
+    `span(name)` / `mark(name)` label regions of the profiled code;
+    `get_spans()` attributes energy and average power, bandwidth and
+    utilization to each (see actop.spans).
+    """
+
+    def __init__(
+        self,
+        interval_s: float = 1.0,
+        overrun: str = "skip",
+        capacity: int | None = None,
+        spill_path: str | None = None,
+        max_in_memory: int | None = None,
+    ):
+        if spill_path is not None and capacity is not None:
+            raise ValueError("capacity and spill_path are mutually exclusive")
+        if max_in_memory is not None and max_in_memory < 1:
+            raise ValueError(
+                "max_in_memory must be >= 1, got {!r}".format(max_in_memory)
+            )
         self._interval_s = interval_s
-        self._monitor = Monitor(interval_s)
-        self._samples: list = []
+        self._hub = get_hub(interval_s, overrun=overrun)
+        self._subscription = None
+        self._samples = SampleStore(capacity)
+        self._spill_path = spill_path
+        self._max_in_memory = max_in_memory or _DEFAULT_MAX_IN_MEMORY
+        self._spill: SpillWriter | None = None
+        # Updated on every append under its own lock, so get_summary() is
+        # O(1) and never waits on an export holding the sample lock.
+        self._summary = SessionSummary()
+        self._summary_lock = threading.Lock()
         self._lock = threading.Lock()
-        self._stop_event = threading.Event()
-        self._thread: threading.Thread | None = None
-        self._alerts: list = []  # list of (metric, threshold, callback)
+        self._alerts: list = []  # (AlertRule, callback), in registration order
+        self._alert_engine = AlertEngine()
+        self._alert_callbacks: dict = {}  # id(rule) -> callback
+        self._spans: list = []  # Span, in exit order
+        self._marks: list = []  # (name, time.monotonic())
+        self._stopped_at: float | None = None
 
     def __enter__(self):
         self.start()
@@ -124,85 +227,274 @@ class Profiler:
         self.stop()
 
     def start(self):
+        with self._summary_lock:
+            self._summary.reset()
         with self._lock:
             self._samples.clear()
-        self._stop_event.clear()
-        self._thread = threading.Thread(target=self._run_loop, daemon=True)
-        self._thread.start()
+            if self._spill_path is not None:
+                if self._spill is not None:
+                    self._spill.close()
+                self._spill = SpillWriter(self._spill_path)
+        self._spans = []
+        self._marks = []
+        self._stopped_at = None
+        if self._subscription is None:
+            self._subscription = self._hub.subscribe_callback(self._on_snapshot)
 
     def stop(self):
-        self._stop_event.set()
-        if self._thread:
-            self._thread.join()
-        self._monitor.close()
-
-    def _run_loop(self):
-        while not self._stop_event.is_set():
-            snapshot = self._monitor.get_snapshot()  # blocks for interval_s
-            with self._lock:
-                self._samples.append(snapshot)
-            for metric, threshold, callback in self._alerts:
-                val = getattr(snapshot, metric, None)
-                if val is not None and val >= threshold:
-                    # Deliberate fault isolation: a raising user callback must
-                    # not kill the sampling thread. Best-effort by design.
-                    try:
-                        callback(val)
-                    except Exception:
-                        pass
-
-    def register_alert(self, metric: str, threshold: float, callback):
-        """Fire callback(value) when snapshot.metric >= threshold."""
-        if metric not in SystemSnapshot.__dataclass_fields__:
-            raise ValueError(f"Unknown SystemSnapshot field: {metric!r}")
-        self._alerts.append((metric, threshold, callback))
+        self._stopped_at = time.monotonic()
+        if self._subscription is not None:
+            # Returns once no snapshot is being delivered to this Profiler.
+            self._subscription.close()
+            self._subscription = None
+        if self._spill is not None:
+            self._spill.close()
 
-    def get_summary(self) -> dict:
+    def _on_snapshot(self, snapshot):
+        """Hub callback: store and summarize one snapshot."""
+        with self._lock:
+            self._samples.append(snapshot)
+            if self._spill is not None and len(self._samples) >= self._max_in_memory:
+                # Hand the full store to the writer thread as one chunk.
+                self._spill.submit(self._samples.columns(), self._samples.core_indices)
+                self._samples.clear()
+        with self._summary_lock:
+            self._summary.update(snapshot)
+        engine, callbacks = self._alert_engine, self._alert_callbacks
+        for rule, value in engine.evaluate(snapshot):
+            # Deliberate fault isolation: a raising user callback must
+            # not kill the sampling thread. Best-effort by design.
+            try:
+                callbacks[id(rule)](value)
+            except Exception:
+                pass
+
+    @property
+    def pacing_stats(self) -> PacingStats:
+        """Deadline/jitter statistics of the shared sampling loop."""
+        return self._hub.pacing_stats
+
+    @property
+    def samples(self) -> list:
+        """The held samples as SystemSnapshots, oldest first."""
+        return list(self.iter_samples())
+
+    def iter_samples(self):
+        """Yield every sample as a SystemSnapshot, oldest first.
+
+        Spilled samples are decoded from the file one chunk at a time, then
+        the in-memory tail follows.
+        """
         with self._lock:
-            samples = list(self._samples)
-        if not samples:
-            return {}
-        duration_s = (
-            samples[-1].timestamp - samples[0].timestamp if len(samples) > 1 else 0.0
+            spilled = self._spilled()
+            tail = list(self._samples)
+        if spilled is not None:
+            yield from spilled.iter_samples()
+        yield from tail
+
+    def _spilled(self):
+        """SpillFile over every chunk submitted so far, or None (lock held)."""
+        if self._spill is None:
+            return None
+        self._spill.flush()
+        return SpillFile(self._spill_path, self._spill.chunks)
+
+    def _merged_columns(self, names=None):
+        """to_columns() restricted to names (lock held)."""
+        store = self._samples
+        parts = []
+        spilled = self._spilled()
+        if spilled is not None:
+            parts += [(c.count, cols) for c, cols in spilled.iter_chunks(names)]
+        if parts:
+            columns = store.columns()
+            if names is not None:
+                columns = {name: columns[name] for name in names if name in columns}
+            return merge_columns(parts + [(len(store), columns)])
+        if names is None:
+            return store.columns()
+        return {name: store.column(name) for name in names}
+
+    @contextmanager
+    def span(self, name: str):
+        """Label the enclosed block as a span: `with profiler.span("prefill"):`."""
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            self._spans.append(Span(name, start, time.monotonic()))
+
+    def mark(self, name: str):
+        """Start a span that runs until the next mark (or the end of the
+        session): `profiler.mark("decode_start")`."""
+        self._marks.append((name, time.monotonic()))
+
+    def add_span(self, name: str, start_s: float, end_s: float):
+        """Record a span timed elsewhere, on the time.monotonic() clock."""
+        if end_s < start_s:
+            raise ValueError("span ends before it starts: {!r}".format(name))
+        self._spans.append(Span(name, float(start_s), float(end_s)))
+
+    def get_spans(self) -> list:
+        """One dict per span, in start order: name, start_s/end_s (monotonic
+        clock), duration_s, covered_s, `<domain>_joules`, `avg_<domain>_watts`,
+        avg_bandwidth_gbps and `avg_<cluster>_util_pct`.
+
+        Samples are indexed once per call and each span is attributed with
+        two bisections, interpolating the partially covered first and last
+        sample. Time not yet sampled (or dropped from a ring) is not covered.
+        """
+        end_s = self._stopped_at if self._stopped_at is not None else time.monotonic()
+        spans = self._spans + spans_from_marks(self._marks, end_s)
+        spans.sort(key=lambda span: span.start_s)
+        with self._lock:
+            index = SpanIndex(self._merged_columns(SPAN_COLUMNS))
+        rows = []
+        for span in spans:
+            row = {
+                "name": span.name,
+                "start_s": span.start_s,
+                "end_s": span.end_s,
+                "duration_s": span.end_s - span.start_s,
+            }
+            row.update(index.attribute(span.start_s, span.end_s))
+            rows.append(row)
+        return rows
+
+    def spans_to_pandas(self):
+        """get_spans() as a DataFrame, one row per span."""
+        try:
+            import pandas as pd
+        except ImportError:
+            raise ImportError("pandas is required: pip install actop[pandas]")
+        return pd.DataFrame(self.get_spans())
+
+    def register_alert(
+        self,
+        metric: str,
+        threshold: float,
+        callback,
+        *,
+        op: str = ">=",
+        kind: str = "value",
+        window: int = 1,
+        sustain: int = 1,
+        clear: float | None = None,
+        name: str | None = None,
+    ) -> AlertRule:
+        """Fire callback(value) on every sample while the rule is active.
+
+        By default the rule is `snapshot.metric >= threshold` and value is the
+        metric. `op` flips the comparison, `kind="change"` / `"mean"` compare
+        the metric's change over / mean of the last `window` samples,
+        `sustain` requires N consecutive matching samples and `clear` keeps
+        the rule active until the signal crosses back past it (see
+        actop.alerts). All rules are compiled into one evaluator; registering
+        one restarts the windows of the others.
+        """
+        rule = AlertRule(
+            name or "{}{}{:g}".format(metric, op, threshold),
+            metric,
+            threshold,
+            op,
+            kind,
+            window,
+            sustain,
+            clear,
         )
-        cpu_w = [s.cpu_watts for s in samples]
-        gpu_w = [s.gpu_watts for s in samples]
-        pkg_w = [s.package_watts for s in samples]
-        avg_cpu = sum(cpu_w) / len(cpu_w)
-        avg_gpu = sum(gpu_w) / len(gpu_w)
-        avg_pkg = sum(pkg_w) / len(pkg_w)
-        return {
-            "sample_count": len(samples),
-            "duration_s": duration_s,
-            "avg_cpu_watts": avg_cpu,
-            "avg_gpu_watts": avg_gpu,
-            "avg_package_watts": avg_pkg,
-            "peak_cpu_watts": max(cpu_w),
-            "peak_gpu_watts": max(gpu_w),
-            "peak_package_watts": max(pkg_w),
-            "total_cpu_joules": avg_cpu * duration_s,
-            "total_gpu_joules": avg_gpu * duration_s,
-            "total_package_joules": avg_pkg * duration_s,
-        }
+        alerts = self._alerts + [(rule, callback)]
+        engine = AlertEngine([r for r, _ in alerts])  # validates the rule
+        self._alerts = alerts
+        self._alert_callbacks = {id(r): fn for r, fn in alerts}
+        self._alert_engine = engine
+        return rule
+
+    def get_summary(self) -> dict:
+        """Session totals: sample count, covered time, average/peak power and
+        energy per domain (see actop.stats.SessionSummary).
+
+        Constant-time: maintained incrementally as samples arrive, covering
+        the whole session even when samples were spilled or (with capacity)
+        dropped from the ring.
+        """
+        with self._summary_lock:
+            return self._summary.summary()
+
+    def to_columns(self) -> dict:
+        """Held samples as {column name: array.array} (no pandas/NumPy needed).
+
+        Names follow SampleStore.columns(): SystemSnapshot scalar fields,
+        `<domain>_residency_<bucket>_pct`, `interval_<min|max>_<field>` and
+        `<e|p>_core<index>_active_pct` / `_freq_mhz`; thermal_state is a list.
+        """
+        with self._lock:
+            return self._merged_columns()
+
+    def to_numpy(self) -> dict:
+        """Held samples as {column name: numpy.ndarray}; see to_columns().
+
+        Spilled chunks are copied straight out of the memory-mapped file.
+        """
+        with self._lock:
+            spilled = self._spilled()
+            tail = self._samples.to_numpy()
+            if spilled is None or not len(spilled):
+                return tail
+            return merge_numpy(spilled.to_numpy() + [(len(self._samples), tail)])
 
     def to_pandas(self):
         try:
             import pandas as pd
         except ImportError:
             raise ImportError("pandas is required: pip install actop[pandas]")
-        with self._lock:
-            samples = list(self._samples)
-        df = pd.DataFrame([dataclasses.asdict(s) for s in samples])
+        # One column per stored field, straight from the store's buffers;
+        # no per-row objects are built.
+        df = pd.DataFrame(self.to_numpy())
         df["datetime"] = pd.to_datetime(df["timestamp"], unit="s")
         df.set_index("datetime", inplace=True)
         return df
 
 
 class AsyncMonitor(Monitor):
-    """Async wrapper around Monitor; runs blocking get_snapshot in a thread pool."""
+    """Monitor for asyncio code.
+
+    The wait for each deadline happens on the event loop (asyncio.sleep via
+    DeadlineTicker.wait_async); only the short IOReport sample + convert
+    step runs in the loop's default executor. So many concurrent streams,
+    one AsyncMonitor each, hold no threads while they wait. With
+    subsamples > 1 the sampler paces its subsamples itself, so that step
+    spans the whole interval on an executor thread.
+
+    One AsyncMonitor is one stream; to fan a single sampler out to many
+    consumers, use actop.hub.get_hub(...).subscribe_async().
+    """
+
+    def __init__(
+        self, interval_s: float = 1.0, subsamples: int = 1, overrun: str = "skip"
+    ):
+        super().__init__(interval_s, subsamples, overrun)
+        # Serializes the off-loop step if a cancelled call's sample is still
+        # running when the next one starts.
+        self._sample_lock = threading.Lock()
+
+    def _take_snapshot_locked(self) -> SystemSnapshot:
+        with self._sample_lock:
+            return self._take_snapshot()
 
     async def get_snapshot_async(self) -> SystemSnapshot:
+        """Await the next interval deadline, return SystemSnapshot."""
         import asyncio
 
+        if not self.manages_timing:
+            await self._ticker.wait_async()
         loop = asyncio.get_running_loop()
-        return await loop.run_in_executor(None, self.get_snapshot)
+        return await loop.run_in_executor(None, self._take_snapshot_locked)
+
+    async def stream(self, count: int | None = None):
+        """Async iterator of snapshots, one per interval deadline:
+        `async for snap in monitor.stream():`. Stops after `count` snapshots
+        if given; otherwise runs until the consumer stops iterating."""
+        emitted = 0
+        while count is None or emitted < count:
+            yield await self.get_snapshot_async()
+            emitted += 1
@@ -4,12 +4,14 @@ import re
 from dataclasses import dataclass
 from typing import Optional
 
+from .pacing import MIN_INTERVAL_S
+
 
 @dataclass(frozen=True)
 class DashboardConfig:
     """Immutable values computed once from args + soc_info_dict."""
 
-    sample_interval: int
+    sample_interval: float
     avg_window: int
 
     cpu_chart_ref_w: float
@@ -39,10 +41,12 @@ class DashboardConfig:
     show_processes: bool
     process_filter_pattern: Optional[object]  # compiled regex or None
 
+    overrun: str = "skip"  # late-tick policy for the sampling deadlines
+
 
 def create_dashboard_config(args, soc_info_dict):
     """Build an immutable DashboardConfig from parsed CLI args and SoC info."""
-    sample_interval = max(1, args.interval)
+    sample_interval = max(MIN_INTERVAL_S, args.interval)
     avg_window = max(1, int(args.avg / sample_interval))
 
     cpu_chart_ref_w = soc_info_dict["cpu_chart_ref_w"]
@@ -85,4 +89,5 @@ def create_dashboard_config(args, soc_info_dict):
         show_processes=bool(getattr(args, "show_processes", False)),
         subsamples=max(1, int(args.subsamples)),
         process_filter_pattern=process_filter_pattern,
+        overrun=getattr(args, "overrun", "skip"),
     )
@@ -0,0 +1,267 @@
+"""`@profile_energy`: per-function energy accounting on one shared sampler.
+
+Decorated calls only read `time.monotonic()` on entry and exit and append
+(name, start, end) to a queue. The accounting subscribes once to a
+process-wide sampler hub (actop.hub): one that is already running at up to
+MAX_SHARED_INTERVAL_S (a Profiler's or an exporter's), else its own at
+SHARED_INTERVAL_S, so it never adds a sampler next to a suitable one. It
+keeps the last few thousand sample intervals. After each sample it attributes every call that the
+samples now cover, with the same interval index as Profiler spans
+(actop.spans), and folds it into that function's running statistics.
+
+Attribution is whole-SoC: a call is charged the package energy drawn while
+it ran, so concurrent calls each see the full draw of their overlap.
+"""
+
+import functools
+import inspect
+import threading
+import time
+from collections import deque
+from operator import attrgetter
+
+from .hub import shared_hub
+from .spans import SPAN_COLUMNS, SpanIndex
+from .stats import P2Quantile
+
+# Sampling interval of the shared sampler: fine enough to split calls of a
+# few hundred milliseconds across samples.
+SHARED_INTERVAL_S = 0.1
+# Slowest running sampler the accounting joins instead of starting its own;
+# coarser samples charge short calls their interval's average power.
+MAX_SHARED_INTERVAL_S = 1.0
+# Sample intervals kept for attribution (10 minutes at SHARED_INTERVAL_S);
+# a call longer than that is only charged for its covered part.
+_SAMPLE_WINDOW = 6000
+
+_get_span_row = attrgetter(*SPAN_COLUMNS)
+
+
+class FunctionEnergy:
+    """Running per-function statistics: calls, wall time and package energy,
+    with P² estimates of the 95th percentile per call."""
+
+    __slots__ = ("name", "calls", "total_s", "joules", "covered_s", "_p95_s", "_p95_j")
+
+    def __init__(self, name):
+        self.name = name
+        self.calls = 0
+        self.total_s = 0.0
+        self.joules = 0.0
+        self.covered_s = 0.0
+        self._p95_s = P2Quantile(0.95)
+        self._p95_j = P2Quantile(0.95)
+
+    def add(self, duration_s, joules, covered_s):
+        self.calls += 1
+        self.total_s += duration_s
+        self.joules += joules
+        self.covered_s += covered_s
+        self._p95_s.add(duration_s)
+        self._p95_j.add(joules)
+
+    def stats(self) -> dict:
+        calls = self.calls
+        return {
+            "calls": calls,
+            "total_s": self.total_s,
+            "mean_s": self.total_s / calls if calls else 0.0,
+            "p95_s": self._p95_s.value(),
+            "total_joules": self.joules,
+            "joules_per_call": self.joules / calls if calls else 0.0,
+            "p95_joules": self._p95_j.value(),
+            "avg_watts": self.joules / self.covered_s if self.covered_s > 0 else 0.0,
+            "covered_s": self.covered_s,
+        }
+
+
+class _EnergyAccounting:
+    """The shared-sampler subscription and per-function statistics."""
+
+    def __init__(
+        self,
+        interval_s=SHARED_INTERVAL_S,
+        window=_SAMPLE_WINDOW,
+        max_interval_s=MAX_SHARED_INTERVAL_S,
+    ):
+        self._interval_s = interval_s
+        self._max_interval_s = max_interval_s
+        self._sample_interval_s = interval_s  # of the hub actually joined
+        # (name, start_s, end_s), appended by the decorated calls themselves;
+        # deque.append is thread-safe.
+        self._calls = deque()
+        self._rows = deque(maxlen=window)  # SPAN_COLUMNS values per sample
+        self._functions = {}
+        self._covered_until = float("-inf")
+        self._error = None
+        self._lock = threading.Lock()
+        self._sampled = threading.Condition(self._lock)
+        self._started = False
+        self._subscription = None
+
+    def ensure_running(self):
+        with self._lock:
+            if self._started:
+                return
+            self._started = True
+            self._error = None
+            self._calls = deque()
+        # Opening the sampler takes a priming sample; keep that off the
+        # decorated call.
+        threading.Thread(
+            target=self._subscribe, name="actop-energy-start", daemon=True
+        ).start()
+
+    def _subscribe(self):
+        try:
+            hub = shared_hub(self._interval_s, self._max_interval_s)
+            self._sample_interval_s = hub.interval_s
+            subscription = hub.subscribe_callback(self._on_snapshot)
+        except Exception as exc:  # surfaced by stats(); calls stay unaffected
+            with self._lock:
+                self._error = exc
+                self._calls = deque(maxlen=0)  # drop further calls
+                self._sampled.notify_all()
+            return
+        with self._lock:
+            if self._started:
+                self._subscription, subscription = subscription, None
+        if subscription is not None:  # shut down while starting
+            subscription.close()
+
+    def _on_snapshot(self, snapshot):
+        if snapshot.monotonic_s <= 0:
+            return
+        with self._lock:
+            self._rows.append(_get_span_row(snapshot))
+            self._covered_until = snapshot.monotonic_s
+            self._fold()
+            self._sampled.notify_all()
+
+    def _fold(self):
+        """Attribute every queued call the samples now cover (lock held)."""
+        calls = self._calls
+        ready = []
+        while calls and calls[0][2] <= self._covered_until:
+            ready.append(calls.popleft())
+        if not ready:
+            return
+        # Index only the samples the ready calls can overlap.
+        earliest = min(start for _, start, _ in ready)
+        rows = []
+        for row in reversed(self._rows):
+            rows.append(row)
+            if row[0] - row[1] <= earliest:
+                break
+        rows.reverse()
+        index = SpanIndex(dict(zip(SPAN_COLUMNS, zip(*rows))))
+        functions = self._functions
+        for name, start_s, end_s in ready:
+            row = index.attribute(start_s, end_s)
+            entry = functions.get(name)
+            if entry is None:
+                entry = functions[name] = FunctionEnergy(name)
+            entry.add(end_s - start_s, row["package_joules"], row["covered_s"])
+
+    def stats(self, wait=True) -> dict:
+        with self._lock:
+            if wait and self._started:
+                # Calls that returned before now are attributed once a sample
+                # ends after now; allow a few intervals for that sample.
+                target = time.monotonic()
+                deadline = target + 3 * self._sample_interval_s + 1.0
+                while self._covered_until < target and self._error is None:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._sampled.wait(remaining)
+                # A sample may have covered calls queued after it arrived.
+                self._fold()
+            if self._error is not None:
+                raise RuntimeError(
+                    "energy sampler unavailable: {}".format(self._error)
+                ) from self._error
+            return {name: entry.stats() for name, entry in self._functions.items()}
+
+    def reset(self):
+        with self._lock:
+            self._functions = {}
+            self._calls.clear()
+
+    def shutdown(self):
+        with self._lock:
+            subscription, self._subscription = self._subscription, None
+            self._started = False
+        if subscription is not None:
+            subscription.close()
+        with self._lock:
+            self._rows.clear()
+            self._covered_until = float("-inf")
+
+
+_accounting = _EnergyAccounting()
+
+
+def profile_energy(fn=None, *, name=None):
+    """Decorator recording each call's wall time and attributed energy.
+
+    `@profile_energy` or `@profile_energy(name="decode")`; works on plain
+    and async functions. The statistics are keyed by `name`, by default
+    `module.qualname`; read them with energy_stats(). The first decorated
+    call subscribes to the shared sampler hub.
+    """
+    if fn is None:
+        return functools.partial(profile_energy, name=name)
+    label = name or "{}.{}".format(fn.__module__, fn.__qualname__)
+    accounting = _accounting
+    monotonic = time.monotonic
+
+    if inspect.iscoroutinefunction(fn):
+
+        @functools.wraps(fn)
+        async def async_wrapper(*args, **kwargs):
+            if not accounting._started:
+                accounting.ensure_running()
+            start = monotonic()
+            try:
+                return await fn(*args, **kwargs)
+            finally:
+                accounting._calls.append((label, start, monotonic()))
+
+        return async_wrapper
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        if not accounting._started:
+            accounting.ensure_running()
+        start = monotonic()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            accounting._calls.append((label, start, monotonic()))
+
+    return wrapper
+
+
+def energy_stats(wait: bool = True) -> dict:
+    """{name: stats} for every decorated function called so far.
+
+    Each entry has calls, total_s, mean_s, p95_s, total_joules,
+    joules_per_call, p95_joules, avg_watts (energy over sampled time) and
+    covered_s. With wait (the default), blocks until the sampler has covered
+    every call that returned before this one (a few intervals at most), so
+    the latest calls are included. Raises RuntimeError if the sampler could
+    not start (e.g. not on Apple Silicon).
+    """
+    return _accounting.stats(wait)
+
+
+def reset_energy_stats():
+    """Forget every function's statistics and any unattributed calls."""
+    _accounting.reset()
+
+
+def shutdown_energy_sampler():
+    """Unsubscribe from the sampler hub (which stops once nothing else uses
+    it); the next decorated call subscribes again."""
+    _accounting.shutdown()
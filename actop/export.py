@@ -1,19 +1,32 @@
-"""Metrics export backends: NDJSON stream and a Prometheus `/metrics` endpoint.
+"""Metrics export backends: NDJSON or binary stream and a Prometheus `/metrics`
+endpoint.
 
-These turn actop from an interactive viewer into an observability source. Both
-backends reuse the public `Monitor` API; the formatting functions operate on a
-plain `SystemSnapshot` and import nothing platform-specific, so they are testable
-off Apple-Silicon hardware. `Monitor` is imported lazily inside the run loops so
-this module imports cleanly on any platform.
+These turn actop from an interactive viewer into an observability source. The
+binary stream is the SampleStore column layout, one fixed-size record per
+snapshot (see BinaryWriter); BinaryReader turns it back into snapshots or
+columns. All backends subscribe to the process-wide sampler hub (actop.hub), so they share
+one sampler with any Profiler in the same process; the formatting functions
+operate on a plain `SystemSnapshot` and import nothing platform-specific, so
+they are testable off Apple-Silicon hardware. The sampler is only opened
+inside the run loops, so this module imports cleanly on any platform.
 """
 
 import dataclasses
+import gzip
+import hashlib
 import json
+import queue
+import struct
 import sys
 import threading
+import time
+from array import array
 from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 
+from actop.hub import get_hub
 from actop.models import SystemSnapshot
+from actop.stats import EnergyCounters, QuantileTracker
+from actop.store import _CLUSTERS, _COLUMNS, _core_row, _read_row, snapshot_from_row
 
 # Scalar SystemSnapshot fields exported as Prometheus gauges: (field, suffix).
 # Per-core lists are exported separately as labelled gauges.
@@ -41,13 +54,97 @@ def snapshot_to_dict(snapshot: SystemSnapshot) -> dict:
     return dataclasses.asdict(snapshot)
 
 
-def snapshot_to_json(snapshot: SystemSnapshot) -> str:
-    """Compact single-line JSON for one snapshot (NDJSON record)."""
-    return json.dumps(snapshot_to_dict(snapshot), separators=(",", ":"))
+def snapshot_to_json(snapshot: SystemSnapshot, quantiles=None, alerts=None) -> str:
+    """Compact single-line JSON for one snapshot (NDJSON record).
 
+    With a `quantiles` QuantileTracker, the record gains a "percentiles" key:
+    {field: {"p50": ..., "p90": ..., "p99": ...}} over the session so far.
+    With an `alerts` AlertEngine (already fed this snapshot), it gains an
+    "alerts" key: {rule name: signal value} for the active rules.
+    """
+    record = snapshot_to_dict(snapshot)
+    if quantiles is not None:
+        record["percentiles"] = quantiles.results()
+    if alerts is not None:
+        record["alerts"] = dict(alerts.active)
+    return json.dumps(record, separators=(",", ":"))
+
+
+def snapshot_to_prometheus(
+    snapshot: SystemSnapshot, quantiles=None, alerts=None
+) -> str:
+    """Render a snapshot in Prometheus text exposition format (version 0.0.4).
+
+    With a `quantiles` QuantileTracker, each tracked field is also exported as
+    a summary `actop_<gauge>_session{quantile="0.99"}` with `_sum`/`_count`.
+    With an `alerts` AlertEngine (already fed this snapshot), every rule is
+    exported as `actop_alert_active{alert="<name>"}` 1 or 0.
+    """
+    return "\n".join(_exposition_lines(snapshot, quantiles, alerts)) + "\n"
+
+
+def snapshot_to_openmetrics(
+    snapshot: SystemSnapshot, energy, quantiles=None, alerts=None
+) -> str:
+    """Render a snapshot in OpenMetrics text format (1.0.0).
+
+    Everything snapshot_to_prometheus() exports, plus, from `energy` (an
+    EnergyCounters already fed this snapshot):
+
+    - `actop_<domain>_energy_joules_total` counters for cpu/gpu/ane/package,
+      each with an exemplar carrying the latest sample's joules, elapsed
+      time and wall-clock timestamp, so `rate()` over them is the exact
+      average power between scrapes;
+    - `actop_sampled_seconds_total` and `actop_samples_total`;
+    - `actop_dvfs_residency_percent{cluster,state}` per cluster.
+    """
+    lines = _exposition_lines(snapshot, quantiles, alerts)
+    lines.extend(_openmetrics_lines(snapshot, energy))
+    return "\n".join(lines) + "\n"
+
+
+def _openmetrics_lines(snapshot, energy) -> list[str]:
+    """Counter, residency and terminating lines only OpenMetrics carries."""
+    lines: list[str] = []
+    elapsed = _fmt_number(snapshot.elapsed_s)
+    timestamp = _fmt_number(snapshot.timestamp)
+    for domain, joules in energy.joules.items():
+        name = "actop_{}_energy_joules".format(domain)
+        lines.append("# TYPE {} counter".format(name))
+        lines.append("# UNIT {} joules".format(name))
+        lines.append(
+            '{}_total {} # {{elapsed_s="{}"}} {} {}'.format(
+                name,
+                _fmt_number(joules),
+                elapsed,
+                _fmt_number(energy.last_joules[domain]),
+                timestamp,
+            )
+        )
+    lines.append("# TYPE actop_sampled_seconds counter")
+    lines.append("# UNIT actop_sampled_seconds seconds")
+    lines.append("actop_sampled_seconds_total {}".format(_fmt_number(energy.covered_s)))
+    lines.append("# TYPE actop_samples counter")
+    lines.append("actop_samples_total {}".format(energy.count))
 
-def snapshot_to_prometheus(snapshot: SystemSnapshot) -> str:
-    """Render a snapshot in Prometheus text exposition format (version 0.0.4)."""
+    lines.append("# TYPE actop_dvfs_residency_percent gauge")
+    for cluster, residency in (
+        ("ecpu", snapshot.ecpu_residency_pct),
+        ("pcpu", snapshot.pcpu_residency_pct),
+        ("gpu", snapshot.gpu_residency_pct),
+    ):
+        for state, pct in residency.items():
+            lines.append(
+                'actop_dvfs_residency_percent{{cluster="{}",state="{}"}} {}'.format(
+                    cluster, state, _fmt_number(float(pct))
+                )
+            )
+    lines.append("# EOF")
+    return lines
+
+
+def _exposition_lines(snapshot, quantiles, alerts) -> list[str]:
+    """Gauge, per-core, summary and alert lines shared by both formats."""
     lines: list[str] = []
     for field, suffix in _PROM_GAUGES:
         name = "actop_" + suffix
@@ -55,23 +152,59 @@ def snapshot_to_prometheus(snapshot: SystemSnapshot) -> str:
         lines.append("# TYPE {} gauge".format(name))
         lines.append("{} {}".format(name, _fmt_number(value)))
 
-    # Per-core utilization/frequency as labelled gauges.
+    # Per-core utilization/frequency as labelled gauges, one family at a time.
+    cores = [
+        ('cluster="{}",core="{}"'.format(cluster, core.index), core)
+        for cluster, cluster_cores in (("E", snapshot.e_cores), ("P", snapshot.p_cores))
+        for core in cluster_cores
+    ]
     lines.append("# TYPE actop_core_utilization_percent gauge")
+    for labels, core in cores:
+        lines.append(
+            "actop_core_utilization_percent{{{}}} {}".format(
+                labels, _fmt_number(float(core.active_pct))
+            )
+        )
     lines.append("# TYPE actop_core_frequency_mhz gauge")
-    for cluster, cores in (("E", snapshot.e_cores), ("P", snapshot.p_cores)):
-        for core in cores:
-            labels = 'cluster="{}",core="{}"'.format(cluster, core.index)
+    for labels, core in cores:
+        lines.append(
+            "actop_core_frequency_mhz{{{}}} {}".format(
+                labels, _fmt_number(float(core.freq_mhz))
+            )
+        )
+    if quantiles is not None:
+        lines.extend(_prometheus_summaries(quantiles))
+    if alerts is not None:
+        lines.append("# TYPE actop_alert_active gauge")
+        active = alerts.active
+        for name in dict.fromkeys(rule.name for rule in alerts.rules):
             lines.append(
-                "actop_core_utilization_percent{{{}}} {}".format(
-                    labels, _fmt_number(float(core.active_pct))
+                'actop_alert_active{{alert="{}"}} {}'.format(
+                    name, 1 if name in active else 0
                 )
             )
+    return lines
+
+
+def _prometheus_summaries(quantiles) -> list[str]:
+    """Session-percentile summary lines for each observed tracked field."""
+    suffixes = dict(_PROM_GAUGES)
+    lines = []
+    for field in quantiles.fields:
+        count = quantiles.counts[field]
+        if not count or field not in suffixes:
+            continue
+        name = "actop_{}_session".format(suffixes[field])
+        lines.append("# TYPE {} summary".format(name))
+        for p in quantiles.quantiles:
             lines.append(
-                "actop_core_frequency_mhz{{{}}} {}".format(
-                    labels, _fmt_number(float(core.freq_mhz))
+                '{}{{quantile="{:g}"}} {}'.format(
+                    name, p, _fmt_number(float(quantiles.quantile(field, p)))
                 )
             )
-    return "\n".join(lines) + "\n"
+        lines.append("{}_sum {}".format(name, _fmt_number(quantiles.sums[field])))
+        lines.append("{}_count {}".format(name, count))
+    return lines
 
 
 def _fmt_number(value: float) -> str:
@@ -82,47 +215,571 @@ def _fmt_number(value: float) -> str:
 
 
 def run_json_stream(
-    interval_s: int, subsamples: int, out=None, max_samples: int = 0
+    interval_s: float,
+    subsamples: int,
+    out=None,
+    max_samples: int = 0,
+    overrun: str = "skip",
+    percentiles: bool = False,
+    alerts=None,
+    buffer: int = 1024,
+    flush_every: int = 64,
+    flush_interval_s: float = 0.1,
+    backpressure: str = "drop-oldest",
 ) -> int:
     """Stream NDJSON snapshots to `out` (default stdout) until interrupted.
 
     `max_samples` > 0 stops after that many records (used by tests); 0 streams
-    indefinitely. Returns the number of records emitted.
-    """
-    from actop.api import Monitor
+    indefinitely. Records are paced on fixed deadlines, so write time does not
+    drift the stream; `overrun` picks the late-tick policy (see actop.pacing).
+    `percentiles` adds running session p50/p90/p99 to every record, and an
+    `alerts` AlertEngine the rules active at each one.
 
+    Records are written by a RecordWriter thread: up to `buffer` queued,
+    flushed every `flush_every` records or `flush_interval_s`, and
+    `backpressure` picks what a full queue does. Records dropped for a slow
+    consumer are reported on stderr at the end.
+    Returns the number of records written.
+    """
     stream = out if out is not None else sys.stdout
-    monitor = Monitor(interval_s, subsamples)
+    quantiles = QuantileTracker() if percentiles else None
+    writer = RecordWriter(stream, buffer, flush_every, flush_interval_s, backpressure)
     emitted = 0
+    hub = get_hub(interval_s, subsamples, overrun)
+    # With "block" the hub-side queue is the only place left to drop, so it
+    # holds as much as the writer's.
+    subscription = hub.subscribe_queue(maxsize=max(64, buffer))
+    failed = True
     try:
         while True:
-            snapshot = monitor.get_snapshot()
-            stream.write(snapshot_to_json(snapshot) + "\n")
-            stream.flush()
+            snapshot = subscription.get()
+            if quantiles is not None:
+                quantiles.update(snapshot)
+            if alerts is not None:
+                alerts.evaluate(snapshot)
+            writer.write(snapshot_to_json(snapshot, quantiles, alerts) + "\n")
             emitted += 1
             if max_samples and emitted >= max_samples:
                 break
+        failed = False
     finally:
-        monitor.close()
-    return emitted
+        subscription.close()
+        try:
+            writer.close()
+        except Exception as exc:
+            if not failed:
+                raise
+            # The loop's exception (often ^C) is the one to propagate.
+            print("actop: record writer: {!r}".format(exc), file=sys.stderr)
+        finally:
+            dropped = writer.dropped + subscription.dropped
+            if dropped:
+                print(
+                    "actop: dropped {} of {} records for a slow consumer".format(
+                        dropped, emitted + subscription.dropped
+                    ),
+                    file=sys.stderr,
+                    flush=True,
+                )
+    return writer.written
+
+
+BACKPRESSURE_POLICIES = ("drop-oldest", "block")
+_CLOSE = object()
+
+
+class RecordWriter:
+    """Writes records (str or bytes) to `out` from a background thread.
+
+    write() only queues, into a queue of at most `maxsize` records, so a slow
+    sink (a pipe into jq, a log shipper) does not stall the caller. The
+    thread flushes `out` once `flush_every` records are unflushed or
+    `flush_interval_s` after the oldest of them, whichever comes first, so a
+    burst costs one flush instead of one per record. When the queue is full,
+    `backpressure` "drop-oldest" discards the oldest queued record (counted
+    in `dropped`) and "block" makes write() wait for room. close() writes
+    what is queued, flushes and stops the thread. A write error stops the
+    writing and is re-raised by the next write() or close().
+    """
+
+    def __init__(
+        self,
+        out,
+        maxsize: int = 1024,
+        flush_every: int = 64,
+        flush_interval_s: float = 0.1,
+        backpressure: str = "drop-oldest",
+    ):
+        if backpressure not in BACKPRESSURE_POLICIES:
+            raise ValueError(
+                "backpressure must be one of {}, got {!r}".format(
+                    BACKPRESSURE_POLICIES, backpressure
+                )
+            )
+        if maxsize < 1 or flush_every < 1:
+            raise ValueError("maxsize and flush_every must be >= 1")
+        if flush_interval_s < 0:
+            raise ValueError("flush_interval_s must be >= 0")
+        self._out = out
+        self.flush_every = flush_every
+        self.flush_interval_s = flush_interval_s
+        self.backpressure = backpressure
+        self.written = 0
+        self.dropped = 0
+        self.flushes = 0
+        self._error = None
+        self._queue = queue.Queue(maxsize)
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def write(self, record) -> None:
+        if self._error is not None:
+            raise self._error
+        if self.backpressure == "block":
+            self._queue.put(record)
+            return
+        while True:
+            try:
+                self._queue.put_nowait(record)
+                return
+            except queue.Full:
+                try:
+                    self._queue.get_nowait()
+                    self.dropped += 1
+                except queue.Empty:
+                    pass
+
+    def close(self) -> None:
+        if self._thread.is_alive():
+            self._queue.put(_CLOSE)
+            self._thread.join()
+        if self._error is not None:
+            raise self._error
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        self.close()
+
+    def _run(self):
+        get = self._queue.get
+        pending = 0  # written but not yet flushed
+        deadline = 0.0
+        while True:
+            try:
+                if pending:
+                    item = get(timeout=max(0.0, deadline - time.monotonic()))
+                else:
+                    item = get()
+            except queue.Empty:
+                self._flush()
+                pending = 0
+                continue
+            if item is _CLOSE:
+                if pending:
+                    self._flush()
+                return
+            if self._error is not None:
+                continue  # keep draining so a blocked write() returns
+            try:
+                self._out.write(item)
+            except Exception as exc:  # surfaced by the next write()/close()
+                self._error = exc
+                continue
+            self.written += 1
+            pending += 1
+            if pending == 1:
+                deadline = time.monotonic() + self.flush_interval_s
+            if pending >= self.flush_every or time.monotonic() >= deadline:
+                self._flush()
+                pending = 0
+
+    def _flush(self):
+        if self._error is not None:
+            return
+        try:
+            self._out.flush()
+            self.flushes += 1
+        except Exception as exc:
+            self._error = exc
+
+
+# Binary stream: b"ACTOPBIN", a u32-length-prefixed JSON schema, then
+# u32-length-prefixed records whose first byte is one of these kinds.
+_BINARY_MAGIC = b"ACTOPBIN"
+_BINARY_VERSION = 1
+_LENGTH = struct.Struct("<I")
+_FULL_RECORD = 0  # every column at its fixed offset
+_DELTA_RECORD = 1  # bitmap of changed columns, then only their bytes
+_LABEL_RECORD = 2  # UTF-8 thermal_state string; takes the next code
+
+
+def _core_columns(core_index) -> list:
+    """Per-core (name, code) columns, named as in SampleStore.columns()."""
+    columns = []
+    for side in _CLUSTERS:
+        index = core_index[side]
+        columns += [("{}_core{}_active_pct".format(side, idx), "h") for idx in index]
+        columns += [("{}_core{}_freq_mhz".format(side, idx), "i") for idx in index]
+    return columns
+
+
+class _BinaryLayout:
+    """Fixed little-endian record layout for a binary stream's columns."""
+
+    __slots__ = ("columns", "scalars", "core_index", "struct", "spans", "bitmap_size")
+
+    def __init__(self, columns, core_index):
+        self.columns = list(columns) + _core_columns(core_index)
+        self.scalars = len(columns)  # one value per sample, before the cores
+        self.core_index = core_index
+        self.struct = struct.Struct("<" + "".join(code for _, code in self.columns))
+        self.spans = []  # slice of each column in a packed record
+        offset = 0
+        for _, code in self.columns:
+            size = struct.calcsize("<" + code)
+            self.spans.append(slice(offset, offset + size))
+            offset += size
+        self.bitmap_size = (len(self.columns) + 7) // 8
+
+
+class BinaryWriter:
+    """Encode snapshots as a compact binary stream on a binary file `out`.
+
+    The stream opens with a JSON schema naming every column and its struct
+    code: the SampleStore columns, a thermal_state code and the per-core
+    active %/MHz of the cores in the first snapshot (a later snapshot missing
+    one of them stores 0, as in SampleStore). Each record is then the fixed
+    layout of those columns, about 4x smaller than the NDJSON record and
+    packed by one struct call. With `delta`, records after the first carry
+    only the columns whose bytes changed since the previous record, behind a
+    bitmap, unless the full layout is shorter. Read it back with
+    BinaryReader.
+    """
+
+    def __init__(self, out, delta: bool = False):
+        self._out = out
+        self.delta = delta
+        self.records = 0
+        self._layout = None
+        self._previous = None
+        self._thermal_codes = {}
+
+    def write(self, snapshot: SystemSnapshot) -> None:
+        layout = self._layout
+        if layout is None:
+            layout = self._start(snapshot)
+        chunks = []
+        code = self._thermal_codes.get(snapshot.thermal_state)
+        if code is None:
+            code = len(self._thermal_codes)
+            self._thermal_codes[snapshot.thermal_state] = code
+            label = bytes((_LABEL_RECORD,)) + snapshot.thermal_state.encode("utf-8")
+            chunks += (_LENGTH.pack(len(label)), label)
+
+        row = _read_row(snapshot)
+        row.append(code)
+        for side in _CLUSTERS:
+            cores = getattr(snapshot, side + "_cores")
+            active, freq = _core_row(cores, layout.core_index[side])
+            row += active
+            row += freq
+        packed = layout.struct.pack(*row)
+
+        previous, self._previous = self._previous, packed
+        payload = bytes((_FULL_RECORD,)) + packed
+        if self.delta and previous is not None:
+            spans = layout.spans
+            changed = [
+                n for n, span in enumerate(spans) if packed[span] != previous[span]
+            ]
+            bitmap = 0
+            for n in changed:
+                bitmap |= 1 << n
+            delta = (
+                bytes((_DELTA_RECORD,))
+                + bitmap.to_bytes(layout.bitmap_size, "little")
+                + b"".join([packed[spans[n]] for n in changed])
+            )
+            if len(delta) < len(payload):
+                payload = delta
+        chunks += (_LENGTH.pack(len(payload)), payload)
+        self._out.write(b"".join(chunks))
+        self.records += 1
+
+    def _start(self, snapshot):
+        core_index = {
+            side: tuple(core.index for core in getattr(snapshot, side + "_cores"))
+            for side in _CLUSTERS
+        }
+        columns = _COLUMNS + (("thermal_state", "B"),)
+        schema = json.dumps(
+            {
+                "version": _BINARY_VERSION,
+                "delta": self.delta,
+                "columns": columns,
+                "cores": core_index,
+            },
+            separators=(",", ":"),
+        ).encode("utf-8")
+        self._out.write(_BINARY_MAGIC + _LENGTH.pack(len(schema)) + schema)
+        self._layout = _BinaryLayout(columns, core_index)
+        return self._layout
+
+
+class BinaryReader:
+    """Decode a BinaryWriter stream from a binary file `source`.
+
+    Iterating yields SystemSnapshots; `rows()` yields each record's raw
+    column values (names in `column_names`), and `columns()` collects the
+    rest of the stream into one `array` per column, named as in
+    SampleStore.columns() (thermal_state as a list of strings). The stream
+    is read once, so use one of the three. An empty source has no records;
+    anything else without the stream header raises ValueError, as does a
+    truncated record.
+    """
+
+    def __init__(self, source):
+        self._source = source
+        self.schema = None
+        self.thermal_states = []
+        self._layout = None
+        magic = source.read(len(_BINARY_MAGIC))
+        if not magic:
+            return
+        if magic != _BINARY_MAGIC:
+            raise ValueError("not an actop binary stream")
+        schema = json.loads(self._read_exact(_LENGTH.unpack(self._read_exact(4))[0]))
+        if schema.get("version") != _BINARY_VERSION:
+            raise ValueError(
+                "unsupported actop binary stream version {!r}".format(
+                    schema.get("version")
+                )
+            )
+        self.schema = schema
+        self._layout = _BinaryLayout(
+            [tuple(column) for column in schema["columns"]],
+            {side: tuple(index) for side, index in schema["cores"].items()},
+        )
+
+    @property
+    def column_names(self) -> list:
+        if self._layout is None:
+            return []
+        return [name for name, _ in self._layout.columns]
+
+    def _read_exact(self, size):
+        data = self._source.read(size)
+        if len(data) != size:
+            raise ValueError("truncated actop binary stream")
+        return data
+
+    def rows(self):
+        """Yield each record's column values as a tuple."""
+        layout = self._layout
+        if layout is None:
+            return
+        unpack = layout.struct.unpack
+        spans = layout.spans
+        bitmap_end = 1 + layout.bitmap_size
+        previous = None
+        while True:
+            head = self._source.read(4)
+            if not head:
+                return
+            if len(head) != 4:
+                raise ValueError("truncated actop binary stream")
+            payload = self._read_exact(_LENGTH.unpack(head)[0])
+            kind = payload[0]
+            if kind == _FULL_RECORD:
+                packed = payload[1:]
+            elif kind == _DELTA_RECORD:
+                if previous is None:
+                    raise ValueError("delta record without a previous record")
+                packed = bytearray(previous)
+                pos = bitmap_end
+                for byte_n, bits in enumerate(payload[1:bitmap_end]):
+                    while bits:
+                        low = bits & -bits
+                        span = spans[byte_n * 8 + low.bit_length() - 1]
+                        size = span.stop - span.start
+                        packed[span] = payload[pos : pos + size]
+                        pos += size
+                        bits ^= low
+            elif kind == _LABEL_RECORD:
+                self.thermal_states.append(payload[1:].decode("utf-8"))
+                continue
+            else:
+                raise ValueError("unknown actop binary record kind {}".format(kind))
+            previous = packed
+            yield unpack(packed)
+
+    def __iter__(self):
+        layout = self._layout
+        if layout is None:
+            return
+        names = self.column_names[: layout.scalars]
+        thermal = names.index("thermal_state")
+        for row in self.rows():
+            cores = {}
+            pos = layout.scalars
+            for side in _CLUSTERS:
+                index = layout.core_index[side]
+                width = len(index)
+                cores[side] = (
+                    index,
+                    row[pos : pos + width],
+                    row[pos + width : pos + 2 * width],
+                )
+                pos += 2 * width
+            yield snapshot_from_row(
+                dict(zip(names, row)), self.thermal_states[row[thermal]], cores
+            )
+
+    def columns(self) -> dict:
+        """{name: array} over the remaining records; see SampleStore.columns()."""
+        rows = list(self.rows())
+        if self._layout is None:
+            return {}
+        values = zip(*rows) if rows else [()] * len(self._layout.columns)
+        out = {}
+        for (name, code), column in zip(self._layout.columns, values):
+            if name == "thermal_state":
+                out[name] = [self.thermal_states[state] for state in column]
+            else:
+                out[name] = array(code, column)
+        return out
+
+
+def run_binary_stream(
+    interval_s: float,
+    subsamples: int,
+    out=None,
+    max_samples: int = 0,
+    overrun: str = "skip",
+    delta: bool = False,
+) -> int:
+    """Stream snapshots as a BinaryWriter stream to `out` (default binary
+    stdout) until interrupted; `delta` delta-encodes the records.
+
+    Paced like run_json_stream. Returns the number of records emitted.
+    """
+    stream = out if out is not None else sys.stdout.buffer
+    writer = BinaryWriter(stream, delta)
+    with get_hub(interval_s, subsamples, overrun).subscribe_queue() as subscription:
+        while True:
+            writer.write(subscription.get())
+            stream.flush()
+            if max_samples and writer.records >= max_samples:
+                break
+    return writer.records
+
+
+_PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4"
+_OPENMETRICS_CONTENT_TYPE = "application/openmetrics-text; version=1.0.0; charset=utf-8"
+
+
+class _RenderedMetrics:
+    """One rendered exposition, encoded once for every scrape of it.
+
+    `etag` is a digest of the body, so a scraper holding it gets 304 Not
+    Modified until the text actually changes; the gzip body, a different
+    representation, has its own `gzip_etag`. The gzip body is compressed on
+    the first request that accepts it and reused for the rest.
+    """
+
+    __slots__ = ("body", "etag", "gzip_etag", "content_type", "_gzipped")
+
+    def __init__(self, text: str, content_type: str = _PROMETHEUS_CONTENT_TYPE):
+        self.body = text.encode("utf-8")
+        digest = hashlib.blake2b(self.body, digest_size=8).hexdigest()
+        self.etag = '"{}"'.format(digest)
+        self.gzip_etag = '"{}-gz"'.format(digest)
+        self.content_type = content_type
+        self._gzipped = None
+
+    def gzipped(self) -> bytes:
+        # Two threads may both compress the first time; either result is kept.
+        if self._gzipped is None:
+            self._gzipped = gzip.compress(self.body, mtime=0)
+        return self._gzipped
+
+
+def _accepted(header, names) -> bool:
+    """True when an Accept / Accept-Encoding header lists one of names with
+    q > 0."""
+    for item in (header or "").split(","):
+        value, _, params = item.partition(";")
+        if value.strip().lower() not in names:
+            continue
+        for param in params.split(";"):
+            key, _, q = param.strip().lower().partition("=")
+            if key == "q":
+                try:
+                    return float(q) > 0
+                except ValueError:
+                    return False
+        return True
+    return False
+
+
+def _accepts_gzip(accept_encoding) -> bool:
+    return _accepted(accept_encoding, ("gzip", "*"))
+
+
+def _accepts_openmetrics(accept) -> bool:
+    # Only an explicit request: curl's */* keeps the Prometheus text format.
+    return _accepted(accept, ("application/openmetrics-text",))
+
+
+def _etag_matches(if_none_match, rendered) -> bool:
+    """True when an If-None-Match header names either of a _RenderedMetrics'
+    tags (weakly) or is "*". Either will do: the body is the same text."""
+    if not if_none_match:
+        return False
+    etags = (rendered.etag, rendered.gzip_etag)
+    for tag in if_none_match.split(","):
+        tag = tag.strip()
+        if tag == "*" or tag.removeprefix("W/") in etags:
+            return True
+    return False
 
 
 def _make_prometheus_handler(read_latest):
-    """Build a BaseHTTPRequestHandler serving the latest snapshot at /metrics."""
+    """Build a BaseHTTPRequestHandler serving the latest snapshot at /metrics.
+
+    read_latest(openmetrics) returns the current _RenderedMetrics (the
+    OpenMetrics one when asked for and available), or None before the first
+    sample. A scrape is header parsing and one write of cached bytes: gzip
+    when the client accepts it, 304 when its If-None-Match still holds.
+    """
 
     class _Handler(BaseHTTPRequestHandler):
-        def do_GET(self):  # noqa: N802 (stdlib-mandated name)
+        def do_GET(self):
             if self.path.rstrip("/") not in ("", "/metrics"):
                 self.send_error(404, "not found")
                 return
-            snapshot = read_latest()
-            if snapshot is None:
+            rendered = read_latest(_accepts_openmetrics(self.headers.get("Accept")))
+            if rendered is None:
                 self.send_error(503, "no sample yet")
                 return
-            body = snapshot_to_prometheus(snapshot).encode("utf-8")
+            gzipped = _accepts_gzip(self.headers.get("Accept-Encoding"))
+            etag = rendered.gzip_etag if gzipped else rendered.etag
+            if _etag_matches(self.headers.get("If-None-Match"), rendered):
+                self.send_response(304)
+                self.send_header("ETag", etag)
+                self.send_header("Vary", "Accept, Accept-Encoding")
+                self.end_headers()
+                return
+            body = rendered.gzipped() if gzipped else rendered.body
             self.send_response(200)
-            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Type", rendered.content_type)
+            if gzipped:
+                self.send_header("Content-Encoding", "gzip")
             self.send_header("Content-Length", str(len(body)))
+            self.send_header("ETag", etag)
+            self.send_header("Vary", "Accept, Accept-Encoding")
             self.end_headers()
             self.wfile.write(body)
 
@@ -132,44 +789,81 @@ def _make_prometheus_handler(read_latest):
     return _Handler
 
 
-def serve_prometheus(
-    port: int, interval_s: int, subsamples: int, host: str = "0.0.0.0"
-) -> None:
-    """Serve Prometheus metrics on http://host:port/metrics until interrupted.
+class _ExpositionCache:
+    """Renders each snapshot for /metrics once, for every scrape until the
+    next: Prometheus text always, OpenMetrics too with `openmetrics`.
 
-    A background thread keeps the latest snapshot warm so scrapes return
-    immediately instead of blocking for a full sample interval.
+    Feeds the session quantiles, alert rules and energy counters on the way,
+    so those advance on every sample whatever the scrape cadence.
     """
-    from actop.api import Monitor
 
-    monitor = Monitor(interval_s, subsamples)
-    state = {"snapshot": None}
-    lock = threading.Lock()
-    stop = threading.Event()
+    def __init__(self, percentiles=False, alerts=None, openmetrics=False):
+        self.quantiles = QuantileTracker() if percentiles else None
+        self.alerts = alerts
+        self.energy = EnergyCounters() if openmetrics else None
+        # (text, openmetrics), replaced whole so readers need no lock.
+        self._latest = (None, None)
 
-    def _sample_loop():
-        while not stop.is_set():
-            snap = monitor.get_snapshot()
-            with lock:
-                state["snapshot"] = snap
+    def update(self, snapshot):
+        if self.quantiles is not None:
+            self.quantiles.update(snapshot)
+        if self.alerts is not None:
+            self.alerts.evaluate(snapshot)
+        lines = _exposition_lines(snapshot, self.quantiles, self.alerts)
+        text = _RenderedMetrics("\n".join(lines) + "\n")
+        openmetrics = None
+        if self.energy is not None:
+            self.energy.update(snapshot)
+            lines.extend(_openmetrics_lines(snapshot, self.energy))
+            openmetrics = _RenderedMetrics(
+                "\n".join(lines) + "\n", _OPENMETRICS_CONTENT_TYPE
+            )
+        self._latest = (text, openmetrics)
 
-    def _read_latest():
-        with lock:
-            return state["snapshot"]
+    def latest(self, openmetrics=False):
+        """The latest _RenderedMetrics (OpenMetrics when asked for and
+        enabled), or None before the first snapshot."""
+        text, rendered = self._latest
+        return rendered if openmetrics and rendered is not None else text
 
-    sampler_thread = threading.Thread(target=_sample_loop, daemon=True)
-    sampler_thread.start()
 
-    handler = _make_prometheus_handler(_read_latest)
+def serve_prometheus(
+    port: int,
+    interval_s: float,
+    subsamples: int,
+    host: str = "0.0.0.0",
+    overrun: str = "skip",
+    percentiles: bool = False,
+    alerts=None,
+    openmetrics: bool = False,
+) -> None:
+    """Serve Prometheus metrics on http://host:port/metrics until interrupted.
+
+    The hub thread renders and encodes each snapshot as it arrives, so scrapes
+    return the cached bytes immediately (gzipped on request, 304 on a
+    matching If-None-Match) instead of blocking for a sample interval.
+    `percentiles` adds session p50/p90/p99 summaries, and an `alerts`
+    AlertEngine an actop_alert_active gauge per rule. With `openmetrics`,
+    scrapers that accept application/openmetrics-text get the OpenMetrics
+    exposition with energy counters (see snapshot_to_openmetrics).
+    """
+    cache = _ExpositionCache(percentiles, alerts, openmetrics)
+    handler = _make_prometheus_handler(cache.latest)
     server = ThreadingHTTPServer((host, port), handler)
-    print(
-        "actop: serving Prometheus metrics on http://{}:{}/metrics".format(host, port),
-        file=sys.stderr,
-        flush=True,
-    )
+    subscription = None
     try:
+        subscription = get_hub(interval_s, subsamples, overrun).subscribe_callback(
+            cache.update
+        )
+        print(
+            "actop: serving Prometheus metrics on http://{}:{}/metrics".format(
+                host, port
+            ),
+            file=sys.stderr,
+            flush=True,
+        )
         server.serve_forever()
     finally:
-        stop.set()
         server.server_close()
-        monitor.close()
+        if subscription is not None:
+            subscription.close()
@@ -0,0 +1,352 @@
+"""Process-wide sampler hubs: one sampling loop per configuration, any
+number of consumers.
+
+Each `Monitor` opens its own IOReport subscription and SMC reader, so a
+Profiler, an exporter and the energy decorator running side by side used to
+sample the hardware three times over. `get_hub(interval_s, subsamples,
+overrun)` returns the one `SamplerHub` for that configuration. The hub runs a
+single Monitor on a background thread while it has subscribers and publishes
+every snapshot to each of them:
+
+- `subscribe_queue()`: a bounded queue for a blocking consumer loop;
+- `subscribe_callback(fn)`: fn(snapshot) on the hub thread;
+- `subscribe_async()`: an async iterator for an asyncio task.
+
+`every=N` decimates a subscription to every Nth snapshot. Subscriptions are
+reference counts: the first starts the sampler, closing the last stops it and
+releases the IOReport/SMC handles. Snapshots are shared between
+subscribers, so treat them as read-only.
+
+If the sampler raises, the hub stops, keeps the exception in `error` and
+ends every subscription with it: queue get() and async iteration re-raise
+it. The next subscription starts a fresh sampler.
+
+There is one hub per configuration, not one per process: consumers at
+different intervals still run one sampler each. A snapshot's watts,
+utilization and interval extremes are averages over its own interval, so a
+1 s consumer cannot be served every 10th snapshot of a 0.1 s sampler; it
+would see a tenth of each second, and anything integrating power over
+`elapsed_s` (SessionSummary, the OpenMetrics energy counters) would
+undercount. `every=` thins a stream at the hub's own interval. Consumers
+that work at any rate, such as the energy decorator, join a hub that is
+already running through `shared_hub()` instead of starting another.
+"""
+
+import queue
+import threading
+
+from .pacing import MIN_INTERVAL_S, PacingStats
+
+_hubs: dict = {}
+_hubs_lock = threading.Lock()
+# End-of-stream markers in the subscription queues.
+_CLOSED = object()
+_FAILED = object()
+# How long _detach() waits for the stopped hub thread. The deadline wait
+# ends as soon as the stop event is set, so this only bounds a subsampled
+# interval already in progress; the thread closes its Monitor when it returns.
+_STOP_GRACE_S = 0.25
+
+
+def get_hub(
+    interval_s: float = 1.0, subsamples: int = 1, overrun: str = "skip"
+) -> "SamplerHub":
+    """The process's SamplerHub for this sampling configuration (one per
+    configuration, not per process; see the module docstring)."""
+    key = (max(MIN_INTERVAL_S, float(interval_s)), max(1, int(subsamples)), overrun)
+    with _hubs_lock:
+        hub = _hubs.get(key)
+        if hub is None:
+            hub = _hubs[key] = SamplerHub(*key)
+        return hub
+
+
+def shared_hub(interval_s: float, max_interval_s: float) -> "SamplerHub":
+    """The fastest running hub at most max_interval_s, else get_hub(interval_s).
+
+    For consumers that only need some contiguous sample stream: joining a
+    sampler that is already running costs nothing extra.
+    """
+    with _hubs_lock:
+        running = [
+            hub
+            for hub in _hubs.values()
+            if hub.running and hub.interval_s <= max_interval_s
+        ]
+    if running:
+        return min(running, key=lambda hub: hub.interval_s)
+    return get_hub(interval_s)
+
+
+class Subscription:
+    """Base subscription: decimation and close(). Use as a context manager."""
+
+    def __init__(self, hub, every=1):
+        if every < 1:
+            raise ValueError("every must be >= 1, got {!r}".format(every))
+        self._hub = hub
+        self._every = int(every)
+        self._seen = 0
+        self.closed = False
+        self.error = None  # the sampler's exception, once it has failed
+
+    def _offer(self, snapshot):
+        self._seen += 1
+        if self._seen % self._every == 0:
+            self._deliver(snapshot)
+
+    def _deliver(self, snapshot):
+        raise NotImplementedError
+
+    def _fail(self, error):
+        """Called on the hub thread when the sampler raised; the hub has
+        already dropped this subscription."""
+        self.closed = True
+        self.error = error
+
+    def close(self):
+        """Stop receiving snapshots; idempotent. No delivery to this
+        subscription is in progress once it returns (except when called from
+        the hub thread itself, i.e. from inside a callback)."""
+        if not self.closed:
+            self.closed = True
+            self._hub._detach(self)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        self.close()
+
+
+class QueueSubscription(Subscription):
+    """Snapshots in a bounded queue. The hub never blocks on a slow
+    consumer: when the queue is full the oldest snapshot is dropped (and
+    counted in `dropped`)."""
+
+    def __init__(self, hub, maxsize=64, every=1):
+        super().__init__(hub, every)
+        self._queue = queue.Queue(maxsize=max(1, int(maxsize)))
+        self.dropped = 0
+
+    def _deliver(self, snapshot):
+        while True:
+            try:
+                self._queue.put_nowait(snapshot)
+                return
+            except queue.Full:
+                try:
+                    self._queue.get_nowait()
+                    self.dropped += 1
+                except queue.Empty:
+                    pass
+
+    def _fail(self, error):
+        super()._fail(error)
+        self._deliver(_FAILED)
+
+    def get(self, timeout=None):
+        """Next snapshot; raises queue.Empty after timeout seconds, or the
+        sampler's exception once the snapshots before it are consumed."""
+        snapshot = self._queue.get(timeout=timeout)
+        if snapshot is _FAILED:
+            self._queue.put_nowait(_FAILED)  # and on every later get()
+            raise self.error
+        return snapshot
+
+
+class CallbackSubscription(Subscription):
+    """callback(snapshot) on the hub thread; keep it short, it delays the
+    other subscribers. An exception from it is counted in `errors` and
+    otherwise ignored, so one consumer cannot stop the hub."""
+
+    def __init__(self, hub, callback, every=1):
+        super().__init__(hub, every)
+        self._callback = callback
+        self.errors = 0
+
+    def _deliver(self, snapshot):
+        try:
+            self._callback(snapshot)
+        except Exception:
+            self.errors += 1
+
+
+class AsyncSubscription(Subscription):
+    """Async iterator of snapshots, bound to the running event loop.
+
+    Snapshots cross into the loop with call_soon_threadsafe; as with
+    QueueSubscription, the oldest is dropped when `maxsize` are waiting.
+    Iteration ends once the subscription is closed.
+    """
+
+    def __init__(self, hub, loop, maxsize=64, every=1):
+        import asyncio
+
+        super().__init__(hub, every)
+        self._loop = loop
+        self._queue = asyncio.Queue()
+        self._maxsize = max(1, int(maxsize))
+        self.dropped = 0
+
+    def _deliver(self, snapshot):
+        try:
+            self._loop.call_soon_threadsafe(self._put, snapshot)
+        except RuntimeError:
+            pass  # loop closed
+
+    def _put(self, snapshot):
+        end = snapshot is _CLOSED or snapshot is _FAILED
+        if not end and self._queue.qsize() >= self._maxsize:
+            self._queue.get_nowait()
+            self.dropped += 1
+        self._queue.put_nowait(snapshot)
+
+    def _fail(self, error):
+        super()._fail(error)
+        self._deliver(_FAILED)
+
+    def close(self):
+        if not self.closed:
+            super().close()
+            self._deliver(_CLOSED)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if self.closed and self._queue.empty():
+            if self.error is not None:
+                raise self.error
+            raise StopAsyncIteration
+        snapshot = await self._queue.get()
+        if snapshot is _CLOSED:
+            raise StopAsyncIteration
+        if snapshot is _FAILED:
+            raise self.error
+        return snapshot
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *_):
+        self.close()
+
+
+class SamplerHub:
+    """One Monitor and sampling thread, fanned out to subscriptions.
+
+    Get it from get_hub() rather than constructing one, so that consumers
+    with the same configuration share it.
+    """
+
+    def __init__(self, interval_s=1.0, subsamples=1, overrun="skip"):
+        self.interval_s = interval_s
+        self.subsamples = subsamples
+        self.overrun = overrun
+        self._lock = threading.Lock()
+        # Held for each fan-out, so _detach() can wait out a delivery.
+        self._delivering = threading.RLock()
+        self._subscribers: tuple = ()  # replaced, never mutated
+        self._monitor = None
+        self._thread: threading.Thread | None = None
+        self._stop_event: threading.Event | None = None
+        self.error = None  # the exception that last stopped the sampler
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscribers)
+
+    @property
+    def pacing_stats(self) -> PacingStats:
+        """PacingStats of the running sampler (zeros while stopped)."""
+        monitor = self._monitor
+        if monitor is None:
+            return PacingStats(0, 0, 0, 0.0, 0.0)
+        return monitor.pacing_stats
+
+    def subscribe_queue(self, maxsize: int = 64, every: int = 1) -> QueueSubscription:
+        return self._attach(QueueSubscription(self, maxsize, every))
+
+    def subscribe_callback(self, callback, every: int = 1) -> CallbackSubscription:
+        return self._attach(CallbackSubscription(self, callback, every))
+
+    def subscribe_async(self, maxsize: int = 64, every: int = 1) -> AsyncSubscription:
+        """Call from a coroutine: the subscription feeds the running loop."""
+        import asyncio
+
+        loop = asyncio.get_running_loop()
+        return self._attach(AsyncSubscription(self, loop, maxsize, every))
+
+    def _attach(self, subscription):
+        from .api import Monitor
+
+        with self._lock:
+            if self._thread is None:
+                # Opening the sampler may raise (e.g. off Apple Silicon); the
+                # caller gets the error and nothing is left running.
+                self._monitor = Monitor(self.interval_s, self.subsamples, self.overrun)
+                self.error = None
+                self._stop_event = threading.Event()
+                self._thread = threading.Thread(
+                    target=self._run,
+                    args=(self._monitor, self._stop_event),
+                    name="actop-hub",
+                    daemon=True,
+                )
+                self._thread.start()
+            self._subscribers = self._subscribers + (subscription,)
+        return subscription
+
+    def _detach(self, subscription):
+        with self._delivering:
+            with self._lock:
+                self._subscribers = tuple(
+                    s for s in self._subscribers if s is not subscription
+                )
+                if self._subscribers or self._thread is None:
+                    return
+                thread, self._thread = self._thread, None
+                self._monitor = None
+                self._stop_event.set()
+        if thread is not threading.current_thread():
+            thread.join(_STOP_GRACE_S)
+
+    def _run(self, monitor, stop_event):
+        try:
+            while not stop_event.is_set():
+                try:
+                    snapshot = monitor.get_snapshot(stop_event)
+                except Exception as exc:
+                    self._fail(exc, stop_event)
+                    return
+                if snapshot is None:
+                    break
+                with self._delivering:
+                    # Re-checked under the lock: once _detach() has stopped
+                    # this thread, a new one may already own the subscribers.
+                    if stop_event.is_set():
+                        break
+                    for subscription in self._subscribers:
+                        subscription._offer(snapshot)
+        finally:
+            monitor.close()
+
+    def _fail(self, error, stop_event):
+        """Stop after a sampler error and hand it to every subscriber, so
+        none waits forever; a later _attach() starts a new thread."""
+        with self._delivering:
+            with self._lock:
+                if stop_event.is_set():
+                    return  # stopped meanwhile; the error is moot
+                stop_event.set()
+                subscribers, self._subscribers = self._subscribers, ()
+                self._thread = None
+                self._monitor = None
+                self.error = error
+            for subscription in subscribers:
+                subscription._fail(error)
@@ -7,6 +7,7 @@ requiring sudo or a powermetrics subprocess.
 
 import ctypes
 import sys
+from array import array
 from collections import namedtuple
 
 _DARWIN = sys.platform == "darwin"
@@ -153,25 +154,73 @@ def cf_release(ref):
     _cf.CFRelease(ref)
 
 
+# state_names: the channel's interned state-name tuple, shared by every delta
+# of a subscription (None for items built by hand, e.g. replays and tests).
+# state_residencies is a list of (name, ns) tuples, or with
+# delta(residency_format="array") an array('q') of ns aligned with state_names.
 IOReportItem = namedtuple(
     "IOReportItem",
-    ["group", "subgroup", "channel", "unit", "integer_value", "state_residencies"],
+    [
+        "group",
+        "subgroup",
+        "channel",
+        "unit",
+        "integer_value",
+        "state_residencies",
+        "state_names",
+    ],
+    defaults=(None,),
 )
 
+RESIDENCY_FORMATS = ("tuples", "array")
 
-def get_residencies(item_raw):
+
+def residency_pairs(item):
+    """Return an item's (name, ns) residency pairs, whichever form it holds."""
+    residencies = item.state_residencies
+    if isinstance(residencies, list):
+        return residencies
+    if not residencies:
+        return []  # state-less channel: no names to pair with
+    return list(zip(item.state_names, residencies))
+
+
+# Per-channel metadata resolved once per subscription (see
+# IOReportSubscription._channel_table). keep_states caches the delta()
+# extract_states decision for the channel.
+_ChannelMeta = namedtuple(
+    "_ChannelMeta", ["group", "subgroup", "channel", "unit", "keep_states"]
+)
+
+
+def get_state_names(item_raw, count=None):
+    """Read a state channel's state names as a tuple of interned strings.
+
+    State names ("V0P3", "IDLE", "32GB/s") are fixed per channel, so callers
+    resolve them once and pass the tuple back to get_residencies().
+    """
+    if count is None:
+        count = _ior.IOReportStateGetCount(item_raw)
+    return tuple(
+        sys.intern(from_cfstr(_ior.IOReportStateGetNameForIndex(item_raw, i)))
+        for i in range(count)
+    )
+
+
+def get_residencies(item_raw, state_names=None):
     """Get state residencies from a raw IOReport channel item pointer.
 
+    state_names: the channel's tuple from get_state_names(); when it matches
+    the current state count only the residency integers are read. Otherwise
+    names are resolved afresh.
+
     Returns list of (state_name, residency_ns) tuples.
     """
     count = _ior.IOReportStateGetCount(item_raw)
-    result = []
-    for i in range(count):
-        name_ref = _ior.IOReportStateGetNameForIndex(item_raw, i)
-        name = from_cfstr(name_ref)
-        residency = _ior.IOReportStateGetResidency(item_raw, i)
-        result.append((name, residency))
-    return result
+    if state_names is None or len(state_names) != count:
+        state_names = get_state_names(item_raw, count)
+    residency = _ior.IOReportStateGetResidency
+    return [(state_names[i], residency(item_raw, i)) for i in range(count)]
 
 
 class IOReportSubscription:
@@ -216,6 +265,13 @@ class IOReportSubscription:
             raise RuntimeError("IOReport: failed to create subscription")
         # IOReportCreateSamples needs the return value, not the output param
         self._subscription = result
+        # Channel-index -> _ChannelMeta table, reused across deltas; rebuilt
+        # when the channel count, order, or extract_states filter changes.
+        # _state_names runs parallel to it: each state channel's interned
+        # name tuple, filled on its first delta.
+        self._table = None
+        self._table_filter = None
+        self._state_names = []
 
     def sample(self):
         """Take a sample snapshot. Returns a raw CFDictRef.
@@ -224,7 +280,7 @@ class IOReportSubscription:
         """
         return _ior.IOReportCreateSamples(self._subscription, self._channels, None)
 
-    def delta(self, s1, s2, extract_states=None):
+    def delta(self, s1, s2, extract_states=None, residency_format="tuples"):
         """Compute delta between two samples.
 
         All data is extracted into Python objects before the C delta reference
@@ -238,9 +294,24 @@ class IOReportSubscription:
                 channels we don't parse (e.g. the ~90 PMP/DCS BW channels we
                 ignore), keeping the sampler within its idle-CPU budget. When
                 None (default), states are extracted for every channel.
+            residency_format: "tuples" (default) returns ``state_residencies``
+                as (name, ns) pairs; "array" returns an ``array('q')`` of ns
+                aligned with ``state_names``, for vectorized consumers.
+
+        Channel metadata (names, unit, the extract_states verdict) is resolved
+        on the first delta and reused afterwards; see _channel_table. State
+        names are interned per channel the same way, so later deltas read
+        only the residency integers (a changed state count re-resolves them).
 
         Returns list of IOReportItem namedtuples.
         """
+        if residency_format not in RESIDENCY_FORMATS:
+            raise ValueError(
+                "residency_format must be one of {}, got {!r}".format(
+                    RESIDENCY_FORMATS, residency_format
+                )
+            )
+        as_array = residency_format == "array"
         delta_ref = _ior.IOReportCreateSamplesDelta(s1, s2, None)
         if not delta_ref:
             return []
@@ -257,25 +328,38 @@ class IOReportSubscription:
                 return items
 
             count = _cf.CFArrayGetCount(array_ref)
+            table = self._channel_table(array_ref, count, extract_states)
+            state_names_by_index = self._state_names
+            residency = _ior.IOReportStateGetResidency
             for i in range(count):
                 item_ref = _cf.CFArrayGetValueAtIndex(array_ref, i)
                 if not item_ref:
                     continue
+                meta = table[i]
+                if meta is None:
+                    # NULL when the table was built; resolve it on first sight.
+                    meta = table[i] = _channel_meta(item_ref, extract_states)
 
-                group = from_cfstr(_ior.IOReportChannelGetGroup(item_ref))
-                subgroup = from_cfstr(_ior.IOReportChannelGetSubGroup(item_ref))
-                channel = from_cfstr(_ior.IOReportChannelGetChannelName(item_ref))
-                unit = from_cfstr(_ior.IOReportChannelGetUnitLabel(item_ref))
+                group, subgroup, channel, unit, keep_states = meta
                 integer_value = _ior.IOReportSimpleGetIntegerValue(item_ref, 0)
 
-                state_residencies = []
-                if extract_states is None or extract_states(group, subgroup, channel):
+                state_residencies = array("q") if as_array else []
+                state_names = None
+                if keep_states:
                     state_count = _ior.IOReportStateGetCount(item_ref)
-                    for j in range(state_count):
-                        name_ref = _ior.IOReportStateGetNameForIndex(item_ref, j)
-                        name = from_cfstr(name_ref)
-                        residency = _ior.IOReportStateGetResidency(item_ref, j)
-                        state_residencies.append((name, residency))
+                    state_names = state_names_by_index[i]
+                    if state_names is None or len(state_names) != state_count:
+                        state_names = get_state_names(item_ref, state_count)
+                        state_names_by_index[i] = state_names
+                    if as_array:
+                        state_residencies = array(
+                            "q", [residency(item_ref, j) for j in range(state_count)]
+                        )
+                    else:
+                        state_residencies = [
+                            (state_names[j], residency(item_ref, j))
+                            for j in range(state_count)
+                        ]
 
                 items.append(
                     IOReportItem(
@@ -285,6 +369,7 @@ class IOReportSubscription:
                         unit=unit,
                         integer_value=integer_value,
                         state_residencies=state_residencies,
+                        state_names=state_names,
                     )
                 )
         finally:
@@ -292,6 +377,36 @@ class IOReportSubscription:
 
         return items
 
+    def _channel_table(self, array_ref, count, extract_states):
+        """Return the channel-index -> _ChannelMeta table for this delta.
+
+        The channel set is fixed for the life of a subscription and every delta
+        lists it in the same order, so the four from_cfstr round-trips (group,
+        subgroup, channel, unit) and the extract_states decision are resolved
+        once instead of per channel per sample. A changed count or filter, or
+        a channel-name mismatch at either end of the array (a cheap order
+        check: two lookups, not 4N), triggers a rebuild. A channel that is NULL
+        at build time keeps a None slot, which delta() fills the first time
+        the channel is present.
+        """
+        table = self._table
+        if (
+            table is not None
+            and len(table) == count
+            and self._table_filter is extract_states
+            and _table_ends_match(array_ref, table)
+        ):
+            return table
+
+        table = []
+        for i in range(count):
+            item_ref = _cf.CFArrayGetValueAtIndex(array_ref, i)
+            table.append(_channel_meta(item_ref, extract_states) if item_ref else None)
+        self._table = table
+        self._table_filter = extract_states
+        self._state_names = [None] * count
+        return table
+
     def close(self):
         """Release subscription resources."""
         if self._subscription is not None:
@@ -300,3 +415,34 @@ class IOReportSubscription:
         if self._channels is not None:
             cf_release(self._channels)
             self._channels = None
+        self._table = None
+        self._table_filter = None
+        self._state_names = []
+
+
+def _channel_meta(item_ref, extract_states):
+    """Resolve one channel's names, unit and extract_states verdict."""
+    group = from_cfstr(_ior.IOReportChannelGetGroup(item_ref))
+    subgroup = from_cfstr(_ior.IOReportChannelGetSubGroup(item_ref))
+    channel = from_cfstr(_ior.IOReportChannelGetChannelName(item_ref))
+    unit = from_cfstr(_ior.IOReportChannelGetUnitLabel(item_ref))
+    keep_states = extract_states is None or bool(
+        extract_states(group, subgroup, channel)
+    )
+    return _ChannelMeta(group, subgroup, channel, unit, keep_states)
+
+
+def _table_ends_match(array_ref, table):
+    """Spot-check a cached channel table against the first and last channels."""
+    if not table:
+        return True
+    for i in {0, len(table) - 1}:
+        meta = table[i]
+        if meta is None:
+            continue
+        item_ref = _cf.CFArrayGetValueAtIndex(array_ref, i)
+        if not item_ref:
+            return False
+        if from_cfstr(_ior.IOReportChannelGetChannelName(item_ref)) != meta.channel:
+            return False
+    return True
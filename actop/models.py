@@ -52,3 +52,17 @@ class SystemSnapshot:
     ecpu_residency_pct: dict = field(default_factory=_default_residency)
     pcpu_residency_pct: dict = field(default_factory=_default_residency)
     gpu_residency_pct: dict = field(default_factory=_default_residency)
+    # Lowest / highest subsample reading within this interval, keyed by field
+    # name: cpu_watts, gpu_watts, ane_watts, package_watts, ecpu_util_pct,
+    # pcpu_util_pct, gpu_util_pct, bandwidth_gbps. With subsamples > 1 these
+    # expose spikes the interval mean averages away; with a single sample
+    # both equal the reading itself.
+    interval_min: dict = field(default_factory=dict)
+    interval_max: dict = field(default_factory=dict)
+    # Measured time this snapshot's deltas cover (s); the watts above are
+    # energy over this span. 0.0 when not produced by a sampler.
+    elapsed_s: float = 0.0
+    # time.monotonic() at the end of that span, so the snapshot covers
+    # [monotonic_s - elapsed_s, monotonic_s]; Profiler spans are placed on
+    # this clock. 0.0 when not produced by a sampler.
+    monotonic_s: float = 0.0
@@ -0,0 +1,137 @@
+"""Drift-free deadline pacing for the sampling loops.
+
+A loop that sleeps a fixed interval after each tick's work runs with period
+interval + work: a 1 s NDJSON stream that spends 40 ms sampling and scanning
+processes falls a full tick behind every 25 s. `DeadlineTicker` instead
+schedules tick k at start + k·interval on the monotonic clock and sleeps only
+for whatever remains of the current interval, so per-tick work no longer
+accumulates into drift.
+
+When a tick's work overruns the interval, the overrun policy decides what
+happens to the deadlines already missed:
+
+- "skip" drops them and waits for the next deadline still ahead, keeping
+  the original phase (a slow tick costs samples, not alignment).
+- "catch-up" fires the missed ticks back-to-back until the schedule is met
+  again, keeping the tick count (a slow tick costs spacing, not samples).
+"""
+
+import time
+from typing import NamedTuple
+
+OVERRUN_POLICIES = ("skip", "catch-up")
+# Shortest sampling interval Monitor and the CLI accept (s). Below this the
+# IOReport sample/delta work is a large share of each tick.
+MIN_INTERVAL_S = 0.05
+
+
+class PacingStats(NamedTuple):
+    ticks: int  # deadlines waited on
+    overruns: int  # ticks whose deadline had already passed when waited on
+    skipped: int  # deadlines dropped by the "skip" policy
+    mean_jitter_s: float  # mean wake-up lateness past the deadline
+    max_jitter_s: float
+
+
+class DeadlineTicker:
+    """Monotonic deadline scheduler shared by Monitor, the sampler's subsample
+    loop and every front end built on them (Profiler, exporters, TUI).
+
+    The first deadline is one interval after construction (or reset()).
+    clock/sleep are injectable for deterministic tests.
+    """
+
+    def __init__(
+        self,
+        interval_s: float,
+        overrun: str = "skip",
+        clock=time.monotonic,
+        sleep=time.sleep,
+    ):
+        if interval_s <= 0:
+            raise ValueError("interval_s must be > 0, got {!r}".format(interval_s))
+        if overrun not in OVERRUN_POLICIES:
+            raise ValueError(
+                "overrun must be one of {}, got {!r}".format(OVERRUN_POLICIES, overrun)
+            )
+        self._interval = float(interval_s)
+        self._overrun = overrun
+        self._clock = clock
+        self._sleep = sleep
+        self._ticks = 0
+        self._overruns = 0
+        self._skipped = 0
+        self._jitter_sum = 0.0
+        self._jitter_max = 0.0
+        self.reset()
+
+    @property
+    def interval_s(self) -> float:
+        return self._interval
+
+    @property
+    def overrun(self) -> str:
+        return self._overrun
+
+    @property
+    def stats(self) -> PacingStats:
+        ticks = self._ticks
+        return PacingStats(
+            ticks=ticks,
+            overruns=self._overruns,
+            skipped=self._skipped,
+            mean_jitter_s=self._jitter_sum / ticks if ticks else 0.0,
+            max_jitter_s=self._jitter_max,
+        )
+
+    def reset(self):
+        """Restart the schedule: the next deadline is one interval from now."""
+        self._deadline = self._clock() + self._interval
+
+    def wait(self, stop_event=None) -> bool:
+        """Block until the next deadline; returns False if stop_event fired.
+
+        stop_event: optional threading.Event; when given, the wait ends early
+        as soon as it is set so loops can shut down without a full interval.
+        """
+        now = self._clock()
+        remaining = self._deadline - now
+        if remaining > 0:
+            if stop_event is not None:
+                if stop_event.wait(remaining):
+                    return False
+            else:
+                self._sleep(remaining)
+            now = self._clock()
+        elif remaining < 0:
+            self._overruns += 1
+        self._advance(now)
+        return True
+
+    async def wait_async(self) -> None:
+        """wait() for asyncio code: sleeps on the event loop with
+        asyncio.sleep, so no thread is held while waiting."""
+        import asyncio
+
+        now = self._clock()
+        remaining = self._deadline - now
+        if remaining > 0:
+            await asyncio.sleep(remaining)
+            now = self._clock()
+        elif remaining < 0:
+            self._overruns += 1
+        self._advance(now)
+
+    def _advance(self, now):
+        """Record the tick taken at `now` and schedule the next deadline."""
+        lateness = max(0.0, now - self._deadline)
+        self._ticks += 1
+        self._jitter_sum += lateness
+        if lateness > self._jitter_max:
+            self._jitter_max = lateness
+
+        self._deadline += self._interval
+        if self._overrun == "skip" and self._deadline <= now:
+            missed = int((now - self._deadline) // self._interval) + 1
+            self._deadline += missed * self._interval
+            self._skipped += missed
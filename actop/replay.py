@@ -0,0 +1,258 @@
+"""Record and replay raw IOReport deltas so the pipeline can run off-device.
+
+A recording captures what `IOReportSampler` pulls off the hardware each cycle —
+the `IOReportItem` list returned by `IOReportSubscription.delta()`, the measured
+elapsed time, SMC die temperatures and thermal pressure — plus the per-machine
+constants needed to interpret them (DVFS tables, core counts). `ReplaySampler`
+feeds a recording back through the unmodified conversion path
+(`IOReportSampler._convert`), so `Monitor`, `Profiler`, the exporters and the
+TUI run end-to-end on Linux CI, at full speed, against real M1–M4 captures.
+
+File format: gzip-compressed JSON lines. The first line is a header, every
+following line is one delta frame. Channel names repeat every frame and gzip
+folds them away, so a capture stays compact without a bespoke encoding.
+Nothing here touches IOReport or CoreFoundation; the module imports cleanly on
+any platform.
+"""
+
+import gzip
+import json
+import time
+import weakref
+from array import array
+from typing import NamedTuple
+
+from .ioreport import IOReportItem, residency_pairs
+from .sampler import IOReportSampler
+
+RECORDING_FORMAT = "actop-recording"
+RECORDING_VERSION = 1
+
+
+class ReplayFrame(NamedTuple):
+    elapsed_s: float
+    items: list  # list[IOReportItem]
+    cpu_temp_c: float
+    gpu_temp_c: float
+    thermal_pressure: str
+
+
+class Recording(NamedTuple):
+    header: dict  # interval, dvfs tables, core counts
+    frames: list  # list[ReplayFrame]
+
+
+class SampleRecorder:
+    """Append IOReport delta frames to a recording file.
+
+    The file stays open for the sampler's lifetime. If the recorder is
+    dropped or the process exits without close() (a sampler that crashed),
+    a finalizer still closes it, so the gzip member is completed and the
+    frames written so far load.
+    """
+
+    def __init__(self, path, interval, dvfs, core_counts):
+        # Long-lived handle, closed by close() or the finalizer below.
+        self._fp = gzip.open(path, "wt", encoding="utf-8", compresslevel=6)  # noqa: SIM115
+        self._finalizer = weakref.finalize(self, self._fp.close)
+        header = {
+            "format": RECORDING_FORMAT,
+            "version": RECORDING_VERSION,
+            "created": time.time(),
+            "interval": interval,
+            "dvfs": {key: list(value) for key, value in dvfs.items()},
+            "core_counts": dict(core_counts),
+        }
+        self._write(header)
+
+    def write_frame(
+        self, elapsed_s, items, cpu_temp_c=0.0, gpu_temp_c=0.0, thermal_pressure=""
+    ):
+        """Record one delta: the items plus the side readings taken with it."""
+        self._write(
+            {
+                "elapsed_s": elapsed_s,
+                "cpu_temp_c": cpu_temp_c,
+                "gpu_temp_c": gpu_temp_c,
+                "thermal_pressure": thermal_pressure,
+                "items": [_encode_item(item) for item in items],
+            }
+        )
+
+    def close(self):
+        self._finalizer()
+        self._fp = None
+
+    def _write(self, record):
+        self._fp.write(json.dumps(record, separators=(",", ":")) + "\n")
+
+
+def load_recording(path, residency_format="tuples") -> Recording:
+    """Read a recording file fully into memory.
+
+    residency_format: "tuples" decodes state residencies as (name, ns) pairs;
+    "array" (or "numpy") as array('q') aligned with state_names, matching
+    IOReportSubscription.delta(residency_format="array").
+
+    Raises ValueError when the file is not an actop recording (or is a newer
+    format version than this build understands).
+    """
+    with gzip.open(path, "rt", encoding="utf-8") as fp:
+        first = fp.readline()
+        if not first:
+            raise ValueError("empty recording: {}".format(path))
+        header = json.loads(first)
+        if header.get("format") != RECORDING_FORMAT:
+            raise ValueError("not an actop recording: {}".format(path))
+        if int(header.get("version", 0)) > RECORDING_VERSION:
+            raise ValueError(
+                "unsupported recording version {}".format(header.get("version"))
+            )
+        state_names = {}
+        as_array = residency_format != "tuples"
+        frames = [
+            _decode_frame(json.loads(line), state_names, as_array)
+            for line in fp
+            if line.strip()
+        ]
+    return Recording(header=header, frames=frames)
+
+
+class ReplaySampler(IOReportSampler):
+    """Sampler that replays a recording instead of reading IOReport.
+
+    Implements the same `sample()` / `close()` / `manages_timing` contract as
+    `IOReportSampler` (the first `sample()` primes and returns None), but never
+    sleeps: each call converts the next recorded frame immediately, so callers
+    run at full speed. With `loop=True` the recording wraps around; otherwise
+    `sample()` raises EOFError once it is exhausted.
+    """
+
+    def __init__(
+        self, source, interval=None, subsamples=1, loop=True, residency_format="tuples"
+    ):
+        if isinstance(source, Recording):
+            recording = source
+        else:
+            recording = load_recording(source, residency_format)
+        if not recording.frames:
+            raise ValueError("recording has no frames")
+        header = recording.header
+        dvfs = header.get("dvfs", {})
+        self._init_state(
+            interval if interval else header.get("interval", 1),
+            subsamples,
+            dict(header.get("core_counts", {})),
+            {key: list(dvfs.get(key, [])) for key in ("ecpu", "pcpu", "gpu")},
+            residency_format,
+        )
+        self._recording = recording
+        self._loop = loop
+        self._pos = 0
+        self._last_temps = (0.0, 0.0)
+        # Frames replay at full speed, so their monotonic_s comes from a
+        # virtual clock advanced by each frame's recorded elapsed time.
+        self._clock = time.monotonic()
+
+    @property
+    def manages_timing(self):
+        return True
+
+    @property
+    def recording(self) -> Recording:
+        return self._recording
+
+    def _pace(self, seconds):
+        pass
+
+    def _sample_once(self, include_temperatures):
+        if self._prev_sample is None:
+            # sample() tests _prev_sample for priming, as in the live sampler.
+            self._prev_sample = _PRIMED
+            return None
+
+        frame = self._next_frame()
+        self._last_temps = (frame.cpu_temp_c, frame.gpu_temp_c)
+        if frame.elapsed_s <= 0:
+            return None
+        self._clock += frame.elapsed_s
+
+        if include_temperatures:
+            cpu_temp, gpu_temp = self._last_temps
+        else:
+            cpu_temp = 0.0
+            gpu_temp = 0.0
+        return self._convert(
+            frame.items,
+            frame.elapsed_s,
+            cpu_temp,
+            gpu_temp,
+            thermal_pressure=frame.thermal_pressure,
+            monotonic_s=self._clock,
+        )
+
+    def _next_frame(self):
+        frames = self._recording.frames
+        if self._pos >= len(frames):
+            if not self._loop:
+                raise EOFError("replay recording exhausted")
+            self._pos = 0
+        frame = frames[self._pos]
+        self._pos += 1
+        return frame
+
+    def _read_temperatures(self):
+        return self._last_temps
+
+    def close(self):
+        self._prev_sample = None
+
+
+_PRIMED = object()
+
+
+def _encode_item(item):
+    return [
+        item.group,
+        item.subgroup,
+        item.channel,
+        item.unit,
+        item.integer_value,
+        [[name, ns] for name, ns in residency_pairs(item)],
+    ]
+
+
+def _decode_frame(record, state_names, as_array=False):
+    """Rebuild one frame's IOReportItems.
+
+    state_names maps each state-name tuple to one shared instance across
+    frames, mirroring the interned IOReportItem.state_names of a live
+    subscription so the sampler's per-channel plan cache hits the same way.
+    """
+    items = []
+    for group, subgroup, channel, unit, integer_value, residencies in record["items"]:
+        state_residencies = [(name, ns) for name, ns in residencies]
+        names = None
+        if state_residencies:
+            names = tuple(name for name, _ in state_residencies)
+            names = state_names.setdefault(names, names)
+        if as_array:
+            state_residencies = array("q", [ns for _, ns in residencies])
+        items.append(
+            IOReportItem(
+                group=group,
+                subgroup=subgroup,
+                channel=channel,
+                unit=unit,
+                integer_value=integer_value,
+                state_residencies=state_residencies,
+                state_names=names,
+            )
+        )
+    return ReplayFrame(
+        elapsed_s=float(record["elapsed_s"]),
+        items=items,
+        cpu_temp_c=float(record.get("cpu_temp_c", 0.0)),
+        gpu_temp_c=float(record.get("gpu_temp_c", 0.0)),
+        thermal_pressure=record.get("thermal_pressure") or "Unknown",
+    )
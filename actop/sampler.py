@@ -1,27 +1,161 @@
 """Unified metrics sampler with IOReport backend."""
 
+import dataclasses
+import os
 import re
 import time
-from collections import defaultdict
+from array import array
+from dataclasses import dataclass, field
+from itertools import compress
+from operator import add, attrgetter, mul
 from typing import NamedTuple
 
 from .native_sys import get_dvfs_tables_native, get_thermal_pressure
+from .pacing import DeadlineTicker
 
 
-class SampleResult(NamedTuple):
-    cpu_metrics: dict
-    gpu_metrics: dict
+@dataclass(slots=True)
+class SampleResult:
+    """One converted IOReport sample, as typed fields.
+
+    Per-core values are parallel arrays per cluster (system core index, active
+    %, MHz), so nothing on the sampler -> SystemSnapshot path formats or hashes
+    per-core key strings. `cpu_metrics` / `gpu_metrics` / `bandwidth_metrics`
+    rebuild the legacy parsers.py-style dicts on first access, for callers
+    that still read them.
+    """
+
+    # Average power over the measured elapsed time of the delta(s) (W), so a
+    # late tick or a sub-second interval does not distort it.
+    cpu_w: float
+    gpu_w: float
+    ane_w: float
+    package_w: float
+    elapsed_s: float  # measured time covered by the sample (s)
+    interval_s: float  # nominal sampling interval (s)
+    e_core_index: tuple  # system core indices, ascending
+    e_core_active_pct: array  # array('i'), parallel to e_core_index
+    e_core_freq_mhz: array  # array('i'), parallel to e_core_index
+    p_core_index: tuple
+    p_core_active_pct: array
+    p_core_freq_mhz: array
+    ecpu_active_pct: int  # cluster mean of the per-core active %
+    ecpu_freq_mhz: int  # cluster max of the per-core frequencies
+    ecpu_max_freq_mhz: int  # DVFS ceiling from the frequency table
+    pcpu_active_pct: int
+    pcpu_freq_mhz: int
+    pcpu_max_freq_mhz: int
+    gpu_active_pct: int
+    gpu_freq_mhz: int
+    gpu_max_freq_mhz: int
+    # idle/low/mid/high time-in-state shares over the interval (see
+    # _bucket_percentages)
+    ecpu_residency_pct: dict
+    pcpu_residency_pct: dict
+    gpu_residency_pct: dict
+    bandwidth_gbps: float
+    bandwidth_available: bool
     thermal_pressure: str
-    bandwidth_metrics: dict
     timestamp: float
     cpu_temp_c: float = 0.0  # max CPU die temperature (Celsius), 0 if unavailable
     gpu_temp_c: float = 0.0  # max GPU die temperature (Celsius), 0 if unavailable
+    monotonic_s: float = 0.0  # monotonic clock at the end of the measured delta
+    # With subsamples > 1: lowest / highest subsample value of each
+    # _EXTREME_FIELDS field over the interval, keyed by field name, so spikes
+    # the mean would flatten stay visible. None for a single-shot sample.
+    interval_min: dict = None
+    interval_max: dict = None
+    _cpu_metrics: dict = field(default=None, init=False, repr=False, compare=False)
+    _gpu_metrics: dict = field(default=None, init=False, repr=False, compare=False)
+    _bandwidth_metrics: dict = field(
+        default=None, init=False, repr=False, compare=False
+    )
+
+    def _replace(self, **changes):
+        return dataclasses.replace(self, **changes)
+
+    @property
+    def cpu_metrics(self) -> dict:
+        """Legacy parsers.py-style CPU dict (built once, then cached)."""
+        if self._cpu_metrics is None:
+            cm = {
+                "E-Cluster_active": self.ecpu_active_pct,
+                "E-Cluster_freq_MHz": self.ecpu_freq_mhz,
+                "E-Cluster_max_freq_MHz": self.ecpu_max_freq_mhz,
+                "P-Cluster_active": self.pcpu_active_pct,
+                "P-Cluster_freq_MHz": self.pcpu_freq_mhz,
+                "P-Cluster_max_freq_MHz": self.pcpu_max_freq_mhz,
+                "E-Cluster_residency_pct": self.ecpu_residency_pct,
+                "P-Cluster_residency_pct": self.pcpu_residency_pct,
+                # parsers.py convention: energy over the nominal interval (J),
+                # i.e. the value callers divide by the interval for watts.
+                "ane_W": self.ane_w * self.interval_s,
+                "cpu_W": self.cpu_w * self.interval_s,
+                "gpu_W": self.gpu_w * self.interval_s,
+                "package_W": self.package_w * self.interval_s,
+                "e_core": list(self.e_core_index),
+                "p_core": list(self.p_core_index),
+            }
+            for prefix, indices, actives, freqs in (
+                (
+                    "E-Cluster",
+                    self.e_core_index,
+                    self.e_core_active_pct,
+                    self.e_core_freq_mhz,
+                ),
+                (
+                    "P-Cluster",
+                    self.p_core_index,
+                    self.p_core_active_pct,
+                    self.p_core_freq_mhz,
+                ),
+            ):
+                for idx, active, freq in zip(indices, actives, freqs):
+                    cm[prefix + str(idx) + "_active"] = active
+                    cm[prefix + str(idx) + "_freq_MHz"] = freq
+            self._cpu_metrics = cm
+        return self._cpu_metrics
+
+    @property
+    def gpu_metrics(self) -> dict:
+        """Legacy GPU dict (built once, then cached)."""
+        if self._gpu_metrics is None:
+            self._gpu_metrics = {
+                "freq_MHz": self.gpu_freq_mhz,
+                "max_freq_MHz": self.gpu_max_freq_mhz,
+                "active": self.gpu_active_pct,
+                "residency_pct": self.gpu_residency_pct,
+            }
+        return self._gpu_metrics
+
+    @property
+    def bandwidth_metrics(self) -> dict:
+        """Legacy bandwidth dict (built once, then cached)."""
+        if self._bandwidth_metrics is None:
+            self._bandwidth_metrics = {
+                "total_gbps": self.bandwidth_gbps,
+                "_available": self.bandwidth_available,
+            }
+        return self._bandwidth_metrics
+
+
+# How the sampler receives and reduces per-state residencies: "tuples" are
+# (name, ns) pairs walked in Python; "array" is array('q') reduced with
+# row-wise dot products; "numpy" is the same arrays through a NumPy matmul.
+RESIDENCY_FORMATS = ("tuples", "array", "numpy")
 
 
 class IOReportSampler:
     """Direct IOReport sampling. No sudo required."""
 
-    def __init__(self, interval, subsamples=1):
+    def __init__(
+        self,
+        interval,
+        subsamples=1,
+        record_path=None,
+        residency_format="tuples",
+        overrun="skip",
+    ):
         from .ioreport import IOReportSubscription
         from .smc import SMCReader
 
@@ -37,13 +171,56 @@ class IOReportSampler:
                 ("PMP", "DCS BW"),
             ]
         )
+        self._init_state(
+            interval,
+            subsamples,
+            _get_core_counts(),
+            get_dvfs_tables_native(),
+            residency_format,
+        )
+        self._smc = SMCReader()
+        self._overrun = overrun
+        if record_path:
+            from .replay import SampleRecorder
+
+            self._recorder = SampleRecorder(
+                record_path, interval, self._dvfs, self._core_counts
+            )
+
+    def _init_state(
+        self, interval, subsamples, core_counts, dvfs, residency_format="tuples"
+    ):
+        """Conversion state shared with backends that bypass IOReport (replay)."""
+        if residency_format not in RESIDENCY_FORMATS:
+            raise ValueError(
+                "residency_format must be one of {}, got {!r}".format(
+                    RESIDENCY_FORMATS, residency_format
+                )
+            )
+        self._residency_format = residency_format
+        self._np = None
+        self._dot = _dot_rows
+        if residency_format == "numpy":
+            try:
+                import numpy as np
+            except ImportError:
+                raise ImportError(
+                    "numpy is required for residency_format='numpy': pip install numpy"
+                )
+            self._np = np
+            self._dot = _numpy_dot_rows
         self._interval = interval
         self._subsamples = max(1, int(subsamples))
         self._prev_sample = None
         self._prev_time = None
-        self._core_counts = _get_core_counts()
-        self._dvfs = get_dvfs_tables_native()
-        self._smc = SMCReader()
+        self._core_counts = core_counts
+        self._dvfs = dvfs
+        self._plans = {}
+        self._recorder = None
+        # Subsample deadlines (see _pace), created on the first subsampled
+        # interval so its schedule starts after priming.
+        self._pacer = None
+        self._overrun = "skip"
 
     def sample(self):
         if self._subsamples <= 1:
@@ -54,18 +231,18 @@ class IOReportSampler:
             return None
 
         step_s = self._interval / float(self._subsamples)
-        parts = []
+        acc = _SubsampleAccumulator()
         for _ in range(self._subsamples):
-            time.sleep(step_s)
+            self._pace(step_s)
             part = self._sample_once(include_temperatures=False)
             if part is not None:
-                parts.append(part)
+                acc.add(part)
 
-        if not parts:
+        if not acc.count:
             return None
 
         cpu_temp, gpu_temp = self._read_temperatures()
-        return self._average_samples(parts)._replace(
+        return acc.result()._replace(
             cpu_temp_c=cpu_temp,
             gpu_temp_c=gpu_temp,
         )
@@ -74,6 +251,18 @@ class IOReportSampler:
     def manages_timing(self):
         return self._subsamples > 1
 
+    @property
+    def pacing_stats(self):
+        """PacingStats of the subsample deadlines, or None before the first."""
+        return self._pacer.stats if self._pacer is not None else None
+
+    def _pace(self, seconds):
+        # Subsample k is due at start + k·step on one continuous schedule, so
+        # the sampling work inside each step does not stretch the interval.
+        if self._pacer is None:
+            self._pacer = DeadlineTicker(seconds, self._overrun)
+        self._pacer.wait()
+
     def _sample_once(self, include_temperatures):
         from .ioreport import cf_release
 
@@ -85,7 +274,14 @@ class IOReportSampler:
             self._prev_time = new_time
             return None
 
-        items = self._sub.delta(self._prev_sample, new_sample, _keep_states)
+        items = self._sub.delta(
+            self._prev_sample,
+            new_sample,
+            _keep_states,
+            residency_format="tuples"
+            if self._residency_format == "tuples"
+            else "array",
+        )
         elapsed_s = new_time - self._prev_time
 
         cf_release(self._prev_sample)
@@ -95,13 +291,30 @@ class IOReportSampler:
         if elapsed_s <= 0:
             return None
 
-        if include_temperatures:
+        thermal_pressure = get_thermal_pressure()
+        if include_temperatures or self._recorder is not None:
             cpu_temp, gpu_temp = self._read_temperatures()
         else:
             cpu_temp = 0.0
             gpu_temp = 0.0
-
-        return self._convert(items, elapsed_s, cpu_temp, gpu_temp)
+        if self._recorder is not None:
+            # Recordings always carry temperatures so a replay can use any
+            # subsample setting, not just the one the capture ran with.
+            self._recorder.write_frame(
+                elapsed_s, items, cpu_temp, gpu_temp, thermal_pressure
+            )
+            if not include_temperatures:
+                cpu_temp = 0.0
+                gpu_temp = 0.0
+
+        return self._convert(
+            items,
+            elapsed_s,
+            cpu_temp,
+            gpu_temp,
+            thermal_pressure=thermal_pressure,
+            monotonic_s=new_time,
+        )
 
     def _read_temperatures(self):
         temps = self._smc.read_temperatures()
@@ -112,63 +325,28 @@ class IOReportSampler:
         return (cpu_temp, gpu_temp)
 
     def _average_samples(self, samples):
-        count = len(samples)
-        base = samples[-1]
-
-        cpu_metrics = {}
-        for key, value in base.cpu_metrics.items():
-            if isinstance(value, list):
-                cpu_metrics[key] = list(value)
-            elif isinstance(value, bool):
-                cpu_metrics[key] = value
-            elif isinstance(value, (int, float)):
-                avg = sum(float(s.cpu_metrics.get(key, 0.0)) for s in samples) / count
-                if _is_int_cpu_metric(key):
-                    cpu_metrics[key] = int(avg)
-                else:
-                    cpu_metrics[key] = avg
-            else:
-                cpu_metrics[key] = value
-
-        gpu_metrics = {}
-        for key, value in base.gpu_metrics.items():
-            if isinstance(value, bool):
-                gpu_metrics[key] = value
-            elif isinstance(value, (int, float)):
-                avg = sum(float(s.gpu_metrics.get(key, 0.0)) for s in samples) / count
-                if key in ("freq_MHz", "active"):
-                    gpu_metrics[key] = int(avg)
-                else:
-                    gpu_metrics[key] = avg
-            else:
-                gpu_metrics[key] = value
-
-        bandwidth_metrics = {}
-        for key, value in base.bandwidth_metrics.items():
-            if isinstance(value, bool):
-                bandwidth_metrics[key] = any(
-                    bool(s.bandwidth_metrics.get(key, False)) for s in samples
-                )
-            elif isinstance(value, (int, float)):
-                bandwidth_metrics[key] = (
-                    sum(float(s.bandwidth_metrics.get(key, 0.0)) for s in samples)
-                    / count
-                )
-            else:
-                bandwidth_metrics[key] = value
-
-        return SampleResult(
-            cpu_metrics=cpu_metrics,
-            gpu_metrics=gpu_metrics,
-            thermal_pressure=base.thermal_pressure,
-            bandwidth_metrics=bandwidth_metrics,
-            timestamp=base.timestamp,
-            cpu_temp_c=base.cpu_temp_c,
-            gpu_temp_c=base.gpu_temp_c,
-        )
+        """Fold a list of subsample results; see _SubsampleAccumulator."""
+        acc = _SubsampleAccumulator()
+        for part in samples:
+            acc.add(part)
+        return acc.result()
+
+    def _convert(
+        self,
+        items,
+        elapsed_s,
+        cpu_temp_c=0.0,
+        gpu_temp_c=0.0,
+        thermal_pressure=None,
+        monotonic_s=None,
+    ):
+        """Convert IOReport items to the same dict format as parsers.py output.
 
-    def _convert(self, items, elapsed_s, cpu_temp_c=0.0, gpu_temp_c=0.0):
-        """Convert IOReport items to the same dict format as parsers.py output."""
+        thermal_pressure: the reading taken alongside this delta; None reads
+        it now.
+        """
+        if thermal_pressure is None:
+            thermal_pressure = get_thermal_pressure()
         cpu_energy_j = 0.0
         gpu_energy_j = 0.0
         ane_energy_j = 0.0
@@ -177,10 +355,14 @@ class IOReportSampler:
         p_core_data = {}
         gpu_freq_mhz = 0
         gpu_active_pct = 0
-        dram_bw_residencies = []
-        e_cluster_residency_ns = defaultdict(int)
-        p_cluster_residency_ns = defaultdict(int)
-        gpu_state_residencies = []
+        # Residency ns per bucket (idle/low/mid/high), accumulated through the
+        # compiled state plans instead of per-name dicts.
+        e_cluster_bucket_ns = [0, 0, 0, 0]
+        p_cluster_bucket_ns = [0, 0, 0, 0]
+        gpu_bucket_ns = [0, 0, 0, 0]
+        bw_weighted_sum = 0.0
+        bw_total = 0
+        bw_available = False
 
         ecpu_freqs = self._dvfs.get("ecpu", [])
         pcpu_freqs = self._dvfs.get("pcpu", [])
@@ -201,32 +383,31 @@ class IOReportSampler:
                 and item.subgroup == "CPU Core Performance States"
             ):
                 if "ECPU" in item.channel:
-                    freq, active = _compute_residency_metrics(
-                        item.state_residencies, ecpu_freqs
+                    plan = self._state_plan("ecpu", item, ecpu_freqs)
+                    freq, active = self._apply_plan(
+                        plan, item.state_residencies, e_cluster_bucket_ns
                     )
                     idx = _parse_core_index(item.channel, "ECPU")
                     if idx is not None:
                         e_core_data[idx] = (freq, active)
-                    for name, ns in item.state_residencies:
-                        e_cluster_residency_ns[name] += ns
                 elif "PCPU" in item.channel:
-                    freq, active = _compute_residency_metrics(
-                        item.state_residencies, pcpu_freqs
+                    plan = self._state_plan("pcpu", item, pcpu_freqs)
+                    freq, active = self._apply_plan(
+                        plan, item.state_residencies, p_cluster_bucket_ns
                     )
                     idx = _parse_core_index(item.channel, "PCPU")
                     if idx is not None:
                         p_core_data[idx] = (freq, active)
-                    for name, ns in item.state_residencies:
-                        p_cluster_residency_ns[name] += ns
 
             elif (
                 item.group == "GPU Stats" and item.subgroup == "GPU Performance States"
             ):
                 if "GPUPH" in item.channel:
-                    gpu_freq_mhz, gpu_active_pct = _compute_residency_metrics(
-                        item.state_residencies, gpu_freqs
+                    plan = self._state_plan("gpu", item, gpu_freqs)
+                    gpu_bucket_ns = [0, 0, 0, 0]
+                    gpu_freq_mhz, gpu_active_pct = self._apply_plan(
+                        plan, item.state_residencies, gpu_bucket_ns
                     )
-                    gpu_state_residencies = list(item.state_residencies)
 
             elif item.group == "PMP" and item.subgroup == "DCS BW":
                 # Total DRAM bandwidth = sum over all AMCC RD+WR instances
@@ -235,118 +416,171 @@ class IOReportSampler:
                 # in delta() and intentionally not parsed: they hard-cap at
                 # 32 GB/s and cannot attribute high bandwidth correctly.
                 if item.channel.startswith("AMCC") and item.channel.endswith("RD+WR"):
-                    dram_bw_residencies.extend(item.state_residencies)
-
-        # Scale energy to match parsers.py convention:
-        # parsers.py returns cpu_W = energy_mJ / 1000 = energy_J
-        # actop.py does cpu_power_W = cpu_W / sample_interval
-        # Scale so that dividing by sample_interval gives correct watts.
-        scale = self._interval / elapsed_s if elapsed_s > 0 else 1.0
-        cpu_e = cpu_energy_j * scale
-        gpu_e = gpu_energy_j * scale
-        ane_e = ane_energy_j * scale
-        package_e = cpu_e + gpu_e + ane_e
-
-        cpu_metrics = {
-            "E-Cluster_active": 0,
-            "E-Cluster_freq_MHz": 0,
+                    plan = self._state_plan("bw", item, None)
+                    residencies = item.state_residencies
+                    if isinstance(residencies, list):
+                        weighted, total = _apply_bandwidth_plan(plan, residencies)
+                    else:
+                        weighted, total = self._dot(plan.matrix, residencies)
+                    bw_weighted_sum += weighted
+                    bw_total += total
+                    bw_available = bw_available or len(residencies) > 0
+
+        # Watts over the measured elapsed time of this delta, not the nominal
+        # interval: a tick that wakes late covers more energy and more time.
+        per_s = 1.0 / elapsed_s if elapsed_s > 0 else 0.0
+        cpu_w = cpu_energy_j * per_s
+        gpu_w = gpu_energy_j * per_s
+        ane_w = ane_energy_j * per_s
+
+        e_index = tuple(sorted(e_core_data))
+        e_active = array("i", [e_core_data[idx][1] for idx in e_index])
+        e_freq = array("i", [e_core_data[idx][0] for idx in e_index])
+        p_index = tuple(sorted(p_core_data))
+        p_active = array("i", [p_core_data[idx][1] for idx in p_index])
+        p_freq = array("i", [p_core_data[idx][0] for idx in p_index])
+
+        return SampleResult(
+            cpu_w=cpu_w,
+            gpu_w=gpu_w,
+            ane_w=ane_w,
+            package_w=cpu_w + gpu_w + ane_w,
+            elapsed_s=elapsed_s,
+            interval_s=self._interval,
+            e_core_index=e_index,
+            e_core_active_pct=e_active,
+            e_core_freq_mhz=e_freq,
+            p_core_index=p_index,
+            p_core_active_pct=p_active,
+            p_core_freq_mhz=p_freq,
+            ecpu_active_pct=int(sum(e_active) / len(e_active)) if e_active else 0,
+            ecpu_freq_mhz=max(e_freq) if e_freq else 0,
             # DVFS ceiling per cluster (silicon max), from the frequency table
             # discovered at startup; used by the throttle indicator.
-            "E-Cluster_max_freq_MHz": max(ecpu_freqs) if ecpu_freqs else 0,
-            "P-Cluster_active": 0,
-            "P-Cluster_freq_MHz": 0,
-            "P-Cluster_max_freq_MHz": max(pcpu_freqs) if pcpu_freqs else 0,
+            ecpu_max_freq_mhz=max(ecpu_freqs) if ecpu_freqs else 0,
+            pcpu_active_pct=int(sum(p_active) / len(p_active)) if p_active else 0,
+            pcpu_freq_mhz=max(p_freq) if p_freq else 0,
+            pcpu_max_freq_mhz=max(pcpu_freqs) if pcpu_freqs else 0,
+            gpu_active_pct=gpu_active_pct,
+            gpu_freq_mhz=gpu_freq_mhz,
+            gpu_max_freq_mhz=max(gpu_freqs) if gpu_freqs else 0,
             # Time-in-frequency-state distribution over the sample interval
             # (idle/low/mid/high buckets, relative to the cluster's DVFS
             # ceiling); the throttle indicator above uses only the ceiling
             # and instantaneous freq, this keeps the full-interval shape.
-            "E-Cluster_residency_pct": _compute_residency_distribution(
-                list(e_cluster_residency_ns.items()), ecpu_freqs
-            ),
-            "P-Cluster_residency_pct": _compute_residency_distribution(
-                list(p_cluster_residency_ns.items()), pcpu_freqs
-            ),
-            "ane_W": ane_e,
-            "cpu_W": cpu_e,
-            "gpu_W": gpu_e,
-            "package_W": package_e,
-            "e_core": [],
-            "p_core": [],
-        }
-
-        e_freqs = []
-        e_actives = []
-        for cluster_idx in sorted(e_core_data):
-            freq, active = e_core_data[cluster_idx]
-            sys_idx = cluster_idx
-            cpu_metrics["e_core"].append(sys_idx)
-            cpu_metrics["E-Cluster" + str(sys_idx) + "_active"] = active
-            cpu_metrics["E-Cluster" + str(sys_idx) + "_freq_MHz"] = freq
-            e_freqs.append(freq)
-            e_actives.append(active)
-
-        if e_freqs:
-            cpu_metrics["E-Cluster_freq_MHz"] = max(e_freqs)
-        if e_actives:
-            cpu_metrics["E-Cluster_active"] = int(sum(e_actives) / len(e_actives))
-
-        p_freqs = []
-        p_actives = []
-        for cluster_idx in sorted(p_core_data):
-            freq, active = p_core_data[cluster_idx]
-            sys_idx = cluster_idx
-            cpu_metrics["p_core"].append(sys_idx)
-            cpu_metrics["P-Cluster" + str(sys_idx) + "_active"] = active
-            cpu_metrics["P-Cluster" + str(sys_idx) + "_freq_MHz"] = freq
-            p_freqs.append(freq)
-            p_actives.append(active)
-
-        if p_freqs:
-            cpu_metrics["P-Cluster_freq_MHz"] = max(p_freqs)
-        if p_actives:
-            cpu_metrics["P-Cluster_active"] = int(sum(p_actives) / len(p_actives))
-
-        gpu_metrics = {
-            "freq_MHz": gpu_freq_mhz,
-            "max_freq_MHz": max(gpu_freqs) if gpu_freqs else 0,
-            "active": gpu_active_pct,
-            "residency_pct": _compute_residency_distribution(
-                gpu_state_residencies, gpu_freqs
-            ),
-        }
-
-        total_gbps = _compute_bandwidth_gbps(dram_bw_residencies)
-        bandwidth_metrics = {
-            "total_gbps": total_gbps,
-            "_available": bool(dram_bw_residencies),
-        }
-
-        return SampleResult(
-            cpu_metrics=cpu_metrics,
-            gpu_metrics=gpu_metrics,
-            thermal_pressure=get_thermal_pressure(),
-            bandwidth_metrics=bandwidth_metrics,
+            ecpu_residency_pct=_bucket_percentages(e_cluster_bucket_ns),
+            pcpu_residency_pct=_bucket_percentages(p_cluster_bucket_ns),
+            gpu_residency_pct=_bucket_percentages(gpu_bucket_ns),
+            bandwidth_gbps=bw_weighted_sum / bw_total if bw_total > 0 else 0.0,
+            bandwidth_available=bw_available,
+            thermal_pressure=thermal_pressure,
             timestamp=time.time(),
             cpu_temp_c=cpu_temp_c,
             gpu_temp_c=gpu_temp_c,
+            monotonic_s=time.monotonic() if monotonic_s is None else monotonic_s,
         )
 
-    def close(self):
-        from .ioreport import cf_release
+    def _state_plan(self, domain, item, freq_table):
+        """Return the compiled state plan for a channel, compiling on a miss.
+
+        Plans are keyed per (domain, channel) and tied to the channel's state
+        names: the interned `IOReportItem.state_names` tuple makes the steady
+        state an identity check. Items without it (replays, hand-built items)
+        fall back to comparing the names, and a changed state set recompiles.
+        "bw" plans pre-parse the DCS BW bucket levels instead of frequencies.
+        """
+        key = (domain, item.channel)
+        plan = self._plans.get(key)
+        names = item.state_names
+        if plan is not None and names is not None and plan.names is names:
+            return plan
+        if names is None:
+            names = tuple(name for name, _ in item.state_residencies)
+        if plan is None or plan.names != names:
+            if domain == "bw":
+                plan = _compile_bandwidth_plan(names)
+            else:
+                plan = _compile_state_plan(names, freq_table)
+            if self._np is not None:
+                plan = plan._replace(matrix=self._np.array(plan.matrix))
+        else:
+            plan = plan._replace(names=names)
+        self._plans[key] = plan
+        return plan
 
-        if self._prev_sample is not None:
-            cf_release(self._prev_sample)
-            self._prev_sample = None
-        self._sub.close()
-        self._smc.close()
+    def _apply_plan(self, plan, residencies, bucket_ns=None):
+        """Apply a state plan to either residency form.
 
+        (name, ns) lists take the per-state loop; array('q') residencies are
+        reduced with one row-wise dot product against plan.matrix (pure Python
+        or NumPy, per residency_format).
+        """
+        if isinstance(residencies, list):
+            return _apply_state_plan(plan, residencies, bucket_ns)
+        return _apply_state_sums(self._dot(plan.matrix, residencies), bucket_ns)
 
-def create_sampler(interval, subsamples=1):
-    """Create an IOReport sampler.
+    def close(self):
+        from .ioreport import cf_release
 
-    Returns (sampler, backend_name) where backend_name is always 'ioreport'.
+        try:
+            if self._prev_sample is not None:
+                cf_release(self._prev_sample)
+                self._prev_sample = None
+            self._sub.close()
+            self._smc.close()
+        finally:
+            if self._recorder is not None:
+                self._recorder.close()
+                self._recorder = None
+
+
+def create_sampler(
+    interval,
+    subsamples=1,
+    record_path=None,
+    replay_path=None,
+    residency_format=None,
+    overrun="skip",
+):
+    """Create an IOReport sampler, or a replay of a recorded capture.
+
+    record_path / replay_path default to the ACTOP_RECORD / ACTOP_REPLAY
+    environment variables, so every front end (Monitor, Profiler, exporters,
+    TUI) can be pointed at a capture without new plumbing. See actop.replay.
+    residency_format likewise defaults to ACTOP_RESIDENCY_FORMAT, then
+    "tuples"; see RESIDENCY_FORMATS. overrun is the subsample deadline
+    policy (see actop.pacing); replays never sleep and ignore it.
+
+    Returns (sampler, backend_name) where backend_name is 'ioreport' or
+    'replay'.
     """
-    return (IOReportSampler(interval, subsamples=subsamples), "ioreport")
+    record_path = record_path or os.environ.get("ACTOP_RECORD") or None
+    replay_path = replay_path or os.environ.get("ACTOP_REPLAY") or None
+    residency_format = (
+        residency_format or os.environ.get("ACTOP_RESIDENCY_FORMAT") or "tuples"
+    )
+    if replay_path:
+        from .replay import ReplaySampler
+
+        return (
+            ReplaySampler(
+                replay_path,
+                interval,
+                subsamples=subsamples,
+                residency_format=residency_format,
+            ),
+            "replay",
+        )
+    return (
+        IOReportSampler(
+            interval,
+            subsamples=subsamples,
+            record_path=record_path,
+            residency_format=residency_format,
+            overrun=overrun,
+        ),
+        "ioreport",
+    )
 
 
 # --- Private helpers ---
@@ -391,15 +625,143 @@ def _energy_to_joules(value, unit):
 _CORE_INDEX_PATTERN = re.compile(r"^[EP]CPU(\d+)")
 
 
-def _is_int_cpu_metric(key):
-    if key in (
-        "E-Cluster_active",
-        "E-Cluster_freq_MHz",
-        "P-Cluster_active",
-        "P-Cluster_freq_MHz",
-    ):
-        return True
-    return key.endswith("_active") or key.endswith("_freq_MHz")
+# SampleResult fields folded by _SubsampleAccumulator: power (averaged over
+# the summed elapsed time, i.e. total energy / total time), float means,
+# truncated integer means (like the per-sample values), and the fields whose
+# per-subsample min/max are also reported (power, utilization, bandwidth).
+_POWER_FIELDS = ("cpu_w", "gpu_w", "ane_w", "package_w")
+_MEAN_FIELDS = ("bandwidth_gbps",)
+_INT_MEAN_FIELDS = (
+    "ecpu_active_pct",
+    "ecpu_freq_mhz",
+    "ecpu_max_freq_mhz",
+    "pcpu_active_pct",
+    "pcpu_freq_mhz",
+    "pcpu_max_freq_mhz",
+    "gpu_active_pct",
+    "gpu_freq_mhz",
+    "gpu_max_freq_mhz",
+)
+_EXTREME_FIELDS = (
+    "cpu_w",
+    "gpu_w",
+    "ane_w",
+    "package_w",
+    "ecpu_active_pct",
+    "pcpu_active_pct",
+    "gpu_active_pct",
+    "bandwidth_gbps",
+)
+_CLUSTERS = ("e_core", "p_core")
+
+
+_SUM_FIELDS = _MEAN_FIELDS + _INT_MEAN_FIELDS
+_get_sum_fields = attrgetter(*_SUM_FIELDS)
+_get_power_fields = attrgetter(*_POWER_FIELDS)
+_get_extreme_fields = attrgetter(*_EXTREME_FIELDS)
+
+
+class _SubsampleAccumulator:
+    """Running fold of subsample SampleResults into one interval result.
+
+    Each add() updates running sums and extremes, so memory stays constant
+    in the subsample count. result() gives power as total energy over total
+    elapsed time, the mean of every other numeric field, with non-numeric
+    fields (residency shares, thermal state, timestamp) from
+    the last subsample. Per-core columns average per core index of the last
+    subsample; a core missing from an earlier subsample counts as 0 there.
+    """
+
+    __slots__ = (
+        "count",
+        "elapsed_s",
+        "energy_j",
+        "sums",
+        "mins",
+        "maxs",
+        "core_sums",
+        "bw_available",
+        "last",
+    )
+
+    def __init__(self):
+        self.count = 0
+        self.elapsed_s = 0.0
+        self.energy_j = None  # parallel to _POWER_FIELDS
+        self.sums = None  # parallel to _SUM_FIELDS
+        self.mins = None  # parallel to _EXTREME_FIELDS
+        self.maxs = None
+        # per cluster: core index -> [active % sum, MHz sum]
+        self.core_sums = {cluster: {} for cluster in _CLUSTERS}
+        self.bw_available = False
+        self.last = None
+
+    def add(self, part):
+        values = _get_sum_fields(part)
+        extremes = _get_extreme_fields(part)
+        elapsed = part.elapsed_s
+        energy = [watts * elapsed for watts in _get_power_fields(part)]
+        self.elapsed_s += elapsed
+        if self.count == 0:
+            self.energy_j = energy
+            self.sums = list(values)
+            self.mins = extremes
+            self.maxs = extremes
+        else:
+            self.energy_j = list(map(add, self.energy_j, energy))
+            self.sums = list(map(add, self.sums, values))
+            self.mins = tuple(map(min, self.mins, extremes))
+            self.maxs = tuple(map(max, self.maxs, extremes))
+        self.count += 1
+        self.last = part
+        for cluster, core_sums in self.core_sums.items():
+            for idx, active, freq in zip(
+                getattr(part, cluster + "_index"),
+                getattr(part, cluster + "_active_pct"),
+                getattr(part, cluster + "_freq_mhz"),
+            ):
+                entry = core_sums.get(idx)
+                if entry is None:
+                    core_sums[idx] = [active, freq]
+                else:
+                    entry[0] += active
+                    entry[1] += freq
+        self.bw_available = self.bw_available or part.bandwidth_available
+
+    def result(self) -> SampleResult:
+        count = self.count
+        base = self.last
+        elapsed = self.elapsed_s
+        fields = {"elapsed_s": elapsed, "interval_s": base.interval_s}
+        for name, joules in zip(_POWER_FIELDS, self.energy_j):
+            fields[name] = joules / elapsed if elapsed > 0 else 0.0
+        for name, total in zip(_SUM_FIELDS, self.sums):
+            fields[name] = total / count
+        for name in _INT_MEAN_FIELDS:
+            fields[name] = int(fields[name])
+        for cluster, core_sums in self.core_sums.items():
+            index = getattr(base, cluster + "_index")
+            fields[cluster + "_index"] = index
+            fields[cluster + "_active_pct"] = array(
+                "i", [int(core_sums[idx][0] / count) for idx in index]
+            )
+            fields[cluster + "_freq_mhz"] = array(
+                "i", [int(core_sums[idx][1] / count) for idx in index]
+            )
+        return SampleResult(
+            ecpu_residency_pct=base.ecpu_residency_pct,
+            pcpu_residency_pct=base.pcpu_residency_pct,
+            gpu_residency_pct=base.gpu_residency_pct,
+            bandwidth_available=self.bw_available,
+            thermal_pressure=base.thermal_pressure,
+            timestamp=base.timestamp,
+            cpu_temp_c=base.cpu_temp_c,
+            gpu_temp_c=base.gpu_temp_c,
+            monotonic_s=base.monotonic_s,
+            interval_min=dict(zip(_EXTREME_FIELDS, self.mins)),
+            interval_max=dict(zip(_EXTREME_FIELDS, self.maxs)),
+            **fields,
+        )
 
 
 def _parse_core_index(channel_name, prefix):
@@ -423,8 +785,33 @@ def _parse_core_index(channel_name, prefix):
         return None
 
 
-def _compute_residency_metrics(residencies, freq_table=None):
-    """Compute weighted average frequency and active percentage.
+class _StatePlan(NamedTuple):
+    """Per-channel state-index resolution against a DVFS table.
+
+    Compiled once per channel (see IOReportSampler._state_plan) so the
+    per-sample work is integer weighted sums, not name parsing.
+    """
+
+    names: tuple  # state names the plan was compiled against
+    freqs: tuple  # MHz per state index (0 when not an active state)
+    active: tuple  # bool per state: counts toward active time / weighted freq
+    buckets: tuple  # residency bucket index into _RESIDENCY_BUCKETS
+    # Row vectors for array residencies (see _apply_state_sums): active-
+    # weighted MHz, active mask, then one 0/1 mask per residency bucket.
+    matrix: tuple
+
+
+class _BandwidthPlan(NamedTuple):
+    names: tuple
+    levels: tuple  # GB/s per bucket state; None for non-bucket states
+    matrix: tuple  # rows: GB/s level (0 for non-bucket states), bucket mask
+
+
+_INACTIVE_STATES = frozenset(("IDLE", "DOWN", "OFF", "UNKNOWN", ""))
+
+
+def _compile_state_plan(names, freq_table=None):
+    """Compile state names into a _StatePlan.
 
     State names can be:
     - Plain integers like "600" (frequency in MHz directly)
@@ -432,30 +819,89 @@ def _compute_residency_metrics(residencies, freq_table=None):
     - "P{n}" (GPU performance state — n is the table index)
     - "IDLE", "DOWN", "OFF" (inactive states)
 
-    freq_table: list of MHz values indexed by state position, from
-    lowest to highest frequency. Used to resolve V{n}P{m} / P{n} names.
-
-    Returns (freq_mhz, active_percent) as (int, int).
+    freq_table: list of MHz values indexed by state position, from lowest to
+    highest frequency. Used to resolve V{n}P{m} / P{n} names, and its max (the
+    DVFS ceiling) anchors the idle/low/mid/high buckets. Unresolvable states
+    and an unknown ceiling both bucket as idle: "low" should only mean
+    "resolved to a real, low frequency," not "we couldn't tell."
     """
     if freq_table is None:
         freq_table = []
+    max_freq = max(freq_table) if freq_table else 0
+
+    freqs = []
+    active = []
+    buckets = []
+    for name in names:
+        freq_mhz = None
+        if name.upper() not in _INACTIVE_STATES:
+            freq_mhz = _resolve_state_freq(name, freq_table)
+        freqs.append(freq_mhz or 0)
+        active.append(freq_mhz is not None)
+        if freq_mhz is None or freq_mhz <= 0 or max_freq <= 0:
+            buckets.append(_IDLE_BUCKET)
+        else:
+            bucket = _bucket_for_freq_ratio(freq_mhz / max_freq)
+            buckets.append(_RESIDENCY_BUCKETS.index(bucket))
+    weighted = tuple(f if a else 0 for f, a in zip(freqs, active))
+    active_mask = tuple(int(a) for a in active)
+    bucket_masks = tuple(
+        tuple(int(b == k) for b in buckets) for k in range(len(_RESIDENCY_BUCKETS))
+    )
+    return _StatePlan(
+        names=tuple(names),
+        freqs=tuple(freqs),
+        active=tuple(active),
+        buckets=tuple(buckets),
+        matrix=(weighted, active_mask) + bucket_masks,
+    )
+
+
+def _apply_state_plan(plan, residencies, bucket_ns=None):
+    """Weighted average frequency and active percentage through a plan.
+
+    residencies: (name, ns) pairs in the plan's state order. When bucket_ns
+    (a 4-slot list) is given, each state's ns is also added to its residency
+    bucket, so cluster distributions accumulate across cores in the same pass.
 
+    Returns (freq_mhz, active_percent) as (int, int).
+    """
+    freqs = plan.freqs
+    active = plan.active
+    buckets = plan.buckets
     total_ns = 0
     active_ns = 0
     weighted_freq_sum = 0
-
-    for name, ns in residencies:
+    for j, (_, ns) in enumerate(residencies):
         total_ns += ns
-        name_upper = name.upper()
-        if name_upper in ("IDLE", "DOWN", "OFF", "UNKNOWN", ""):
-            continue
+        if bucket_ns is not None:
+            bucket_ns[buckets[j]] += ns
+        if active[j]:
+            active_ns += ns
+            weighted_freq_sum += freqs[j] * ns
+
+    if total_ns <= 0 or active_ns <= 0:
+        return (0, 0)
+
+    avg_freq = int(weighted_freq_sum / active_ns)
+    active_pct = int(active_ns / total_ns * 100)
+    return (avg_freq, active_pct)
 
-        freq_mhz = _resolve_state_freq(name, freq_table)
-        if freq_mhz is None:
-            continue
 
-        active_ns += ns
-        weighted_freq_sum += freq_mhz * ns
+def _apply_state_sums(sums, bucket_ns=None):
+    """_apply_state_plan for array residencies, from the plan.matrix dot sums.
+
+    sums: (Σ freq·ns over active states, Σ active ns, then Σ ns per bucket).
+    Every state lands in exactly one bucket, so the bucket sums add up to the
+    channel total. Same return value as _apply_state_plan.
+    """
+    weighted_freq_sum, active_ns, idle, low, mid, high = sums
+    if bucket_ns is not None:
+        bucket_ns[0] += idle
+        bucket_ns[1] += low
+        bucket_ns[2] += mid
+        bucket_ns[3] += high
+    total_ns = idle + low + mid + high
 
     if total_ns <= 0 or active_ns <= 0:
         return (0, 0)
@@ -465,7 +911,37 @@ def _compute_residency_metrics(residencies, freq_table=None):
     return (avg_freq, active_pct)
 
 
+def _dot_rows(rows, values):
+    """Dot each row of a plan matrix with a residency vector (pure Python).
+
+    Row 0 is a weight vector; the rest are 0/1 masks, which compress() sums
+    without the multiply.
+    """
+    weights, *masks = rows
+    return [sum(map(mul, weights, values))] + [
+        sum(compress(values, mask)) for mask in masks
+    ]
+
+
+def _numpy_dot_rows(matrix, values):
+    """_dot_rows for a NumPy plan matrix: one matrix-vector product."""
+    import numpy as np
+
+    return (matrix @ np.frombuffer(values, dtype=np.int64)).tolist()
+
+
+def _compute_residency_metrics(residencies, freq_table=None):
+    """Compute weighted average frequency and active percentage.
+
+    One-shot form of _compile_state_plan + _apply_state_plan for callers
+    without a plan cache. Returns (freq_mhz, active_percent) as (int, int).
+    """
+    plan = _compile_state_plan([name for name, _ in residencies], freq_table)
+    return _apply_state_plan(plan, residencies)
+
+
 _RESIDENCY_BUCKETS = ("idle", "low", "mid", "high")
+_IDLE_BUCKET = 0
 
 
 def _bucket_for_freq_ratio(ratio):
@@ -482,33 +958,24 @@ def _compute_residency_distribution(residencies, freq_table=None):
 
     Relative to max(freq_table) (the DVFS ceiling), so buckets are comparable
     across chips with different absolute clock ranges — mirrors the ceiling-
-    relative ratio used by the throttle indicator. Unresolvable states and an
-    unknown ceiling both bucket as idle: "low" should only mean "resolved to
-    a real, low frequency," not "we couldn't tell."
+    relative ratio used by the throttle indicator.
 
     Returns {"idle": int, "low": int, "mid": int, "high": int} summing to
     ~100 (all zero when there is no residency to bucket).
     """
-    if freq_table is None:
-        freq_table = []
-    max_freq = max(freq_table) if freq_table else 0
+    plan = _compile_state_plan([name for name, _ in residencies], freq_table)
+    bucket_ns = [0, 0, 0, 0]
+    _apply_state_plan(plan, residencies, bucket_ns)
+    return _bucket_percentages(bucket_ns)
 
-    bucket_ns = {name: 0 for name in _RESIDENCY_BUCKETS}
-    total_ns = 0
-    for name, ns in residencies:
-        total_ns += ns
-        if name.upper() in ("IDLE", "DOWN", "OFF", "UNKNOWN", ""):
-            bucket_ns["idle"] += ns
-            continue
-        freq_mhz = _resolve_state_freq(name, freq_table)
-        if freq_mhz is None or freq_mhz <= 0 or max_freq <= 0:
-            bucket_ns["idle"] += ns
-            continue
-        bucket_ns[_bucket_for_freq_ratio(freq_mhz / max_freq)] += ns
 
+def _bucket_percentages(bucket_ns):
+    """Turn a 4-slot idle/low/mid/high ns list into integer percent shares."""
+    total_ns = sum(bucket_ns)
+    named = dict(zip(_RESIDENCY_BUCKETS, bucket_ns))
     if total_ns <= 0:
-        return dict(bucket_ns)
-    return _largest_remainder_percentages(bucket_ns, total_ns, _RESIDENCY_BUCKETS)
+        return named
+    return _largest_remainder_percentages(named, total_ns, _RESIDENCY_BUCKETS)
 
 
 def _largest_remainder_percentages(bucket_ns, total_ns, order):
@@ -571,6 +1038,36 @@ def _keep_states(group, subgroup, channel):
 _GBPS_PATTERN = re.compile(r"(\d+)\s*GB/s")
 
 
+def _compile_bandwidth_plan(names):
+    """Pre-parse DCS BW bucket names ("32GB/s", …) into GB/s levels."""
+    levels = []
+    for name in names:
+        m = _GBPS_PATTERN.search(name)
+        levels.append(float(m.group(1)) if m else None)
+    return _BandwidthPlan(
+        names=tuple(names),
+        levels=tuple(levels),
+        matrix=(
+            tuple(level or 0.0 for level in levels),
+            tuple(int(level is not None) for level in levels),
+        ),
+    )
+
+
+def _apply_bandwidth_plan(plan, residencies):
+    """Return (Σ level·time, Σ time) over a channel's bucket residencies."""
+    levels = plan.levels
+    weighted_sum = 0.0
+    total = 0
+    for j, (_, residency) in enumerate(residencies):
+        level = levels[j]
+        if level is None:
+            continue
+        weighted_sum += level * residency
+        total += residency
+    return (weighted_sum, total)
+
+
 def _compute_bandwidth_gbps(residencies):
     """Residency-weighted average bandwidth (GB/s) from a DCS BW histogram.
 
@@ -579,14 +1076,8 @@ def _compute_bandwidth_gbps(residencies):
     already in GB/s — no division by the sample interval. Returns 0.0 when the
     histogram is empty (no DCS channel on this platform).
     """
-    weighted_sum = 0.0
-    total = 0.0
-    for name, residency in residencies:
-        m = _GBPS_PATTERN.search(name)
-        if not m:
-            continue
-        weighted_sum += float(m.group(1)) * residency
-        total += residency
+    plan = _compile_bandwidth_plan([name for name, _ in residencies])
+    weighted_sum, total = _apply_bandwidth_plan(plan, residencies)
     if total <= 0:
         return 0.0
     return weighted_sum / total
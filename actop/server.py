@@ -0,0 +1,360 @@
+"""Asyncio HTTP exporter: many keep-alive clients on one thread.
+
+`MetricsServer` subscribes to the sampler hub (actop.hub) from the event loop
+and renders every snapshot once: the Prometheus exposition and the JSON
+record are cached as encoded bytes (gzip on first request, ETag for
+conditional GETs, as in actop.export). Requests are answered from that cache
+on the loop thread, so a connection costs a coroutine rather than a thread:
+
+- `/metrics`: Prometheus text format, or OpenMetrics (with energy
+  counters) for scrapers that ask for it when `openmetrics` is set;
+- `/snapshot`: the latest snapshot as JSON (the --json record);
+- `/healthz`: 200 while samples keep arriving, 503 before the first, once
+  they stall, or after the sampler failed (with the error);
+- `/stream`: Server-Sent Events, one `data:` JSON record per snapshot. All
+  stream clients await one shared future per snapshot, and a slow client
+  skips to the newest snapshot instead of queueing.
+
+Connections are HTTP/1.1 keep-alive (closed after `keepalive_s` idle). Only
+GET and HEAD are served.
+"""
+
+import asyncio
+import json
+import sys
+import time
+
+from .export import (
+    _accepts_gzip,
+    _accepts_openmetrics,
+    _etag_matches,
+    _ExpositionCache,
+    _RenderedMetrics,
+    snapshot_to_json,
+)
+from .hub import get_hub
+
+_MAX_HEADER_BYTES = 16384
+_REASONS = {
+    200: "OK",
+    304: "Not Modified",
+    400: "Bad Request",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    431: "Request Header Fields Too Large",
+    503: "Service Unavailable",
+}
+_JSON_TYPE = "application/json"
+
+
+def _head(status, headers) -> bytes:
+    lines = ["HTTP/1.1 {} {}".format(status, _REASONS[status])]
+    lines.extend("{}: {}".format(name, value) for name, value in headers)
+    return ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1")
+
+
+class MetricsServer:
+    """Asyncio HTTP server for the latest snapshot; see the module docstring.
+
+    `async with MetricsServer(...) as server:` (or `await server.start()` /
+    `await server.close()`) inside a running loop; `server.port` is the
+    bound port, useful with port=0.
+    """
+
+    def __init__(
+        self,
+        interval_s: float = 1.0,
+        subsamples: int = 1,
+        overrun: str = "skip",
+        percentiles: bool = False,
+        alerts=None,
+        keepalive_s: float = 75.0,
+        openmetrics: bool = False,
+    ):
+        self._hub = get_hub(interval_s, subsamples, overrun)
+        self._exposition = _ExpositionCache(percentiles, alerts, openmetrics)
+        self.keepalive_s = keepalive_s
+        self._snapshot: _RenderedMetrics | None = None
+        self._event: bytes | None = None
+        self._next: asyncio.Future | None = None
+        self._samples = 0
+        self._last_sample_at = 0.0
+        self._error: BaseException | None = None
+        self._subscription = None
+        self._pump: asyncio.Task | None = None
+        self._server: asyncio.AbstractServer | None = None
+        self._writers: set = set()
+
+    @property
+    def port(self) -> int:
+        return self._server.sockets[0].getsockname()[1]
+
+    async def start(self, host: str = "0.0.0.0", port: int = 9095):
+        loop = asyncio.get_running_loop()
+        self._next = loop.create_future()
+        self._subscription = self._hub.subscribe_async()
+        self._pump = asyncio.create_task(self._run_pump())
+        try:
+            self._server = await asyncio.start_server(
+                self._handle, host, port, limit=_MAX_HEADER_BYTES
+            )
+        except BaseException:
+            await self.close()
+            raise
+        return self
+
+    async def close(self):
+        if self._subscription is not None:
+            self._subscription.close()
+            self._subscription = None
+        if self._pump is not None:
+            self._pump.cancel()
+            await asyncio.gather(self._pump, return_exceptions=True)
+            self._pump = None
+        if self._next is not None and not self._next.done():
+            self._next.set_result(None)  # ends the event streams
+        if self._server is not None:
+            self._server.close()
+            for writer in list(self._writers):
+                writer.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def serve_forever(self):
+        await self._server.serve_forever()
+
+    async def __aenter__(self):
+        if self._server is None:
+            await self.start()
+        return self
+
+    async def __aexit__(self, *_):
+        await self.close()
+
+    @property
+    def error(self) -> BaseException | None:
+        """The exception that stopped sampling, if any."""
+        return self._error
+
+    async def _run_pump(self):
+        try:
+            async for snapshot in self._subscription:
+                self._publish(snapshot)
+        except Exception as exc:
+            # Nothing awaits the pump task: record the error for /healthz.
+            self._error = exc
+            print(
+                "actop: sampling stopped: {!r}".format(exc),
+                file=sys.stderr,
+                flush=True,
+            )
+        finally:
+            if self._next is not None and not self._next.done():
+                self._next.set_result(None)  # ends the event streams
+
+    def _publish(self, snapshot):
+        """Render one snapshot for every endpoint and wake the streams."""
+        exposition = self._exposition
+        exposition.update(snapshot)
+        self._snapshot = _RenderedMetrics(
+            snapshot_to_json(snapshot, exposition.quantiles, exposition.alerts),
+            _JSON_TYPE,
+        )
+        self._event = b"data: " + self._snapshot.body + b"\n\n"
+        self._samples += 1
+        self._last_sample_at = time.monotonic()
+        current, self._next = self._next, asyncio.get_running_loop().create_future()
+        current.set_result(self._event)
+
+    def _healthy(self) -> bool:
+        if self._error is not None:
+            return False
+        stale_after = max(5.0, 3 * self._hub.interval_s)
+        return self._samples > 0 and (
+            time.monotonic() - self._last_sample_at < stale_after
+        )
+
+    async def _handle(self, reader, writer):
+        self._writers.add(writer)
+        try:
+            while True:
+                try:
+                    raw = await asyncio.wait_for(
+                        reader.readuntil(b"\r\n\r\n"), self.keepalive_s
+                    )
+                except asyncio.LimitOverrunError:
+                    writer.write(_head(431, [("Connection", "close")]))
+                    break
+                except (asyncio.IncompleteReadError, TimeoutError):
+                    break
+                request = self._parse(raw)
+                if request is None:
+                    writer.write(
+                        _head(400, [("Content-Length", "0"), ("Connection", "close")])
+                    )
+                    break
+                method, path, headers, keep_alive = request
+                if path == "/stream" and method == "GET":
+                    await self._stream(writer)
+                    break
+                writer.write(self._respond(method, path, headers, keep_alive))
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except ConnectionError:
+            pass
+        finally:
+            self._writers.discard(writer)
+            writer.close()
+
+    @staticmethod
+    def _parse(raw):
+        """(method, path, headers, keep_alive) from a request head, or None."""
+        try:
+            lines = raw.decode("latin-1").split("\r\n")
+            method, target, version = lines[0].split(" ")
+        except ValueError:
+            return None
+        if not version.startswith("HTTP/1."):
+            return None
+        headers = {}
+        for line in lines[1:]:
+            if line:
+                name, _, value = line.partition(":")
+                headers[name.strip().lower()] = value.strip()
+        connection = headers.get("connection", "").lower()
+        if version == "HTTP/1.0":
+            keep_alive = connection == "keep-alive"
+        else:
+            keep_alive = connection != "close"
+        # A body would desynchronize the connection; none is expected.
+        if headers.get("content-length", "0") != "0":
+            keep_alive = False
+        path = target.split("?", 1)[0].rstrip("/") or "/"
+        return method, path, headers, keep_alive
+
+    def _respond(self, method, path, headers, keep_alive) -> bytes:
+        connection = ("Connection", "keep-alive" if keep_alive else "close")
+        if method not in ("GET", "HEAD"):
+            return _head(
+                405, [("Allow", "GET, HEAD"), ("Content-Length", "0"), connection]
+            )
+        if path == "/healthz":
+            healthy = self._healthy()
+            body = json.dumps(
+                {
+                    "status": "ok" if healthy else "unavailable",
+                    "samples": self._samples,
+                    "age_s": (
+                        round(time.monotonic() - self._last_sample_at, 3)
+                        if self._samples
+                        else None
+                    ),
+                    "error": repr(self._error) if self._error is not None else None,
+                },
+                separators=(",", ":"),
+            ).encode()
+            head = _head(
+                200 if healthy else 503,
+                [
+                    ("Content-Type", _JSON_TYPE),
+                    ("Cache-Control", "no-store"),
+                    ("Content-Length", str(len(body))),
+                    connection,
+                ],
+            )
+            return head if method == "HEAD" else head + body
+        if path in ("/", "/metrics"):
+            rendered = self._exposition.latest(
+                _accepts_openmetrics(headers.get("accept"))
+            )
+        elif path == "/snapshot":
+            rendered = self._snapshot
+        else:
+            return _head(404, [("Content-Length", "0"), connection])
+        if rendered is None:
+            return _head(503, [("Content-Length", "0"), connection])
+        gzipped = _accepts_gzip(headers.get("accept-encoding"))
+        etag = rendered.gzip_etag if gzipped else rendered.etag
+        if _etag_matches(headers.get("if-none-match"), rendered):
+            return _head(
+                304,
+                [
+                    ("ETag", etag),
+                    ("Vary", "Accept, Accept-Encoding"),
+                    connection,
+                ],
+            )
+        fields = [("Content-Type", rendered.content_type)]
+        body = rendered.body
+        if gzipped:
+            body = rendered.gzipped()
+            fields.append(("Content-Encoding", "gzip"))
+        fields += [
+            ("Content-Length", str(len(body))),
+            ("ETag", etag),
+            ("Vary", "Accept, Accept-Encoding"),
+            connection,
+        ]
+        head = _head(200, fields)
+        return head if method == "HEAD" else head + body
+
+    async def _stream(self, writer):
+        """Server-Sent Events until the client or the server goes away."""
+        writer.write(
+            _head(
+                200,
+                [
+                    ("Content-Type", "text/event-stream"),
+                    ("Cache-Control", "no-cache"),
+                    ("Connection", "close"),
+                ],
+            )
+        )
+        sent = None
+        while True:
+            event = self._event
+            if event is sent:
+                # shield: one client leaving must not cancel the shared future.
+                event = await asyncio.shield(self._next)
+                if event is None:
+                    return
+            writer.write(event)
+            await writer.drain()
+            sent = event
+
+
+def serve_async(
+    port: int,
+    interval_s: float,
+    subsamples: int,
+    host: str = "0.0.0.0",
+    overrun: str = "skip",
+    percentiles: bool = False,
+    alerts=None,
+    openmetrics: bool = False,
+) -> None:
+    """Run a MetricsServer on http://host:port until interrupted."""
+
+    async def _main():
+        server = MetricsServer(
+            interval_s,
+            subsamples,
+            overrun,
+            percentiles,
+            alerts,
+            openmetrics=openmetrics,
+        )
+        await server.start(host, port)
+        print(
+            "actop: serving /metrics, /snapshot, /healthz and /stream on "
+            "http://{}:{}".format(host, port),
+            file=sys.stderr,
+            flush=True,
+        )
+        try:
+            await server.serve_forever()
+        finally:
+            await server.close()
+
+    asyncio.run(_main())
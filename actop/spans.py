@@ -0,0 +1,121 @@
+"""Energy attribution to code regions: `Profiler.span()` / `Profiler.mark()`.
+
+Every sample covers [monotonic_s - elapsed_s, monotonic_s] on the monotonic
+clock, with constant power, utilization and bandwidth over that interval. A
+`SpanIndex` lays the samples out once, with running totals of each quantity
+times covered time; attributing a span [start, end] is then two bisections
+and a correction for the partial first and last sample it overlaps. So the
+per-token spans of a decode loop (thousands per session) cost O(log n) each,
+not a scan of the samples.
+"""
+
+from array import array
+from bisect import bisect_left, bisect_right
+from typing import NamedTuple
+
+# Integrated into energy: (SystemSnapshot field, row name).
+_ENERGY_FIELDS = (
+    ("cpu_watts", "cpu"),
+    ("gpu_watts", "gpu"),
+    ("ane_watts", "ane"),
+    ("package_watts", "package"),
+)
+# Averaged over the covered time.
+_MEAN_FIELDS = ("bandwidth_gbps", "ecpu_util_pct", "pcpu_util_pct", "gpu_util_pct")
+_RATE_FIELDS = tuple(field for field, _ in _ENERGY_FIELDS) + _MEAN_FIELDS
+
+# The sample columns a SpanIndex is built from.
+SPAN_COLUMNS = ("monotonic_s", "elapsed_s") + _RATE_FIELDS
+
+
+class Span(NamedTuple):
+    name: str
+    start_s: float  # time.monotonic() at entry
+    end_s: float  # time.monotonic() at exit
+
+
+class SpanIndex:
+    """Interval index over sample columns (at least SPAN_COLUMNS).
+
+    Samples without a monotonic time (0.0) or out of order are left out. A
+    sample whose elapsed time reaches back before its predecessor's end is
+    clipped to start there, so the intervals never overlap.
+    """
+
+    def __init__(self, columns):
+        self._starts = array("d")
+        self._ends = array("d")
+        self._rates = [array("d") for _ in _RATE_FIELDS]
+        # _totals[q][i]: sum of rate × covered time over samples [0, i);
+        # _totals[-1] is the covered time itself.
+        self._totals = [array("d", [0.0]) for _ in range(len(_RATE_FIELDS) + 1)]
+        sums = [0.0] * (len(_RATE_FIELDS) + 1)
+        rate_columns = [columns[field] for field in _RATE_FIELDS]
+        prev_end = float("-inf")
+        for row, (end, elapsed) in enumerate(
+            zip(columns["monotonic_s"], columns["elapsed_s"])
+        ):
+            if end <= 0 or end <= prev_end:
+                continue
+            start = max(end - elapsed, prev_end)
+            covered = end - start
+            self._starts.append(start)
+            self._ends.append(end)
+            for q, values in enumerate(rate_columns):
+                rate = values[row]
+                self._rates[q].append(rate)
+                sums[q] += rate * covered
+                self._totals[q].append(sums[q])
+            sums[-1] += covered
+            self._totals[-1].append(sums[-1])
+            prev_end = end
+
+    def __len__(self):
+        return len(self._ends)
+
+    def attribute(self, start_s, end_s) -> dict:
+        """Energy, average power, bandwidth and utilization over [start_s, end_s].
+
+        A sample partly inside the span contributes the overlapping fraction
+        of its interval. `covered_s` is how much of the span the samples
+        cover; it falls short of the span for time not sampled yet (or
+        dropped from a ring), and the averages are over covered_s.
+        """
+        starts = self._starts
+        ends = self._ends
+        first = bisect_right(ends, start_s)  # first sample ending after start
+        stop = bisect_left(starts, end_s)  # first sample starting at/after end
+        if end_s <= start_s or first >= stop:
+            totals = [0.0] * len(self._totals)
+        else:
+            last = stop - 1
+            head = max(0.0, start_s - starts[first])
+            tail = max(0.0, ends[last] - end_s)
+            totals = [
+                prefix[stop] - prefix[first] - rates[first] * head - rates[last] * tail
+                for prefix, rates in zip(self._totals, self._rates)
+            ]
+            totals.append(
+                self._totals[-1][stop] - self._totals[-1][first] - head - tail
+            )
+        covered = totals[-1]
+        row = {"covered_s": covered}
+        for q, (_, name) in enumerate(_ENERGY_FIELDS):
+            row["{}_joules".format(name)] = totals[q]
+        for q, (_, name) in enumerate(_ENERGY_FIELDS):
+            row["avg_{}_watts".format(name)] = (
+                totals[q] / covered if covered > 0 else 0.0
+            )
+        for q, field in enumerate(_MEAN_FIELDS, start=len(_ENERGY_FIELDS)):
+            row["avg_{}".format(field)] = totals[q] / covered if covered > 0 else 0.0
+        return row
+
+
+def spans_from_marks(marks, end_s):
+    """Spans from (name, time) marks: each runs until the next mark, the last
+    until end_s."""
+    ordered = sorted(marks, key=lambda mark: mark[1])
+    return [
+        Span(name, at, ordered[i + 1][1] if i + 1 < len(ordered) else end_s)
+        for i, (name, at) in enumerate(ordered)
+    ]
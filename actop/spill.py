@@ -0,0 +1,326 @@
+"""Append-only on-disk spill file for long Profiler sessions.
+
+`Profiler(spill_path=..., max_in_memory=N)` keeps at most N samples in its
+in-memory SampleStore; each time the store fills, its columns are handed to a
+`SpillWriter` thread that appends them to the file as one chunk, and the store
+starts over. Reads (`SpillFile`) memory-map the file and decode one chunk at
+a time, so iterating or summarizing an overnight session never holds more
+than one chunk of rows.
+
+Layout: the 8-byte magic `SPILL_MAGIC`, then chunks. A chunk is a uint32
+(little-endian) header length, a JSON header — sample count, core indices,
+thermal state names, and (name, typecode, offset, nbytes) per column — zero
+padding to an 8-byte boundary, then each column's raw `array` bytes, each
+padded to 8 bytes. Offsets are relative to the start of the column data.
+A chunk torn by a crash mid-write is ignored on reload.
+"""
+
+import json
+import mmap
+import queue
+import struct
+import threading
+from array import array
+from typing import NamedTuple
+
+from .store import snapshot_from_row
+
+SPILL_MAGIC = b"ACTOPSP1"
+_HEADER_LEN = struct.Struct("<I")
+_ALIGN = 8
+
+
+def _pad(n):
+    return -n % _ALIGN
+
+
+class SpillChunk(NamedTuple):
+    data_offset: int  # file offset of the first column's bytes
+    count: int  # samples in the chunk
+    cores: dict  # {"e": [...], "p": [...]} system core indices
+    thermal_states: list  # thermal_state code -> name
+    columns: tuple  # (name, typecode, offset, nbytes) per column
+
+
+class SpillWriter:
+    """Background appender of SampleStore.columns() chunks to a spill file.
+
+    submit() only queues; the writer thread encodes and writes. flush() blocks
+    until every queued chunk is on disk (re-raising a write error), after
+    which `chunks` indexes all of them. The file is truncated on open.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        # Long-lived handle, closed by the writer thread when it exits.
+        self._fp = open(path, "wb")  # noqa: SIM115
+        self._fp.write(SPILL_MAGIC)
+        self._fp.flush()
+        self._pos = len(SPILL_MAGIC)
+        self._chunks = []
+        self._error = None
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    @property
+    def chunks(self):
+        """SpillChunks written so far (call flush() first for all submitted)."""
+        return list(self._chunks)
+
+    def submit(self, columns, cores):
+        """Queue one chunk: SampleStore.columns() and its core_indices."""
+        self._queue.put((columns, cores))
+
+    def flush(self):
+        self._queue.join()
+        if self._error is not None:
+            error, self._error = self._error, None
+            raise error
+
+    def close(self):
+        if self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join()
+        self.flush()
+
+    def _run(self):
+        try:
+            while True:
+                item = self._queue.get()
+                try:
+                    if item is None:
+                        return
+                    self._write(*item)
+                except Exception as exc:  # surfaced by the next flush()
+                    self._error = exc
+                finally:
+                    self._queue.task_done()
+        finally:
+            self._fp.close()
+
+    def _write(self, columns, cores):
+        states = sorted(set(columns["thermal_state"]))
+        codes = {state: code for code, state in enumerate(states)}
+        layout = []
+        blocks = []
+        offset = 0
+        for name, values in columns.items():
+            if name == "thermal_state":
+                values = array("b", [codes[state] for state in values])
+            data = values.tobytes()
+            layout.append((name, values.typecode, offset, len(data)))
+            blocks.append(data + bytes(_pad(len(data))))
+            offset += len(data) + _pad(len(data))
+        header = json.dumps(
+            {
+                "count": len(columns["timestamp"]),
+                "cores": {side: list(index) for side, index in cores.items()},
+                "thermal_states": states,
+                "columns": layout,
+            },
+            separators=(",", ":"),
+        ).encode("utf-8")
+        head = _HEADER_LEN.pack(len(header)) + header
+        head += bytes(_pad(self._pos + len(head)))
+        self._fp.write(head)
+        for block in blocks:
+            self._fp.write(block)
+        self._fp.flush()
+        chunk = _chunk_from_header(json.loads(header), self._pos + len(head))
+        self._pos = chunk.data_offset + offset
+        self._chunks.append(chunk)
+
+
+def _chunk_from_header(header, data_offset):
+    return SpillChunk(
+        data_offset=data_offset,
+        count=header["count"],
+        cores={side: tuple(index) for side, index in header["cores"].items()},
+        thermal_states=header["thermal_states"],
+        columns=tuple(tuple(column) for column in header["columns"]),
+    )
+
+
+def read_chunk_index(path):
+    """Scan a spill file's chunk headers (the column data is not read)."""
+    chunks = []
+    with open(path, "rb") as fp:
+        if fp.read(len(SPILL_MAGIC)) != SPILL_MAGIC:
+            raise ValueError("not an actop spill file: {}".format(path))
+        pos = len(SPILL_MAGIC)
+        fp.seek(0, 2)
+        size = fp.tell()
+        while pos + _HEADER_LEN.size <= size:
+            fp.seek(pos)
+            (length,) = _HEADER_LEN.unpack(fp.read(_HEADER_LEN.size))
+            raw = fp.read(length)
+            if len(raw) < length:
+                break
+            try:
+                header = json.loads(raw)
+            except ValueError:
+                break
+            head = _HEADER_LEN.size + length
+            chunk = _chunk_from_header(header, pos + head + _pad(pos + head))
+            end = chunk.data_offset + sum(n + _pad(n) for _, _, _, n in chunk.columns)
+            if end > size:
+                break  # torn final chunk
+            chunks.append(chunk)
+            pos = end
+    return chunks
+
+
+class SpillFile:
+    """Lazy, memory-mapped reader of a spill file.
+
+    chunks defaults to scanning the file (read_chunk_index); Profiler passes
+    its writer's index instead.
+    """
+
+    def __init__(self, path, chunks=None):
+        self.path = path
+        self._chunks = list(chunks) if chunks is not None else read_chunk_index(path)
+
+    @property
+    def chunks(self):
+        return list(self._chunks)
+
+    def __len__(self):
+        return sum(chunk.count for chunk in self._chunks)
+
+    def _map(self):
+        with open(self.path, "rb") as fp:
+            return mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def iter_chunks(self, names=None):
+        """Yield (SpillChunk, {name: array}) one chunk at a time.
+
+        names limits which columns are decoded; thermal_state comes back as a
+        list of strings.
+        """
+        if not self._chunks:
+            return
+        mm = self._map()
+        try:
+            for chunk in self._chunks:
+                yield chunk, _decode_columns(mm, chunk, names)
+        finally:
+            mm.close()
+
+    def iter_samples(self):
+        """Yield every spilled SystemSnapshot in order, one chunk decoded at a
+        time."""
+        for chunk, columns in self.iter_chunks():
+            thermal = columns.pop("thermal_state")
+            cores = {
+                side: (
+                    index,
+                    [columns["{}_core{}_active_pct".format(side, i)] for i in index],
+                    [columns["{}_core{}_freq_mhz".format(side, i)] for i in index],
+                )
+                for side, index in chunk.cores.items()
+            }
+            for row in range(chunk.count):
+                values = {name: column[row] for name, column in columns.items()}
+                row_cores = {
+                    side: (
+                        index,
+                        [column[row] for column in active],
+                        [column[row] for column in freq],
+                    )
+                    for side, (index, active, freq) in cores.items()
+                }
+                yield snapshot_from_row(values, thermal[row], row_cores)
+
+    def to_numpy(self, names=None):
+        """Per-chunk {name: ndarray} list, copied out of the mapping."""
+        import numpy as np
+
+        parts = []
+        if not self._chunks:
+            return parts
+        mm = self._map()
+        try:
+            for chunk in self._chunks:
+                part = {}
+                for name, typecode, offset, nbytes in chunk.columns:
+                    if names is not None and name not in names:
+                        continue
+                    view = np.frombuffer(
+                        mm,
+                        dtype=typecode,
+                        count=nbytes // np.dtype(typecode).itemsize,
+                        offset=chunk.data_offset + offset,
+                    )
+                    part[name] = view.copy()
+                    del view  # release the mapping before mm.close()
+                if "thermal_state" in part:
+                    states = np.array(chunk.thermal_states + [""], dtype=object)
+                    part["thermal_state"] = states[part["thermal_state"]]
+                if "bandwidth_available" in part:
+                    part["bandwidth_available"] = part["bandwidth_available"].astype(
+                        bool
+                    )
+                parts.append((chunk.count, part))
+        finally:
+            mm.close()
+        return parts
+
+
+def _decode_columns(mm, chunk, names=None):
+    columns = {}
+    base = chunk.data_offset
+    for name, typecode, offset, nbytes in chunk.columns:
+        if names is not None and name not in names:
+            continue
+        values = array(typecode)
+        values.frombytes(mm[base + offset : base + offset + nbytes])
+        columns[name] = values
+    if "thermal_state" in columns:
+        states = chunk.thermal_states
+        columns["thermal_state"] = [states[code] for code in columns["thermal_state"]]
+    return columns
+
+
+def merge_columns(parts):
+    """Concatenate (count, {name: array | list}) parts into one column dict.
+
+    A column missing from a part (e.g. a core that came or went between
+    chunks) is zero-filled for that part's samples.
+    """
+    typecodes = {}
+    for _, columns in parts:
+        for name, values in columns.items():
+            typecodes.setdefault(name, getattr(values, "typecode", None))
+    out = {
+        name: [] if typecode is None else array(typecode)
+        for name, typecode in typecodes.items()
+    }
+    for count, columns in parts:
+        for name, merged in out.items():
+            values = columns.get(name)
+            if values is None:
+                values = [""] * count if isinstance(merged, list) else [0] * count
+            merged.extend(values)
+    return out
+
+
+def merge_numpy(parts):
+    """merge_columns() for (count, {name: ndarray}) parts."""
+    import numpy as np
+
+    dtypes = {}
+    for _, columns in parts:
+        for name, values in columns.items():
+            dtypes.setdefault(name, values.dtype)
+    out = {}
+    for name, dtype in dtypes.items():
+        pieces = [
+            columns[name]
+            if name in columns
+            else np.full(count, "" if dtype == object else 0, dtype=dtype)
+            for count, columns in parts
+        ]
+        out[name] = np.concatenate(pieces) if pieces else np.zeros(0, dtype=dtype)
+    return out
@@ -0,0 +1,349 @@
+"""Running statistics over a snapshot stream, updated in O(1) per sample.
+
+`Profiler` feeds every snapshot to a `SessionSummary` as it is collected, so
+`get_summary()` reads a handful of counters instead of re-walking the stored
+samples — cheap enough to poll from a dashboard or alert callback while a
+long run is still recording.
+
+`QuantileTracker` adds session percentiles (p50/p90/p99 by default) in
+constant memory using the P² estimator: five markers per quantile, nudged
+toward their ideal positions as each observation arrives, so no sample is
+ever kept. The markers cost tens of microseconds per snapshot, so
+`SessionSummary` buffers a bounded batch of raw readings and folds them in
+when the summary is read.
+
+`EnergyCounters` keeps the per-domain energy totals alone, as monotonic
+counters for the OpenMetrics exporter.
+"""
+
+from bisect import bisect_right, insort
+from operator import attrgetter
+
+# Power domains integrated into energy: (SystemSnapshot field, summary name).
+_POWER_DOMAINS = (
+    ("cpu_watts", "cpu"),
+    ("gpu_watts", "gpu"),
+    ("ane_watts", "ane"),
+    ("package_watts", "package"),
+)
+_DOMAIN_NAMES = tuple(name for _, name in _POWER_DOMAINS)
+
+# SystemSnapshot fields QuantileTracker follows by default.
+QUANTILE_FIELDS = (
+    "cpu_watts",
+    "gpu_watts",
+    "package_watts",
+    "ecpu_util_pct",
+    "pcpu_util_pct",
+    "gpu_util_pct",
+    "bandwidth_gbps",
+    "cpu_temp_c",
+    "gpu_temp_c",
+)
+DEFAULT_QUANTILES = (0.5, 0.9, 0.99)
+# Snapshots whose readings SessionSummary buffers before folding them into
+# its percentile estimators, if summary() has not been read meanwhile.
+_PENDING_READINGS = 256
+
+
+def quantile_label(p) -> str:
+    """0.5 -> "p50", 0.99 -> "p99", 0.999 -> "p99.9"."""
+    return "p{:g}".format(round(p * 100, 6))
+
+
+class P2Quantile:
+    """Streaming estimate of one quantile (Jain & Chlamtac's P² algorithm).
+
+    Keeps five marker heights and positions regardless of how many values
+    are added. Until five values have arrived the estimate is exact (linear
+    interpolation between order statistics, as numpy's default).
+    """
+
+    __slots__ = ("p", "count", "_heights", "_positions", "_desired", "_step")
+
+    def __init__(self, p: float):
+        if not 0.0 < p < 1.0:
+            raise ValueError("quantile must be between 0 and 1, got {}".format(p))
+        self.p = p
+        self.count = 0
+        self._heights = []
+        self._positions = [0, 1, 2, 3, 4]
+        self._desired = [0.0, 2 * p, 4 * p, 2 + 2 * p, 4.0]
+        self._step = (0.0, p / 2, p, (1 + p) / 2, 1.0)
+
+    def add(self, x: float) -> None:
+        q = self._heights
+        self.count += 1
+        if self.count <= 5:
+            insort(q, x)
+            return
+        if x < q[0]:
+            q[0] = x
+            k = 0
+        elif x >= q[4]:
+            q[4] = x
+            k = 3
+        else:
+            k = bisect_right(q, x) - 1
+        n = self._positions
+        for i in range(k + 1, 5):
+            n[i] += 1
+        # Only the middle markers move; the ends track the min and max.
+        desired = self._desired
+        step = self._step
+        for i in (1, 2, 3):
+            desired[i] += step[i]
+            d = desired[i] - n[i]
+            if d >= 1.0:
+                if n[i + 1] - n[i] > 1:
+                    self._move(i, 1)
+            elif d <= -1.0 and n[i - 1] - n[i] < -1:
+                self._move(i, -1)
+
+    def _move(self, i, d):
+        """Shift marker i one position by d, adjusting its height."""
+        q = self._heights
+        n = self._positions
+        height = q[i] + d / (n[i + 1] - n[i - 1]) * (
+            (n[i] - n[i - 1] + d) * (q[i + 1] - q[i]) / (n[i + 1] - n[i])
+            + (n[i + 1] - n[i] - d) * (q[i] - q[i - 1]) / (n[i] - n[i - 1])
+        )
+        if not q[i - 1] < height < q[i + 1]:
+            # Parabolic step would break monotonicity; go linear.
+            height = q[i] + d * (q[i + d] - q[i]) / (n[i + d] - n[i])
+        q[i] = height
+        n[i] += d
+
+    def value(self) -> float:
+        """Current estimate; 0.0 before the first value."""
+        q = self._heights
+        if self.count > 5:
+            return q[2]
+        if not q:
+            return 0.0
+        pos = self.p * (len(q) - 1)
+        lo = int(pos)
+        hi = min(lo + 1, len(q) - 1)
+        return q[lo] + (q[hi] - q[lo]) * (pos - lo)
+
+
+class QuantileTracker:
+    """Session percentiles of a set of snapshot fields in constant memory.
+
+    One P2Quantile per (field, quantile), plus a count and sum per field (the
+    Prometheus summary `_count` / `_sum`). Bandwidth without a DCS channel
+    and missing temperatures are skipped rather than recorded as zeros.
+    """
+
+    __slots__ = (
+        "fields",
+        "quantiles",
+        "counts",
+        "sums",
+        "_estimators",
+        "_raw",
+        "_tracked",
+    )
+
+    def __init__(self, fields=QUANTILE_FIELDS, quantiles=DEFAULT_QUANTILES):
+        self.fields = tuple(fields)
+        self.quantiles = tuple(quantiles)
+        for p in self.quantiles:
+            P2Quantile(p)  # validate up front
+        # raw_readings(): one C-level getattr per snapshot, the availability
+        # flag last; add_raw() applies the missing-reading rules.
+        self._raw = attrgetter(*self.fields, "bandwidth_available")
+        self.reset()
+
+    def reset(self):
+        self.counts = dict.fromkeys(self.fields, 0)
+        self.sums = dict.fromkeys(self.fields, 0.0)
+        self._estimators = {
+            field: tuple(P2Quantile(p) for p in self.quantiles) for field in self.fields
+        }
+        # (field, estimators, kind) in raw_readings() order; kind marks the
+        # readings that may be missing.
+        self._tracked = tuple(
+            (
+                field,
+                self._estimators[field],
+                "bandwidth"
+                if field == "bandwidth_gbps"
+                else "temperature"
+                if field.endswith("_temp_c")
+                else None,
+            )
+            for field in self.fields
+        )
+
+    def update(self, snapshot):
+        self.add_raw(self._raw(snapshot))
+
+    def raw_readings(self, snapshot) -> tuple:
+        """The tracked fields' values plus bandwidth_available, for add_raw()."""
+        return self._raw(snapshot)
+
+    def add_raw(self, raw):
+        """Fold in one snapshot's raw_readings()."""
+        counts = self.counts
+        sums = self.sums
+        bandwidth_available = raw[-1]
+        for (field, estimators, kind), value in zip(self._tracked, raw):
+            if kind == "bandwidth" and not bandwidth_available:
+                continue
+            if kind == "temperature" and value <= 0:
+                continue  # SMC sensor not found
+            counts[field] += 1
+            sums[field] += value
+            for estimator in estimators:
+                estimator.add(value)
+
+    def quantile(self, field, p) -> float:
+        """Estimate of quantile p (one of `quantiles`) for a tracked field."""
+        return self._estimators[field][self.quantiles.index(p)].value()
+
+    def results(self) -> dict:
+        """{field: {"p50": ..., "p90": ..., "p99": ...}} for observed fields."""
+        labels = [quantile_label(p) for p in self.quantiles]
+        return {
+            field: {
+                label: estimator.value() for label, estimator in zip(labels, estimators)
+            }
+            for field, estimators in self._estimators.items()
+            if self.counts[field]
+        }
+
+
+def _covered_s(snapshot, last_timestamp) -> float:
+    """Seconds a snapshot's power covers: its measured elapsed_s, or for a
+    snapshot without one (0.0, not produced by a sampler) the time since the
+    previous sample's timestamp."""
+    if snapshot.elapsed_s > 0:
+        return snapshot.elapsed_s
+    if last_timestamp is None:
+        return 0.0
+    return max(0.0, snapshot.timestamp - last_timestamp)
+
+
+class EnergyCounters:
+    """Monotonic energy totals per power domain, for counter exports.
+
+    `joules[name]` only ever grows, integrated on every snapshot the way
+    SessionSummary does, so a scraper taking `rate()` of it gets exact
+    average power between any two scrapes, however they line up with the
+    samples. `last_joules` is the latest snapshot's share.
+    """
+
+    __slots__ = ("count", "covered_s", "joules", "last_joules", "_last_timestamp")
+
+    def __init__(self):
+        self.count = 0
+        self.covered_s = 0.0
+        self.joules = dict.fromkeys(_DOMAIN_NAMES, 0.0)
+        self.last_joules = dict.fromkeys(_DOMAIN_NAMES, 0.0)
+        self._last_timestamp = None
+
+    def update(self, snapshot):
+        elapsed = _covered_s(snapshot, self._last_timestamp)
+        self._last_timestamp = snapshot.timestamp
+        self.count += 1
+        self.covered_s += elapsed
+        for field, name in _POWER_DOMAINS:
+            # Negative readings would make the counter go backwards.
+            joules = max(0.0, getattr(snapshot, field)) * elapsed
+            self.last_joules[name] = joules
+            self.joules[name] += joules
+
+
+class SessionSummary:
+    """Sample count, covered time, energy, peak power and percentiles of a
+    session.
+
+    Energy integrates each snapshot's power over the time it actually covers
+    (`elapsed_s`, the measured span of its deltas), so the first interval is
+    counted and unevenly spaced samples are weighted correctly. A snapshot
+    without elapsed_s (0.0, not produced by a sampler) covers the time since
+    the previous sample's timestamp instead. Averages are energy over covered
+    time; peaks include in-interval subsample maxima (`interval_max`).
+    Percentiles come from a QuantileTracker over the per-sample readings;
+    update() only buffers those (a bounded batch, folded when summary() reads
+    them or the batch fills), so it stays a few microseconds.
+    """
+
+    __slots__ = (
+        "count",
+        "duration_s",
+        "joules",
+        "peaks",
+        "_quantiles",
+        "_pending",
+        "_last_timestamp",
+    )
+
+    def __init__(self):
+        self._quantiles = QuantileTracker()
+        self._pending = []  # QuantileTracker.raw_readings() not yet folded
+        self.reset()
+
+    @property
+    def quantiles(self) -> QuantileTracker:
+        """The percentile tracker, with every buffered reading folded in."""
+        self._fold_pending()
+        return self._quantiles
+
+    def reset(self):
+        self.count = 0
+        self.duration_s = 0.0
+        self.joules = dict.fromkeys(_DOMAIN_NAMES, 0.0)
+        self.peaks = dict.fromkeys(_DOMAIN_NAMES, 0.0)
+        self._quantiles.reset()
+        self._pending.clear()
+        self._last_timestamp = None
+
+    def update(self, snapshot):
+        elapsed = _covered_s(snapshot, self._last_timestamp)
+        self._last_timestamp = snapshot.timestamp
+        self.count += 1
+        self.duration_s += elapsed
+        joules = self.joules
+        peaks = self.peaks
+        interval_max = snapshot.interval_max
+        for field, name in _POWER_DOMAINS:
+            watts = getattr(snapshot, field)
+            joules[name] += watts * elapsed
+            peak = interval_max.get(field, watts)
+            if self.count == 1 or peak > peaks[name]:
+                peaks[name] = peak
+        pending = self._pending
+        pending.append(self._quantiles.raw_readings(snapshot))
+        if len(pending) >= _PENDING_READINGS:
+            self._fold_pending()
+
+    def _fold_pending(self):
+        add_raw = self._quantiles.add_raw
+        for raw in self._pending:
+            add_raw(raw)
+        self._pending.clear()
+
+    def summary(self) -> dict:
+        """The Profiler.get_summary() dict; {} before the first sample.
+
+        Percentiles are flat keys such as `p99_package_watts`.
+        """
+        if not self.count:
+            return {}
+        duration = self.duration_s
+        joules = self.joules
+        out = {"sample_count": self.count, "duration_s": duration}
+        for name in ("cpu", "gpu", "package"):
+            out["avg_{}_watts".format(name)] = (
+                joules[name] / duration if duration > 0 else 0.0
+            )
+        for name in ("cpu", "gpu", "package"):
+            out["peak_{}_watts".format(name)] = self.peaks[name]
+        for name in ("cpu", "gpu", "ane", "package"):
+            out["total_{}_joules".format(name)] = joules[name]
+        for field, values in self.quantiles.results().items():
+            for label, value in values.items():
+                out["{}_{}".format(label, field)] = value
+        return out
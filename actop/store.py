@@ -0,0 +1,375 @@
+"""Columnar, optionally bounded storage for SystemSnapshot series.
+
+`Profiler` used to keep every snapshot as a dataclass with nested CoreSample
+lists and residency/extreme dicts — a few KiB per sample, unbounded. A
+`SampleStore` keeps one typed `array` column per scalar field instead, plus a
+row-major 2-D block per cluster for per-core activity and frequency. Floats
+are stored as float64, so rebuilt snapshots equal the ones appended; that is
+about 400 bytes per sample on a 16-core chip. With `capacity` set the columns
+are preallocated and written as a ring: once full, each append overwrites the
+oldest sample, so a multi-hour run holds at most `capacity` samples.
+
+Snapshots are rebuilt on demand (`store[i]`, iteration). `columns()` hands out
+whole chronological columns as `array`s, and `to_numpy()` as NumPy arrays
+made with one buffer copy per column (per cluster for core data), so
+`Profiler.to_pandas()` / `to_numpy()` never build a per-row object.
+"""
+
+from array import array
+from operator import attrgetter, itemgetter
+
+from .models import CoreSample, SystemSnapshot
+
+# (SystemSnapshot field, array typecode) stored one value per sample.
+_SCALAR_COLUMNS = (
+    ("timestamp", "d"),
+    ("monotonic_s", "d"),
+    ("elapsed_s", "d"),
+    ("cpu_watts", "d"),
+    ("gpu_watts", "d"),
+    ("ane_watts", "d"),
+    ("package_watts", "d"),
+    ("ecpu_util_pct", "d"),
+    ("pcpu_util_pct", "d"),
+    ("gpu_util_pct", "d"),
+    ("cpu_temp_c", "d"),
+    ("gpu_temp_c", "d"),
+    ("ecpu_freq_mhz", "i"),
+    ("pcpu_freq_mhz", "i"),
+    ("gpu_freq_mhz", "i"),
+    ("ecpu_max_freq_mhz", "i"),
+    ("pcpu_max_freq_mhz", "i"),
+    ("gpu_max_freq_mhz", "i"),
+    ("ram_used_gb", "d"),
+    ("swap_used_gb", "d"),
+    ("bandwidth_gbps", "d"),
+    ("bandwidth_available", "b"),
+)
+_RESIDENCY_DOMAINS = ("ecpu", "pcpu", "gpu")
+_RESIDENCY_BUCKETS = ("idle", "low", "mid", "high")
+# SystemSnapshot.interval_min / interval_max keys (see api._snapshot_extremes).
+_EXTREME_KEYS = (
+    "cpu_watts",
+    "gpu_watts",
+    "ane_watts",
+    "package_watts",
+    "ecpu_util_pct",
+    "pcpu_util_pct",
+    "gpu_util_pct",
+    "bandwidth_gbps",
+)
+_CLUSTERS = ("e", "p")
+
+
+# Every one-value-per-sample column as (name, typecode), in _read_row order.
+_COLUMNS = (
+    _SCALAR_COLUMNS
+    + tuple(
+        ("{}_residency_{}_pct".format(domain, bucket), "h")
+        for domain in _RESIDENCY_DOMAINS
+        for bucket in _RESIDENCY_BUCKETS
+    )
+    + tuple(
+        ("interval_{}_{}".format(side, key), "d")
+        for side in ("min", "max")
+        for key in _EXTREME_KEYS
+    )
+)
+_get_scalars = attrgetter(*(name for name, _ in _SCALAR_COLUMNS))
+_get_residencies = attrgetter(*(d + "_residency_pct" for d in _RESIDENCY_DOMAINS))
+_get_buckets = itemgetter(*_RESIDENCY_BUCKETS)
+_get_extreme_defaults = attrgetter(*_EXTREME_KEYS)
+_get_extremes = itemgetter(*_EXTREME_KEYS)
+_get_core_index = attrgetter("index")
+_get_core_active = attrgetter("active_pct")
+_get_core_freq = attrgetter("freq_mhz")
+
+
+def _read_row(snapshot):
+    """One snapshot's values, parallel to _COLUMNS."""
+    row = list(_get_scalars(snapshot))
+    for residency in _get_residencies(snapshot):
+        try:
+            row += _get_buckets(residency)
+        except KeyError:
+            row += [residency.get(bucket, 0) for bucket in _RESIDENCY_BUCKETS]
+    for extremes in (snapshot.interval_min, snapshot.interval_max):
+        try:
+            row += _get_extremes(extremes)
+        except KeyError:
+            # A snapshot without extremes is its own min/max.
+            defaults = _get_extreme_defaults(snapshot)
+            row += [extremes.get(key, d) for key, d in zip(_EXTREME_KEYS, defaults)]
+    return row
+
+
+def _core_row(cores, index):
+    """(active %, MHz) arrays of `cores` aligned to the core indices `index`;
+    a core missing from `cores` reads 0."""
+    if tuple(map(_get_core_index, cores)) == index:
+        return (
+            array("h", map(_get_core_active, cores)),
+            array("i", map(_get_core_freq, cores)),
+        )
+    by_index = {core.index: core for core in cores}
+    found = [by_index.get(idx) for idx in index]
+    return (
+        array("h", [core.active_pct if core else 0 for core in found]),
+        array("i", [core.freq_mhz if core else 0 for core in found]),
+    )
+
+
+class SampleStore:
+    """Typed columns of SystemSnapshot fields; a ring when capacity is set.
+
+    Per-core columns are aligned to the core indices of the first snapshot
+    appended (after construction or clear()); a later snapshot missing one of
+    those cores stores 0 for it, and cores it adds are not kept.
+    """
+
+    def __init__(self, capacity=None):
+        if capacity is not None and capacity < 1:
+            raise ValueError("capacity must be >= 1, got {!r}".format(capacity))
+        self._capacity = capacity
+        self.clear()
+
+    @property
+    def capacity(self):
+        """Maximum samples held, or None for unbounded."""
+        return self._capacity
+
+    @property
+    def dropped(self):
+        """Samples overwritten by the ring since the last clear()."""
+        return self._appended - len(self)
+
+    @property
+    def core_indices(self):
+        """{"e": (...), "p": (...)} system core indices of the per-core blocks."""
+        return dict(self._core_index or {})
+
+    def clear(self):
+        self._appended = 0
+        self._columns = [self._new_column(code, 1) for _, code in _COLUMNS]
+        self._thermal = array("b")
+        self._thermal_states = []  # code -> thermal state string
+        self._thermal_codes = {}
+        self._core_index = None
+        self._core_active = None
+        self._core_freq = None
+
+    def _new_column(self, code, width):
+        if self._capacity is None:
+            return array(code)
+        return array(code, bytes(array(code).itemsize * width * self._capacity))
+
+    def __len__(self):
+        if self._capacity is None:
+            return self._appended
+        return min(self._appended, self._capacity)
+
+    def append(self, snapshot):
+        if self._core_index is None:
+            self._init_cores(snapshot)
+        code = self._thermal_codes.get(snapshot.thermal_state)
+        if code is None:
+            code = len(self._thermal_states)
+            self._thermal_states.append(snapshot.thermal_state)
+            self._thermal_codes[snapshot.thermal_state] = code
+
+        row = _read_row(snapshot)
+        if self._capacity is None:
+            for column, value in zip(self._columns, row):
+                column.append(value)
+            self._thermal.append(code)
+            for side in _CLUSTERS:
+                active, freq = self._core_row(snapshot, side)
+                self._core_active[side].extend(active)
+                self._core_freq[side].extend(freq)
+        else:
+            slot = self._appended % self._capacity
+            for column, value in zip(self._columns, row):
+                column[slot] = value
+            self._thermal[slot] = code
+            for side in _CLUSTERS:
+                width = len(self._core_index[side])
+                active, freq = self._core_row(snapshot, side)
+                self._core_active[side][slot * width : (slot + 1) * width] = active
+                self._core_freq[side][slot * width : (slot + 1) * width] = freq
+        self._appended += 1
+
+    def _init_cores(self, snapshot):
+        self._core_index = {}
+        self._core_active = {}
+        self._core_freq = {}
+        for side in _CLUSTERS:
+            index = tuple(core.index for core in getattr(snapshot, side + "_cores"))
+            self._core_index[side] = index
+            self._core_active[side] = self._new_column("h", len(index))
+            self._core_freq[side] = self._new_column("i", len(index))
+        self._thermal = self._new_column("b", 1)
+
+    def _core_row(self, snapshot, side):
+        return _core_row(getattr(snapshot, side + "_cores"), self._core_index[side])
+
+    # --- Reads ---
+
+    def _oldest_slot(self):
+        if self._capacity is None or self._appended <= self._capacity:
+            return 0
+        return self._appended % self._capacity
+
+    def _ordered(self, column, width=1):
+        """A chronological copy of a (possibly wrapped) column."""
+        count = len(self)
+        start = self._oldest_slot() * width
+        if start == 0:
+            return column[: count * width]
+        return column[start:] + column[:start]
+
+    def column(self, name):
+        """Chronological values of one column (see columns() for names)."""
+        for column, (col_name, _) in zip(self._columns, _COLUMNS):
+            if col_name == name:
+                return self._ordered(column)
+        if name == "thermal_state":
+            states = self._thermal_states
+            return [states[code] for code in self._ordered(self._thermal)]
+        raise KeyError(name)
+
+    def columns(self):
+        """{name: chronological column} for every stored value.
+
+        Scalar fields keep their SystemSnapshot names; residency buckets are
+        `<domain>_residency_<bucket>_pct`, interval extremes
+        `interval_<min|max>_<field>`, and per-core values
+        `<e|p>_core<index>_active_pct` / `_freq_mhz`. thermal_state is a list
+        of strings; every other column is an `array`.
+        """
+        out = {
+            name: self._ordered(column)
+            for column, (name, _) in zip(self._columns, _COLUMNS)
+        }
+        out["thermal_state"] = self.column("thermal_state")
+        if self._core_index is None:
+            return out
+        for side in _CLUSTERS:
+            index = self._core_index[side]
+            width = len(index)
+            if not width:
+                continue
+            active = self._ordered(self._core_active[side], width)
+            freq = self._ordered(self._core_freq[side], width)
+            for pos, idx in enumerate(index):
+                prefix = "{}_core{}".format(side, idx)
+                out[prefix + "_active_pct"] = active[pos::width]
+                out[prefix + "_freq_mhz"] = freq[pos::width]
+        return out
+
+    def to_numpy(self):
+        """{name: ndarray} with the same names as columns().
+
+        Each column is copied out of the live buffer in one block (a view
+        would pin the buffer and block the next append); per-core columns are
+        strided views of one (samples, cores) copy per cluster.
+        thermal_state is an object array of strings, bandwidth_available bool.
+        """
+        try:
+            import numpy as np
+        except ImportError:
+            raise ImportError("numpy is required for to_numpy(): pip install numpy")
+
+        out = {
+            name: self._ordered_numpy(np, column)
+            for column, (name, _) in zip(self._columns, _COLUMNS)
+        }
+        out["bandwidth_available"] = out["bandwidth_available"].astype(bool)
+        states = np.array(self._thermal_states + [""], dtype=object)
+        out["thermal_state"] = states[self._ordered_numpy(np, self._thermal)]
+        if self._core_index is None:
+            return out
+        for side in _CLUSTERS:
+            index = self._core_index[side]
+            width = len(index)
+            if not width:
+                continue
+            active = self._ordered_numpy(np, self._core_active[side], width)
+            active = active.reshape(-1, width)
+            freq = self._ordered_numpy(np, self._core_freq[side], width)
+            freq = freq.reshape(-1, width)
+            for pos, idx in enumerate(index):
+                prefix = "{}_core{}".format(side, idx)
+                out[prefix + "_active_pct"] = active[:, pos]
+                out[prefix + "_freq_mhz"] = freq[:, pos]
+        return out
+
+    def _ordered_numpy(self, np, column, width=1):
+        """Chronological flat copy of a column of width values per sample."""
+        count = len(self)
+        start = self._oldest_slot() * width
+        flat = np.frombuffer(column, dtype=column.typecode)
+        if start == 0:
+            out = flat[: count * width].copy()
+        else:
+            out = np.concatenate((flat[start:], flat[:start]))
+        del flat  # release the buffer export before the next append
+        return out
+
+    def __getitem__(self, i):
+        count = len(self)
+        if i < 0:
+            i += count
+        if not 0 <= i < count:
+            raise IndexError("sample index out of range")
+        slot = i
+        if self._capacity is not None:
+            slot = (self._oldest_slot() + i) % self._capacity
+        return self._snapshot_at(slot)
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    def _snapshot_at(self, slot):
+        values = {
+            name: column[slot] for column, (name, _) in zip(self._columns, _COLUMNS)
+        }
+        cores = {}
+        for side in _CLUSTERS:
+            index = self._core_index[side]
+            width = len(index)
+            cores[side] = (
+                index,
+                self._core_active[side][slot * width : (slot + 1) * width],
+                self._core_freq[side][slot * width : (slot + 1) * width],
+            )
+        return snapshot_from_row(
+            values, self._thermal_states[self._thermal[slot]], cores
+        )
+
+
+def snapshot_from_row(values, thermal_state, cores):
+    """Rebuild a SystemSnapshot from one sample's column values.
+
+    values: {column name: value} for the one-value-per-sample columns (see
+    SampleStore.columns()); cores: {"e"|"p": (indices, active %, MHz)}.
+    """
+    fields = {name: values[name] for name, _ in _SCALAR_COLUMNS}
+    fields["bandwidth_available"] = bool(fields["bandwidth_available"])
+    fields["thermal_state"] = thermal_state
+    for domain in _RESIDENCY_DOMAINS:
+        fields[domain + "_residency_pct"] = {
+            bucket: values["{}_residency_{}_pct".format(domain, bucket)]
+            for bucket in _RESIDENCY_BUCKETS
+        }
+    for side in ("min", "max"):
+        fields["interval_" + side] = {
+            key: values["interval_{}_{}".format(side, key)] for key in _EXTREME_KEYS
+        }
+    for side in _CLUSTERS:
+        index, active, freq = cores[side]
+        fields[side + "_cores"] = [
+            CoreSample(index=idx, active_pct=a, freq_mhz=f)
+            for idx, a, f in zip(index, active, freq)
+        ]
+    return SystemSnapshot(**fields)
@@ -301,7 +301,7 @@ class ActopApp(App):
             f"actop v{__version__}\n\n"
             f"{self._chip_name}\n"
             f"E-cores: {cfg.e_core_count}   P-cores: {cfg.p_core_count}\n"
-            f"interval: {cfg.sample_interval}s   subsamples: {cfg.subsamples}\n\n"
+            f"interval: {cfg.sample_interval:g}s   subsamples: {cfg.subsamples}\n\n"
             f"{_SPINNER_FRAMES[self._splash_frame]} Initializing sampler…"
         )
 
@@ -325,7 +325,11 @@ class ActopApp(App):
 
     @work(thread=True, exclusive=True)
     def poll_metrics(self) -> None:
-        monitor = Monitor(self._config.sample_interval, self._config.subsamples)
+        monitor = Monitor(
+            self._config.sample_interval,
+            self._config.subsamples,
+            overrun=self._config.overrun,
+        )
         try:
             while not self._stop_polling.is_set():
                 snapshot = monitor.get_snapshot()
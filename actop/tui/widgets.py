@@ -10,6 +10,7 @@ from textual.message import Message
 from textual.widget import Widget
 from textual.widgets import Static
 
+from actop.alerts import bandwidth_percent, dashboard_alerts, package_power_percent
 from actop.models import SystemSnapshot
 from actop.power_scaling import (
     DEFAULT_CPU_FLOOR_W,
@@ -17,6 +18,7 @@ from actop.power_scaling import (
     clamp_percent,
     power_to_percent,
 )
+from actop.stats import QuantileTracker
 
 
 _COOL_RGB = (66, 135, 245)  # blue
@@ -271,50 +273,6 @@ class MetricsUpdated(Message):
         super().__init__()
 
 
-# Throttle detection gates (heuristics). A cluster is only "throttling" when it is
-# working hard yet held below its DVFS ceiling while hot — an idle or power-capped
-# cluster at low freq is not throttling. The thermal-pressure signal is the primary
-# "hot" test; the die-temp gate is a fallback for machines whose SMC temps read 0.
-_THROTTLE_UTIL_GATE = 80.0  # percent: cluster must be at least this busy
-_THROTTLE_TEMP_C = 90.0  # °C: die-temp fallback when thermal_state stays Nominal
-
-
-def _domain_throttling(util, freq, max_freq, temp, thermal_state, cfg) -> bool:
-    """True when a silicon domain is busy + slow + hot (see gates above).
-
-    slow = current freq below `alert_throttle_freq_percent`% of the DVFS ceiling.
-    Returns False when the ceiling is unknown (max_freq <= 0) — the ratio is
-    uncomputable, so we cannot claim throttling.
-    """
-    if max_freq <= 0:
-        return False
-    busy = util >= _THROTTLE_UTIL_GATE
-    slow = freq < (cfg.alert_throttle_freq_percent / 100.0) * max_freq
-    hot = thermal_state not in ("Nominal", "Unknown") or temp >= _THROTTLE_TEMP_C
-    return busy and slow and hot
-
-
-def _bandwidth_percent(snapshot, cfg) -> float:
-    """Memory bandwidth as a percent of summed CPU+GPU channel capacity.
-
-    Returns 0 when bandwidth is unavailable. Shared by the chart and the
-    saturation alert so both normalise against the same reference.
-    """
-    total_bw_ref = max(cfg.max_cpu_bw + cfg.max_gpu_bw, 1.0)
-    if not snapshot.bandwidth_available:
-        return 0
-    return clamp_percent(snapshot.bandwidth_gbps / total_bw_ref * 100)
-
-
-def _package_power_percent(snapshot, cfg) -> float:
-    """Package power as a percent of the SoC reference rail.
-
-    Shared by the chart and the PKG alert so both normalise against the
-    same reference.
-    """
-    return clamp_percent(snapshot.package_watts / max(cfg.package_ref_w, 1.0) * 100)
-
-
 _RESIDENCY_ORDER = ("idle", "low", "mid", "high")
 _RESIDENCY_GLYPHS = {"idle": "░", "low": "▒", "mid": "▓", "high": "█"}
 
@@ -364,7 +322,6 @@ class HardwareDashboard(Widget):
         self._chart_glyph = getattr(cfg, "chart_glyph", "dots")
 
         maxlen = self._CHART_HIST_MAXLEN
-        swap_maxlen = max(2, cfg.alert_sustain_samples + 1)
 
         self._ecpu_hist: deque = deque([0] * maxlen, maxlen=maxlen)
         self._pcpu_hist: deque = deque([0] * maxlen, maxlen=maxlen)
@@ -389,20 +346,22 @@ class HardwareDashboard(Widget):
         # right-alignment, so avg/max must ignore the leading padding.
         self._sample_count: int = 0
 
-        self._swap_hist: deque = deque([], maxlen=swap_maxlen)
-
         self._cpu_peak_w: float = 0.0
         self._gpu_peak_w: float = 0.0
 
-        self._high_bw_counter: int = 0
-        self._high_pkg_counter: int = 0
-        self._throttle_cpu_counter: int = 0
-        self._throttle_gpu_counter: int = 0
+        # Sustained bandwidth/package/throttle counts and the swap-rise
+        # window live in the compiled rules (see actop.alerts).
+        self._alerts = dashboard_alerts(cfg)
 
         # Cumulative session energy (joules), integrated as package_watts ×
-        # interval each frame — the "what did this run cost" readout, mirroring
+        # measured elapsed time each frame — the "what did this run cost" readout, mirroring
         # Profiler.total_package_joules for the live TUI.
         self._session_joules: float = 0.0
+        # Session p99 of the watt and GB/s rows, in constant memory (the
+        # histories above are capped at the chart width).
+        self._session_quantiles = QuantileTracker(
+            ("cpu_watts", "gpu_watts", "package_watts", "bandwidth_gbps"), (0.99,)
+        )
 
         # Per-core history (dict: index -> deque)
         self._core_hist: dict = {}
@@ -549,26 +508,25 @@ class HardwareDashboard(Widget):
         self._gpupwr_hist.append(gpu_pwr_pct)
 
         # Package power chart percent (vs SoC reference rail), mirroring the
-        # PKG alert normalisation in _compute_alerts.
-        pkg_pwr_pct = _package_power_percent(s, cfg)
+        # PKG alert in dashboard_alerts.
+        pkg_pwr_pct = package_power_percent(s, cfg)
         if s.package_watts > 0 and pkg_pwr_pct == 0:
             pkg_pwr_pct = 1
         self._pkgpwr_hist.append(pkg_pwr_pct)
         self._pkg_w_hist.append(s.package_watts)
-        self._session_joules += max(0.0, s.package_watts) * max(
-            1, int(getattr(cfg, "sample_interval", 1))
+        self._session_joules += max(0.0, s.package_watts) * (
+            s.elapsed_s or getattr(cfg, "sample_interval", 1)
         )
+        self._session_quantiles.update(s)
 
         # Memory bandwidth chart percent (vs summed CPU+GPU channel capacity),
-        # mirroring the BW alert normalisation in _compute_alerts.
-        bw_pct = _bandwidth_percent(s, cfg)
+        # mirroring the BW alert in dashboard_alerts.
+        bw_pct = bandwidth_percent(s, cfg)
         if s.bandwidth_available and s.bandwidth_gbps > 0 and bw_pct == 0:
             bw_pct = 1  # nudge a tiny-but-nonzero draw off the floor for the chart
         self._bw_hist.append(bw_pct)
         self._bw_gbps_hist.append(s.bandwidth_gbps if s.bandwidth_available else 0.0)
 
-        self._swap_hist.append(max(0.0, float(ram.get("swap_used_GB", 0.0) or 0.0)))
-
         # Update charts
         chart_data = (
             ("#pcpu-chart", self._pcpu_hist),
@@ -640,17 +598,18 @@ class HardwareDashboard(Widget):
 
         self.query_one("#cpupwr-label", Static).update(
             "CPU Power {:.2f}W{}".format(
-                s.cpu_watts, self._watt_stats_suffix(self._cpu_w_hist)
+                s.cpu_watts, self._watt_stats_suffix(self._cpu_w_hist, "cpu_watts")
             )
         )
         self.query_one("#gpupwr-label", Static).update(
             "GPU Power {:.2f}W{}".format(
-                s.gpu_watts, self._watt_stats_suffix(self._gpu_w_hist)
+                s.gpu_watts, self._watt_stats_suffix(self._gpu_w_hist, "gpu_watts")
             )
         )
         self.query_one("#pkgpwr-label", Static).update(
             "Package Power {:.2f}W{}".format(
-                s.package_watts, self._watt_stats_suffix(self._pkg_w_hist)
+                s.package_watts,
+                self._watt_stats_suffix(self._pkg_w_hist, "package_watts"),
             )
         )
 
@@ -665,7 +624,8 @@ class HardwareDashboard(Widget):
         if s.bandwidth_available:
             bw_label.update(
                 "Mem BW {:.1f} GB/s{}".format(
-                    s.bandwidth_gbps, self._gbps_stats_suffix(self._bw_gbps_hist)
+                    s.bandwidth_gbps,
+                    self._gbps_stats_suffix(self._bw_gbps_hist, "bandwidth_gbps"),
                 )
             )
 
@@ -723,15 +683,24 @@ class HardwareDashboard(Widget):
         avg, mx = self._avg_max(hist)
         return "  avg {:.0f}% · max {:.0f}%".format(avg, mx)
 
-    def _watt_stats_suffix(self, hist) -> str:
-        """`  avg N.NW · max N.NW` context string for a watt-valued history."""
+    def _session_p99(self, field) -> float:
+        return self._session_quantiles.quantile(field, 0.99)
+
+    def _watt_stats_suffix(self, hist, field) -> str:
+        """`  avg N.NW · p99 N.NW · max N.NW` context string for a watt-valued
+        history; p99 is over the whole session."""
         avg, mx = self._avg_max(hist)
-        return "  avg {:.1f}W · max {:.1f}W".format(avg, mx)
+        return "  avg {:.1f}W · p99 {:.1f}W · max {:.1f}W".format(
+            avg, self._session_p99(field), mx
+        )
 
-    def _gbps_stats_suffix(self, hist) -> str:
-        """`  avg N.N · max N.N GB/s` context string for a bandwidth history."""
+    def _gbps_stats_suffix(self, hist, field) -> str:
+        """`  avg N.N · p99 N.N · max N.N GB/s` context string for a bandwidth
+        history; p99 is over the whole session."""
         avg, mx = self._avg_max(hist)
-        return "  avg {:.1f} · max {:.1f} GB/s".format(avg, mx)
+        return "  avg {:.1f} · p99 {:.1f} · max {:.1f} GB/s".format(
+            avg, self._session_p99(field), mx
+        )
 
     def _update_cluster_summary_row(
         self,
@@ -808,87 +777,35 @@ class HardwareDashboard(Widget):
         """Compute alert flags and update the status line."""
         cfg = self._config
 
-        # Bandwidth saturation: compare total BW to total capacity (cpu + gpu refs).
-        # The old dashing TUI fired on the hottest individual channel; since
-        # SystemSnapshot only exposes the aggregate total, we normalise against
-        # the sum of cpu and gpu channel references — the closest equivalent.
-        bw_pct = _bandwidth_percent(s, cfg)
-        if s.bandwidth_available and bw_pct >= cfg.alert_bw_sat_percent:
-            self._high_bw_counter += 1
-        else:
-            self._high_bw_counter = 0
-        bw_alert = self._high_bw_counter >= cfg.alert_sustain_samples
-
-        # Package power
-        pkg_pct = _package_power_percent(s, cfg)
-        if pkg_pct >= cfg.alert_package_power_percent:
-            self._high_pkg_counter += 1
-        else:
-            self._high_pkg_counter = 0
-        pkg_alert = self._high_pkg_counter >= cfg.alert_sustain_samples
-
-        # Thermal throttle, per silicon domain (P-cluster CPU, GPU): busy + held
-        # below the DVFS ceiling + hot. Sustained like the other alerts.
-        if _domain_throttling(
-            s.pcpu_util_pct,
-            s.pcpu_freq_mhz,
-            s.pcpu_max_freq_mhz,
-            s.cpu_temp_c,
-            s.thermal_state,
-            cfg,
-        ):
-            self._throttle_cpu_counter += 1
-        else:
-            self._throttle_cpu_counter = 0
-        cpu_throttle = self._throttle_cpu_counter >= cfg.alert_sustain_samples
-
-        if _domain_throttling(
-            s.gpu_util_pct,
-            s.gpu_freq_mhz,
-            s.gpu_max_freq_mhz,
-            s.gpu_temp_c,
-            s.thermal_state,
-            cfg,
-        ):
-            self._throttle_gpu_counter += 1
-        else:
-            self._throttle_gpu_counter = 0
-        gpu_throttle = self._throttle_gpu_counter >= cfg.alert_sustain_samples
-
-        # Swap rise
-        swap_history_points = cfg.alert_sustain_samples + 1
-        swap_rise = (
-            max(0.0, self._swap_hist[-1] - self._swap_hist[0])
-            if len(self._swap_hist) > 1
-            else 0.0
-        )
+        # Bandwidth saturation is normalised against the sum of the cpu and
+        # gpu channel references (SystemSnapshot only exposes the aggregate
+        # total); throttling is per silicon domain (busy + held below the
+        # DVFS ceiling + hot). Both, and package power, must be sustained for
+        # alert_sustain_samples; swap rise is measured over that many samples.
+        self._alerts.evaluate(s)
+        active = self._alerts.active
         swap_total = float(ram.get("swap_total_GB", 0.0) or 0.0)
-        swap_alert = (
-            swap_total >= 0.1
-            and len(self._swap_hist) >= swap_history_points
-            and swap_rise >= cfg.alert_swap_rise_gb
-        )
+        swap_alert = swap_total >= 0.1 and "swap" in active
 
         # Chart time window: charts plot one sample per character, so the
         # visible span scales silently with terminal width. Surface it.
         span_label = self._chart_window_label()
 
-        # Thermal
-        thermal_alert = s.thermal_state not in ("Nominal", "Unknown")
-
         active_alerts = []
-        if thermal_alert:
+        if "thermal" in active:
             active_alerts.append("THERMAL")
         throttled = [
-            name for name, on in (("CPU", cpu_throttle), ("GPU", gpu_throttle)) if on
+            name
+            for name, rule in (("CPU", "throttle_cpu"), ("GPU", "throttle_gpu"))
+            if rule in active
         ]
         if throttled:
             active_alerts.append("THROTTLING:{}".format(",".join(throttled)))
-        if bw_alert:
+        if "bandwidth" in active:
             active_alerts.append("MEM-BOUND>{}%".format(cfg.alert_bw_sat_percent))
         if swap_alert:
-            active_alerts.append("SWAP+{:.1f}G".format(swap_rise))
-        if pkg_alert:
+            active_alerts.append("SWAP+{:.1f}G".format(active["swap"]))
+        if "package" in active:
             active_alerts.append("PKG>{}%".format(cfg.alert_package_power_percent))
         alerts_str = ", ".join(active_alerts) if active_alerts else "none"
 
@@ -921,5 +838,5 @@ class HardwareDashboard(Widget):
             return ""
         if width <= 0:
             return ""
-        interval = max(1, int(getattr(self._config, "sample_interval", 1)))
+        interval = getattr(self._config, "sample_interval", 1)
         return _format_window_span(width * interval)
@@ -0,0 +1,5 @@
+"""Benchmark harness for actop's sampling and export hot paths.
+
+Run with ``python -m benchmarks`` from the repository root; see
+``benchmarks.bench`` for the cases and the baseline workflow.
+"""
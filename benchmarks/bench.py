@@ -0,0 +1,477 @@
+"""Latency and allocation benchmarks for the per-sample hot paths.
+
+Every case drives production code with the synthetic fixtures in
+`benchmarks.fixtures`: `IOReportSampler._convert` (through a `ReplaySampler`,
+once per residency format), `_average_samples`, `api._sample_to_snapshot`, the
+JSON and Prometheus formatters, `SampleStore.append` /
+`to_numpy`, `utils.get_top_processes` against a fake
+process table, and `BrailleChart._render_text`. Nothing touches IOReport, so
+the suite runs on any platform.
+
+Per case it reports the median per-call latency over several timed repeats
+and, from a separate tracemalloc pass, the peak bytes one call allocates
+(transient high-water mark) and the bytes it leaves allocated. `--save`
+writes the results as a JSON baseline; `--compare` re-runs and flags any case
+slower (or allocating more) than the baseline by more than `--threshold`,
+exiting non-zero so a release check can gate on it.
+"""
+
+import argparse
+import contextlib
+import fnmatch
+import gc
+import io
+import json
+import platform
+import statistics
+import sys
+import time
+import timeit
+import tracemalloc
+from functools import partial
+
+from actop import api, export, utils
+from actop.alerts import AlertEngine, AlertRule
+from actop.replay import ReplaySampler
+from actop.stats import SessionSummary
+from actop.store import SampleStore
+from actop.tui.widgets import BrailleChart
+
+from .fixtures import (
+    CHIP_PROFILES,
+    RESIDENCY_FORMATS,
+    make_process_table,
+    make_recording,
+)
+
+BASELINE_VERSION = 1
+DEFAULT_THRESHOLD = 0.25  # 25% slower (or more memory) than baseline = regression
+# Allocation growth below this many bytes is noise, not a regression.
+_MIN_BYTES_DELTA = 1024
+
+
+def _numpy_available():
+    try:
+        import numpy  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+# --- Cases: each factory builds its inputs and returns a zero-arg callable ---
+
+
+def _replay_sampler(profile, residency_format, frames=1):
+    recording = make_recording(profile, frames, residency_format)
+    return ReplaySampler(recording, residency_format=residency_format), recording
+
+
+def _convert_case(profile, residency_format):
+    sampler, recording = _replay_sampler(profile, residency_format)
+    items = recording.frames[0].items
+    return partial(sampler._convert, items, 1.0, 55.0, 45.0, "Nominal")
+
+
+def _average_samples_case(profile, subsamples=4):
+    sampler, recording = _replay_sampler(profile, "tuples", frames=subsamples)
+    parts = [
+        sampler._convert(frame.items, 1.0, 0.0, 0.0, "Nominal")
+        for frame in recording.frames
+    ]
+    return partial(sampler._average_samples, parts)
+
+
+def _snapshot(profile):
+    sampler, recording = _replay_sampler(profile, "tuples")
+    sample = sampler._convert(recording.frames[0].items, 1.0, 55.0, 45.0, "Nominal")
+    return sample
+
+
+_RAM = {"used_GB": 21.4, "swap_used_GB": 0.5}
+
+
+def _sample_to_snapshot_case(profile):
+    return partial(api._sample_to_snapshot, _snapshot(profile), _RAM)
+
+
+def _snapshot_to_json_case(profile):
+    snapshot = api._sample_to_snapshot(_snapshot(profile), _RAM)
+    return partial(export.snapshot_to_json, snapshot)
+
+
+def _binary_writer_case(profile, delta):
+    snapshot = api._sample_to_snapshot(_snapshot(profile), _RAM)
+    writer = export.BinaryWriter(io.BytesIO(), delta=delta)
+    writer.write(snapshot)
+    return partial(writer.write, snapshot)
+
+
+def _snapshot_to_prometheus_case(profile):
+    snapshot = api._sample_to_snapshot(_snapshot(profile), _RAM)
+    return partial(export.snapshot_to_prometheus, snapshot)
+
+
+def _store_append_case(profile, capacity=1024):
+    # A full ring: every call overwrites the oldest slot, the Profiler steady
+    # state on a long run.
+    snapshot = api._sample_to_snapshot(_snapshot(profile), _RAM)
+    store = SampleStore(capacity)
+    for _ in range(capacity):
+        store.append(snapshot)
+    return partial(store.append, snapshot)
+
+
+def _store_to_numpy_case(profile, samples=3600):
+    # An hour of 1 s samples, exported the way Profiler.to_numpy() does.
+    snapshot = api._sample_to_snapshot(_snapshot(profile), _RAM)
+    store = SampleStore()
+    for _ in range(samples):
+        store.append(snapshot)
+    return store.to_numpy
+
+
+def _session_summary_update_case(profile, warmup=1000):
+    # Energy, peaks and the P² percentile markers, past their exact warm-up.
+    snapshot = api._sample_to_snapshot(_snapshot(profile), _RAM)
+    summary = SessionSummary()
+    for _ in range(warmup):
+        summary.update(snapshot)
+    return partial(summary.update, snapshot)
+
+
+def _alert_engine_case(profile, rules=300):
+    # Hundreds of threshold, sustained and hysteresis rules over the usual
+    # handful of power/utilization fields.
+    snapshot = api._sample_to_snapshot(_snapshot(profile), _RAM)
+    fields = ("cpu_watts", "gpu_watts", "package_watts", "pcpu_util_pct")
+    engine = AlertEngine(
+        AlertRule(
+            "rule{}".format(n),
+            fields[n % len(fields)],
+            float(n % 50),
+            sustain=1 + n % 3,
+            clear=float(n % 50) - 1 if n % 10 == 0 else None,
+        )
+        for n in range(rules)
+    )
+    return partial(engine.evaluate, snapshot)
+
+
+def _braille_chart_case(width=120, height=4):
+    chart = BrailleChart(color_mode="truecolor")
+    chart.data = [(n * 37) % 101 for n in range(width * 2)]
+    return partial(chart._render_text, width, height)
+
+
+@contextlib.contextmanager
+def _fake_process_source(count=600, generations=8):
+    """Point utils' process readers at a fake table for the duration.
+
+    get_top_processes() binds get_native_processes & co. at import time, so
+    the harness swaps those module attributes (and restores them). Several
+    pre-built generations with advancing CPU times cycle per call, so every
+    call after the first computes real deltas without paying to build a table.
+    """
+    base = make_process_table(count)
+    tables = [
+        [dict(proc, cpu_time_ns=proc["cpu_time_ns"] + g * 10**7) for proc in base]
+        for g in range(generations)
+    ]
+    gpu_times = [
+        {proc["pid"]: 10**6 * g * (n + 1) for n, proc in enumerate(base[::10])}
+        for g in range(generations)
+    ]
+    calls = [0]
+
+    def get_native_processes():
+        calls[0] += 1
+        return tables[calls[0] % generations]
+
+    def get_gpu_time_by_pid():
+        return gpu_times[calls[0] % generations]
+
+    replacements = {
+        "get_native_processes": get_native_processes,
+        "get_gpu_time_by_pid": get_gpu_time_by_pid,
+        "get_process_cmdline": lambda pid: "/usr/local/bin/proc{} --serve".format(pid),
+        "get_sysctl_int": lambda name: 64 * 1024**3,
+    }
+    saved = {name: getattr(utils, name) for name in replacements}
+    try:
+        for name, fn in replacements.items():
+            setattr(utils, name, fn)
+        yield
+    finally:
+        for name, fn in saved.items():
+            setattr(utils, name, fn)
+        utils._PROCESS_CPU_CACHE.clear()
+        utils._PROCESS_GPU_CACHE.clear()
+
+
+def _get_top_processes_case():
+    return partial(utils.get_top_processes, 5)
+
+
+def iter_cases(profiles=None, formats=None):
+    """Yield (name, factory, needs_process_table) for the selected cases."""
+    profiles = list(profiles or CHIP_PROFILES)
+    formats = list(formats or RESIDENCY_FORMATS)
+    if "numpy" in formats and not _numpy_available():
+        formats.remove("numpy")
+    for key in profiles:
+        profile = CHIP_PROFILES[key]
+        for fmt in formats:
+            name = "{}/sampler._convert[{}]".format(key, fmt)
+            yield name, partial(_convert_case, profile, fmt), False
+        yield (
+            "{}/sampler._average_samples".format(key),
+            partial(_average_samples_case, profile),
+            False,
+        )
+        yield (
+            "{}/api._sample_to_snapshot".format(key),
+            partial(_sample_to_snapshot_case, profile),
+            False,
+        )
+        yield (
+            "{}/export.snapshot_to_json".format(key),
+            partial(_snapshot_to_json_case, profile),
+            False,
+        )
+        for delta in (False, True):
+            yield (
+                "{}/export.BinaryWriter.write[{}]".format(
+                    key, "delta" if delta else "full"
+                ),
+                partial(_binary_writer_case, profile, delta),
+                False,
+            )
+        yield (
+            "{}/export.snapshot_to_prometheus".format(key),
+            partial(_snapshot_to_prometheus_case, profile),
+            False,
+        )
+        yield (
+            "{}/store.SampleStore.append".format(key),
+            partial(_store_append_case, profile),
+            False,
+        )
+        yield (
+            "{}/stats.SessionSummary.update".format(key),
+            partial(_session_summary_update_case, profile),
+            False,
+        )
+        yield (
+            "{}/alerts.AlertEngine.evaluate".format(key),
+            partial(_alert_engine_case, profile),
+            False,
+        )
+        if _numpy_available():
+            yield (
+                "{}/store.SampleStore.to_numpy".format(key),
+                partial(_store_to_numpy_case, profile),
+                False,
+            )
+    yield "utils.get_top_processes", _get_top_processes_case, True
+    yield "tui.BrailleChart._render_text", _braille_chart_case, False
+
+
+# --- Measurement ---
+
+
+def measure(fn, repeat=5, min_time=0.2):
+    """Return {"ns_per_call", "min_ns_per_call", "calls", "peak_bytes",
+    "retained_bytes"} for a zero-arg callable."""
+    fn()  # warm caches (state plans, interned names) before timing
+    timer = timeit.Timer(fn, timer=time.perf_counter)
+    number = 1
+    while True:
+        elapsed = timer.timeit(number)
+        if elapsed >= min_time / repeat:
+            break
+        number *= 2 if elapsed <= 0 else max(2, int(min_time / repeat / elapsed) + 1)
+    per_call = [t / number * 1e9 for t in timer.repeat(repeat, number)]
+
+    gc.collect()
+    tracemalloc.start()
+    try:
+        before, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        result = fn()
+        after, peak = tracemalloc.get_traced_memory()
+        del result
+    finally:
+        tracemalloc.stop()
+
+    return {
+        "ns_per_call": statistics.median(per_call),
+        "min_ns_per_call": min(per_call),
+        "calls": number * repeat,
+        "peak_bytes": max(0, peak - before),
+        "retained_bytes": max(0, after - before),
+    }
+
+
+def run_benchmarks(
+    profiles=None, formats=None, pattern=None, repeat=5, min_time=0.2, out=None
+):
+    """Run the selected cases; returns {case_name: measure() result}."""
+    results = {}
+    for name, factory, needs_process_table in iter_cases(profiles, formats):
+        if pattern and not fnmatch.fnmatch(name, pattern):
+            continue
+        ctx = (
+            _fake_process_source() if needs_process_table else contextlib.nullcontext()
+        )
+        with ctx:
+            results[name] = measure(factory(), repeat=repeat, min_time=min_time)
+        if out is not None:
+            out.write(_format_row(name, results[name]) + "\n")
+            out.flush()
+    return results
+
+
+# --- Baselines ---
+
+
+def _environment():
+    return {
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+    }
+
+
+def save_baseline(path, results):
+    with open(path, "w", encoding="utf-8") as fp:
+        json.dump(
+            {
+                "version": BASELINE_VERSION,
+                "created": time.time(),
+                "environment": _environment(),
+                "results": results,
+            },
+            fp,
+            indent=2,
+            sort_keys=True,
+        )
+        fp.write("\n")
+
+
+def load_baseline(path):
+    with open(path, encoding="utf-8") as fp:
+        data = json.load(fp)
+    if int(data.get("version", 0)) != BASELINE_VERSION or "results" not in data:
+        raise ValueError("not a benchmark baseline: {}".format(path))
+    return data
+
+
+def compare(results, baseline_results, threshold=DEFAULT_THRESHOLD):
+    """Compare results against a baseline's results.
+
+    Returns a list of (name, time_ratio, peak_bytes_delta, regressed) for the
+    cases present in both; time_ratio is current/baseline median latency.
+    """
+    rows = []
+    for name, current in results.items():
+        base = baseline_results.get(name)
+        if base is None:
+            continue
+        ratio = (
+            current["ns_per_call"] / base["ns_per_call"] if base["ns_per_call"] else 1.0
+        )
+        bytes_delta = current["peak_bytes"] - base["peak_bytes"]
+        slower = ratio > 1.0 + threshold
+        heavier = bytes_delta > _MIN_BYTES_DELTA and current["peak_bytes"] > base[
+            "peak_bytes"
+        ] * (1.0 + threshold)
+        rows.append((name, ratio, bytes_delta, slower or heavier))
+    return rows
+
+
+# --- Report ---
+
+
+def _format_row(name, result):
+    return "{:<48} {:>11.2f} us {:>10.1f} KiB peak {:>8.1f} KiB kept".format(
+        name,
+        result["ns_per_call"] / 1000.0,
+        result["peak_bytes"] / 1024.0,
+        result["retained_bytes"] / 1024.0,
+    )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks",
+        description="Time actop's per-sample hot paths on synthetic M-series data.",
+    )
+    parser.add_argument(
+        "--profile",
+        action="append",
+        choices=sorted(CHIP_PROFILES),
+        help="chip profile to run (repeatable; default: all)",
+    )
+    parser.add_argument(
+        "--format",
+        action="append",
+        choices=RESIDENCY_FORMATS,
+        dest="formats",
+        help="residency format for the _convert cases (repeatable; default: all)",
+    )
+    parser.add_argument(
+        "-k", dest="pattern", help="only run cases whose name matches this glob"
+    )
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument(
+        "--min-time",
+        type=float,
+        default=0.2,
+        help="seconds of timed calls per case, split across repeats",
+    )
+    parser.add_argument("--save", metavar="PATH", help="write results as a baseline")
+    parser.add_argument(
+        "--compare", metavar="PATH", help="compare against a saved baseline"
+    )
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=DEFAULT_THRESHOLD,
+        help="regression tolerance as a fraction (default: 0.25)",
+    )
+    args = parser.parse_args(argv)
+
+    baseline = load_baseline(args.compare) if args.compare else None
+    results = run_benchmarks(
+        profiles=args.profile,
+        formats=args.formats,
+        pattern=args.pattern,
+        repeat=args.repeat,
+        min_time=args.min_time,
+        out=sys.stdout,
+    )
+    if args.save:
+        save_baseline(args.save, results)
+        print("baseline saved to {}".format(args.save))
+    if baseline is None:
+        return 0
+
+    rows = compare(results, baseline["results"], args.threshold)
+    regressions = [row for row in rows if row[3]]
+    print()
+    print("vs baseline {} ({}):".format(args.compare, baseline["environment"]))
+    for name, ratio, bytes_delta, regressed in rows:
+        print(
+            "{:<48} {:>7.2f}x {:>+10.1f} KiB{}".format(
+                name, ratio, bytes_delta / 1024.0, "  REGRESSION" if regressed else ""
+            )
+        )
+    if regressions:
+        print(
+            "{} regression(s) over {:.0%} threshold".format(
+                len(regressions), args.threshold
+            )
+        )
+        return 1
+    return 0
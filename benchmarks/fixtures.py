@@ -0,0 +1,188 @@
+"""Synthetic, deterministic inputs for the benchmark harness.
+
+Each chip profile builds an IOReport delta shaped like a real capture of that
+machine: per-core and per-cluster Energy Model counters, one DVFS residency
+channel per core (idle/down plus one state per table entry), the GPUPH
+channel, and the PMP "DCS BW" group — AMCC totals with the full 32-bucket
+histogram, plus the ~90 per-agent channels whose states delta() skips. The
+numbers are plausible, not measured; what matters is that the item count and
+state-vector lengths match the hardware, since those drive the hot paths.
+"""
+
+import random
+from array import array
+
+from actop.ioreport import IOReportItem
+from actop.replay import RECORDING_FORMAT, RECORDING_VERSION, Recording, ReplayFrame
+
+# e/p: core counts. *_freqs: DVFS tables (MHz). amcc: memory-controller dies.
+CHIP_PROFILES = {
+    "m1": {
+        "e": 4,
+        "p": 4,
+        "ecpu_freqs": [600, 972, 1332, 1704, 2064],
+        "pcpu_freqs": [
+            600, 828, 1056, 1284, 1500, 1728, 1956, 2184,
+            2388, 2592, 2772, 2988, 3096, 3144, 3204,
+        ],
+        "gpu_freqs": [396, 528, 720, 924, 1128, 1278],
+        "amcc": 1,
+    },
+    "m3max": {
+        "e": 4,
+        "p": 12,
+        "ecpu_freqs": [744, 1044, 1476, 2004, 2268, 2520, 2748],
+        "pcpu_freqs": [
+            696, 1092, 1356, 1596, 1836, 2064, 2268, 2448, 2640, 2832,
+            3000, 3192, 3360, 3528, 3696, 3780, 3912, 3996, 4056,
+        ],
+        "gpu_freqs": [338, 618, 796, 924, 952, 1056, 1064, 1100, 1284, 1338, 1398],
+        "amcc": 2,
+    },
+    "m2ultra": {
+        "e": 8,
+        "p": 16,
+        "ecpu_freqs": [600, 912, 1284, 1752, 2004, 2256, 2424],
+        "pcpu_freqs": [
+            660, 924, 1188, 1452, 1704, 1968, 2208, 2400, 2568, 2724,
+            2868, 2988, 3096, 3204, 3324, 3408, 3504,
+        ],
+        "gpu_freqs": [444, 612, 808, 968, 1110, 1236, 1338, 1398],
+        "amcc": 4,
+    },
+}  # fmt: skip
+
+RESIDENCY_FORMATS = ("tuples", "array", "numpy")
+
+_BW_BUCKETS = ["{}GB/s".format(32 * (n + 1)) for n in range(32)]
+_BW_AGENTS = ["DCS", "DISP", "ECPU", "PCPU", "AGX", "ANE", "ISP", "AVE", "MSR"]
+
+
+def dvfs_tables(profile):
+    return {
+        "ecpu": list(profile["ecpu_freqs"]),
+        "pcpu": list(profile["pcpu_freqs"]),
+        "gpu": list(profile["gpu_freqs"]),
+    }
+
+
+def make_items(profile, residency_format="tuples", seed=0, interval_ns=10**9):
+    """One delta's IOReportItem list for a chip profile.
+
+    residency_format "array"/"numpy" yields array('q') residencies aligned with
+    state_names, like delta(residency_format="array").
+    """
+    rng = random.Random(seed)
+    as_array = residency_format != "tuples"
+    names_cache = {}
+
+    def state_item(group, subgroup, channel, names, unit="ns", total=interval_ns):
+        names = names_cache.setdefault(tuple(names), tuple(names))
+        weights = [rng.random() for _ in names]
+        scale = total / sum(weights)
+        values = [int(w * scale) for w in weights]
+        if as_array:
+            residencies = array("q", values)
+        else:
+            residencies = list(zip(names, values))
+        return IOReportItem(group, subgroup, channel, unit, 0, residencies, names)
+
+    items = []
+    for name in ("CPU Energy", "GPU Energy", "ANE", "DRAM", "DISP", "ISP", "AVE"):
+        items.append(
+            IOReportItem(
+                "Energy Model", "", name, "nJ", rng.randrange(10**8, 10**10), []
+            )
+        )
+    for prefix, count in (("ECPU", profile["e"]), ("PCPU", profile["p"])):
+        for core in range(count):
+            items.append(
+                IOReportItem(
+                    "Energy Model",
+                    "",
+                    "{}{}".format(prefix, core),
+                    "nJ",
+                    rng.randrange(10**7, 10**9),
+                    [],
+                )
+            )
+
+    for prefix, count, key in (
+        ("ECPU", profile["e"], "ecpu_freqs"),
+        ("PCPU", profile["p"], "pcpu_freqs"),
+    ):
+        names = ["IDLE", "DOWN"] + [
+            "V{}P{}".format(n, n % 4) for n in range(len(profile[key]))
+        ]
+        for core in range(count):
+            items.append(
+                state_item(
+                    "CPU Stats",
+                    "CPU Core Performance States",
+                    "{}{:02d}0".format(prefix, core),
+                    names,
+                )
+            )
+
+    gpu_names = ["OFF"] + ["P{}".format(n) for n in range(1, len(profile["gpu_freqs"]))]
+    items.append(state_item("GPU Stats", "GPU Performance States", "GPUPH", gpu_names))
+
+    for die in range(profile["amcc"]):
+        items.append(
+            state_item(
+                "PMP",
+                "DCS BW",
+                "AMCC{} RD+WR".format(die),
+                _BW_BUCKETS,
+                unit="events",
+                total=rng.randrange(10**5, 10**6),
+            )
+        )
+    # Per-agent DCS BW channels: subscribed, but delta() skips their states.
+    empty = array("q") if as_array else []
+    for n in range(90 - profile["amcc"]):
+        channel = "{}{} {}".format(
+            _BW_AGENTS[n % len(_BW_AGENTS)], n // len(_BW_AGENTS), "RD+WR"
+        )
+        items.append(IOReportItem("PMP", "DCS BW", channel, "events", 0, empty))
+    return items
+
+
+def make_recording(profile, frames=8, residency_format="tuples"):
+    """An in-memory Recording of `frames` distinct deltas for ReplaySampler."""
+    header = {
+        "format": RECORDING_FORMAT,
+        "version": RECORDING_VERSION,
+        "interval": 1,
+        "dvfs": dvfs_tables(profile),
+        "core_counts": {"e_count": profile["e"], "p_count": profile["p"]},
+    }
+    return Recording(
+        header=header,
+        frames=[
+            ReplayFrame(
+                elapsed_s=1.0,
+                items=make_items(profile, residency_format, seed=n),
+                cpu_temp_c=55.0 + n,
+                gpu_temp_c=45.0,
+                thermal_pressure="Nominal",
+            )
+            for n in range(frames)
+        ],
+    )
+
+
+def make_process_table(count=600, seed=0):
+    """A get_native_processes()-shaped list of `count` fake processes."""
+    rng = random.Random(seed)
+    return [
+        {
+            "pid": 100 + n,
+            "name": "proc{}".format(n),
+            "rss_bytes": rng.randrange(1 << 20, 1 << 31),
+            "num_threads": rng.randrange(1, 64),
+            "cpu_time_ns": rng.randrange(10**9, 10**12),
+            "start_tvsec": 1_700_000_000 + n,
+        }
+        for n in range(count)
+    ]
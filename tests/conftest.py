@@ -1,10 +1,17 @@
 import sys
 from pathlib import Path
 
+import pytest
+
 ROOT = Path(__file__).resolve().parents[1]
 if str(ROOT) not in sys.path:
     sys.path.insert(0, str(ROOT))
 
+from actop import SystemSnapshot
+from actop.ioreport import IOReportItem
+from actop.models import CoreSample
+from actop.replay import SampleRecorder
+
 # On non-macOS platforms, skip collecting test modules that import macOS-only
 # libraries (IOReport, CoreFoundation via ctypes).  These modules carry the
 # pytest.mark.local marker, but the top-level imports fail at *collection*
@@ -20,3 +27,152 @@ if sys.platform != "darwin":
         "test_native_sys.py",
         "test_config.py",
     ]
+
+
+# Shared factories live here rather than in the test modules that first needed
+# them: test modules are not importable from one another under
+# ``--import-mode=importlib``, so cross-module helpers are served as fixtures.
+
+_DVFS = {
+    "ecpu": [600, 972, 1332, 1704, 2064],
+    "pcpu": [600, 1200, 2000, 2600, 3200],
+    "gpu": [400, 800, 1000, 1300],
+}
+
+
+def _frame_items(cpu_nj):
+    return [
+        IOReportItem("Energy Model", "", "CPU Energy", "nJ", cpu_nj, []),
+        IOReportItem("Energy Model", "", "GPU Energy", "nJ", 2_000_000_000, []),
+        IOReportItem("Energy Model", "", "ANE", "nJ", 0, []),
+        IOReportItem(
+            "CPU Stats",
+            "CPU Core Performance States",
+            "ECPU000",
+            "ns",
+            0,
+            [("IDLE", 500), ("V0P0", 250), ("V4P0", 250)],
+        ),
+        IOReportItem(
+            "CPU Stats",
+            "CPU Core Performance States",
+            "PCPU000",
+            "ns",
+            0,
+            [("IDLE", 0), ("V4P0", 1000)],
+        ),
+        IOReportItem(
+            "GPU Stats",
+            "GPU Performance States",
+            "GPUPH",
+            "ns",
+            0,
+            [("OFF", 600), ("P3", 400)],
+        ),
+        IOReportItem(
+            "PMP", "DCS BW", "AMCC0 RD+WR", "events", 0, [("32GB/s", 1), ("64GB/s", 1)]
+        ),
+    ]
+
+
+def _write_capture(path, frames=2):
+    recorder = SampleRecorder(path, 1, _DVFS, {"p_count": 1, "e_count": 1})
+    try:
+        for n in range(frames):
+            recorder.write_frame(
+                1.0,
+                _frame_items(5_000_000_000 + n * 1_000_000_000),
+                cpu_temp_c=50.0 + n,
+                gpu_temp_c=40.0,
+                thermal_pressure="Fair",
+            )
+    finally:
+        recorder.close()
+    return path
+
+
+_EXTREME_FIELDS = (
+    "cpu_watts",
+    "gpu_watts",
+    "ane_watts",
+    "package_watts",
+    "ecpu_util_pct",
+    "pcpu_util_pct",
+    "gpu_util_pct",
+    "bandwidth_gbps",
+)
+
+
+def _snapshot(n, thermal_state="Nominal", p_cores=None):
+    snapshot = SystemSnapshot(
+        timestamp=1_700_000_000.0 + n,
+        cpu_watts=1.5 + n,
+        gpu_watts=2.25,
+        ane_watts=0.0,
+        package_watts=3.75 + n,
+        ecpu_util_pct=10.0,
+        pcpu_util_pct=20.0 + n,
+        gpu_util_pct=30.0,
+        cpu_temp_c=55.0,
+        gpu_temp_c=45.0,
+        ecpu_freq_mhz=972,
+        pcpu_freq_mhz=3000 + n,
+        gpu_freq_mhz=1300,
+        ram_used_gb=21.5,
+        swap_used_gb=0.5,
+        thermal_state=thermal_state,
+        bandwidth_gbps=48.0,
+        bandwidth_available=True,
+        ecpu_max_freq_mhz=2064,
+        pcpu_max_freq_mhz=3204,
+        gpu_max_freq_mhz=1398,
+        e_cores=[CoreSample(index=0, active_pct=50, freq_mhz=972)],
+        p_cores=p_cores
+        if p_cores is not None
+        else [
+            CoreSample(index=4, active_pct=20 + n, freq_mhz=3000),
+            CoreSample(index=5, active_pct=40, freq_mhz=3204),
+        ],
+        ecpu_residency_pct={"idle": 50, "low": 25, "mid": 25, "high": 0},
+        elapsed_s=1.0,
+    )
+    for side, delta in (("interval_min", -0.5), ("interval_max", 4.0)):
+        setattr(
+            snapshot,
+            side,
+            {key: getattr(snapshot, key) + delta for key in _EXTREME_FIELDS},
+        )
+    return snapshot
+
+
+@pytest.fixture
+def capture_dvfs():
+    """DVFS table recorded in every synthetic capture header."""
+    return _DVFS
+
+
+@pytest.fixture
+def frame_items():
+    """``frame_items(cpu_nj)``: one synthetic IOReport frame."""
+    return _frame_items
+
+
+@pytest.fixture
+def write_capture():
+    """``write_capture(path, frames=2)``: a capture alternating 5 W and 6 W CPU."""
+    return _write_capture
+
+
+@pytest.fixture
+def replay(tmp_path, monkeypatch):
+    """Point the sampler at a synthetic capture for the rest of the test."""
+    path = _write_capture(tmp_path / "c.jsonl.gz")
+    monkeypatch.setenv("ACTOP_REPLAY", str(path))
+    return path
+
+
+@pytest.fixture
+def make_snapshot():
+    """``make_snapshot(n, thermal_state="Nominal", p_cores=None)``: a fully
+    populated snapshot whose power, P-core load and timestamp vary with n."""
+    return _snapshot
@@ -0,0 +1,153 @@
+"""Compiled alert rules: grouped thresholds fire exactly like one-by-one
+comparisons, and sustain, hysteresis, change and mean keep their state per
+signal."""
+
+import json
+import random
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from actop import Profiler
+from actop.alerts import AlertEngine, AlertRule
+from actop.export import snapshot_to_json, snapshot_to_prometheus
+
+
+def _active_after(engine, values, metric="cpu_watts"):
+    out = []
+    for value in values:
+        engine.evaluate(SimpleNamespace(**{metric: value}))
+        out.append(sorted(engine.active))
+    return out
+
+
+def test_grouped_thresholds_match_direct_comparisons():
+    rng = random.Random(7)
+    ops = {
+        ">=": lambda v, t: v >= t,
+        ">": lambda v, t: v > t,
+        "<=": lambda v, t: v <= t,
+        "<": lambda v, t: v < t,
+    }
+    fields = ("cpu_watts", "gpu_watts", "package_watts", "pcpu_util_pct")
+    rules = [
+        AlertRule(
+            "r{}".format(n),
+            rng.choice(fields),
+            float(rng.randint(0, 20)),
+            rng.choice(list(ops)),
+        )
+        for n in range(300)
+    ]
+    engine = AlertEngine(rules)
+
+    for _ in range(50):
+        snapshot = SimpleNamespace(
+            **{field: float(rng.randint(0, 20)) for field in fields}
+        )
+        fired = engine.evaluate(snapshot)
+        expected = {
+            rule.name
+            for rule in rules
+            if ops[rule.op](getattr(snapshot, rule.metric), rule.threshold)
+        }
+        assert {rule.name for rule, _ in fired} == expected
+        assert all(value == getattr(snapshot, rule.metric) for rule, value in fired)
+
+
+def test_sustain_needs_consecutive_samples():
+    engine = AlertEngine([AlertRule("hot", "cpu_watts", 10.0, sustain=3)])
+
+    active = _active_after(engine, [11, 12, 9, 11, 11, 11, 15])
+
+    assert active == [[], [], [], [], [], ["hot"], ["hot"]]
+
+
+def test_hysteresis_holds_until_the_clear_level():
+    engine = AlertEngine([AlertRule("hot", "cpu_watts", 10.0, clear=8.0)])
+
+    active = _active_after(engine, [9, 10, 9, 8, 7.9, 9])
+
+    assert active == [[], ["hot"], ["hot"], ["hot"], [], []]
+
+
+def test_change_and_mean_over_a_window():
+    engine = AlertEngine(
+        [
+            AlertRule("rising", "swap_used_gb", 1.0, kind="change", window=2),
+            AlertRule("busy", "swap_used_gb", 2.0, kind="mean", window=3),
+        ]
+    )
+
+    active = _active_after(engine, [0.0, 0.5, 1.0, 2.5, 2.5], "swap_used_gb")
+
+    # change: 1.0-0.0, 2.5-0.5, 2.5-1.0; mean: 0.5, 4/3, 2.0.
+    assert active == [[], [], ["rising"], ["rising"], ["busy", "rising"]]
+    assert engine.active["busy"] == pytest.approx(2.0)
+
+
+def test_missing_reading_restarts_the_windows():
+    engine = AlertEngine(
+        [AlertRule("bw", "bw", 50.0, sustain=2)],
+        metrics={"bw": lambda s: s.bw},
+    )
+
+    assert _active_after(engine, [60, None, 60, 60], "bw") == [[], [], [], ["bw"]]
+    engine.reset()
+    assert engine.active == {}
+    assert _active_after(engine, [60], "bw") == [[]]
+
+
+@pytest.mark.parametrize(
+    "rule, match",
+    [
+        (AlertRule("x", "no_such_field", 1.0), "Unknown SystemSnapshot field"),
+        (AlertRule("x", "thermal_state", 1.0), "Non-numeric"),
+        (AlertRule("x", "cpu_watts", 1.0, op="=="), "op must be one of"),
+        (AlertRule("x", "cpu_watts", 1.0, kind="median"), "kind must be one of"),
+        (AlertRule("x", "cpu_watts", 1.0, sustain=0), "must be >= 1"),
+        (AlertRule("x", "cpu_watts", 10.0, clear=12.0), "far side"),
+    ],
+)
+def test_invalid_rules_are_rejected_at_compile_time(rule, match):
+    with pytest.raises(ValueError, match=match):
+        AlertEngine([rule])
+
+
+def test_exporters_publish_the_active_rules(make_snapshot):
+    snapshot = make_snapshot(10)  # 11.5 W CPU, 2.25 W GPU
+    engine = AlertEngine(
+        [
+            AlertRule("cpu_hot", "cpu_watts", 10.0),
+            AlertRule("gpu_hot", "gpu_watts", 10.0),
+        ]
+    )
+    engine.evaluate(snapshot)
+
+    text = snapshot_to_prometheus(snapshot, alerts=engine)
+    record = json.loads(snapshot_to_json(snapshot, alerts=engine))
+
+    assert "# TYPE actop_alert_active gauge" in text
+    assert 'actop_alert_active{alert="cpu_hot"} 1' in text
+    assert 'actop_alert_active{alert="gpu_hot"} 0' in text
+    assert record["alerts"] == {"cpu_hot": 11.5}
+
+
+def test_profiler_alerts_fire_on_sustained_samples(replay):
+    fired = []
+    profiler = Profiler(interval_s=1)
+    # The capture alternates 5 W and 6 W CPU frames.
+    profiler.register_alert("cpu_watts", 5.5, fired.append)
+    profiler.register_alert("cpu_watts", 5.5, fired.append, sustain=2, name="never")
+    with pytest.raises(ValueError, match="Unknown SystemSnapshot field"):
+        profiler.register_alert("nope", 1.0, fired.append)
+
+    with profiler:
+        deadline = time.monotonic() + 5.0
+        while len(profiler._samples) < 6 and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+    high = [s.cpu_watts for s in profiler.samples if s.cpu_watts >= 5.5]
+    assert fired == pytest.approx(high)
+    assert "never" not in profiler._alert_engine.active
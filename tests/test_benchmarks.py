@@ -0,0 +1,65 @@
+"""Smoke tests for the benchmark harness: every case runs against production
+code on the synthetic fixtures, and baseline comparison flags regressions.
+
+Timings themselves are not asserted — CI machines are too noisy for that;
+`python -m benchmarks --compare` is the gate.
+"""
+
+from actop import utils
+from actop.ioreport import residency_pairs
+from benchmarks.bench import compare, load_baseline, run_benchmarks, save_baseline
+from benchmarks.fixtures import CHIP_PROFILES, make_items
+
+
+def test_fixtures_are_sized_like_the_hardware():
+    profile = CHIP_PROFILES["m2ultra"]
+
+    items = make_items(profile)
+    arrays = make_items(profile, residency_format="array")
+
+    cores = [item for item in items if item.group == "CPU Stats"]
+    assert len(cores) == profile["e"] + profile["p"]
+    amcc = [item for item in items if item.channel.startswith("AMCC")]
+    assert len(amcc) == profile["amcc"]
+    assert all(len(item.state_residencies) == 32 for item in amcc)
+    assert [residency_pairs(item) for item in arrays] == [
+        item.state_residencies for item in items
+    ]
+
+
+def test_every_case_runs_and_baselines_round_trip(tmp_path):
+    get_native_processes = utils.get_native_processes
+
+    results = run_benchmarks(profiles=["m1"], repeat=1, min_time=0.0)
+
+    assert "m1/sampler._convert[tuples]" in results
+    assert "m1/sampler._convert[array]" in results
+    assert "utils.get_top_processes" in results
+    assert "tui.BrailleChart._render_text" in results
+    for result in results.values():
+        assert result["ns_per_call"] > 0
+        assert result["peak_bytes"] >= 0
+    # The fake process table is only installed for its own case.
+    assert utils.get_native_processes is get_native_processes
+
+    path = tmp_path / "baseline.json"
+    save_baseline(path, results)
+    assert load_baseline(path)["results"] == results
+
+
+def test_compare_flags_slower_and_heavier_cases():
+    base = {
+        "fast": {"ns_per_call": 1000.0, "peak_bytes": 4096},
+        "slow": {"ns_per_call": 1000.0, "peak_bytes": 4096},
+        "heavy": {"ns_per_call": 1000.0, "peak_bytes": 4096},
+    }
+    current = {
+        "fast": {"ns_per_call": 1100.0, "peak_bytes": 4096},
+        "slow": {"ns_per_call": 1500.0, "peak_bytes": 4096},
+        "heavy": {"ns_per_call": 1000.0, "peak_bytes": 65536},
+        "new": {"ns_per_call": 1.0, "peak_bytes": 0},
+    }
+
+    rows = {name: regressed for name, _, _, regressed in compare(current, base)}
+
+    assert rows == {"fast": False, "slow": True, "heavy": True}
@@ -1,6 +1,8 @@
 import subprocess
 import sys
 
+import pytest
+
 from actop.actop import build_parser
 
 
@@ -85,6 +87,10 @@ def test_cli_export_flags_have_inactive_defaults():
     args = build_parser().parse_args([])
     assert args.json is False
     assert args.serve is None
+    assert args.format == "json"
+    assert (args.buffer_records, args.flush_records, args.flush_ms) == (1024, 64, 100)
+    assert args.backpressure == "drop-oldest"
+    assert args.delta is False
 
 
 def test_cli_json_flag_sets_true():
@@ -181,6 +187,36 @@ def test_cli_rejects_invalid_subsamples_value():
     assert "subsamples must be >= 1" in result.stderr
 
 
+def test_cli_interval_accepts_the_minimum():
+    assert build_parser().parse_args(["--interval", "0.05"]).interval == 0.05
+
+
+@pytest.mark.parametrize("value", ["0.01", "-1", "nan", "inf", "fast"])
+def test_cli_rejects_invalid_interval_value(value):
+    result = subprocess.run(
+        [sys.executable, "-m", "actop.actop", "--interval", value],
+        capture_output=True,
+        text=True,
+        check=False,
+    )
+
+    assert result.returncode == 2
+    assert "interval must be" in result.stderr
+
+
+@pytest.mark.parametrize("value", ["-1", "nan", "inf"])
+def test_cli_rejects_invalid_flush_ms_value(value):
+    result = subprocess.run(
+        [sys.executable, "-m", "actop.actop", "--flush-ms", value],
+        capture_output=True,
+        text=True,
+        check=False,
+    )
+
+    assert result.returncode == 2
+    assert "flush interval must be a finite number >= 0" in result.stderr
+
+
 def test_cli_version_reports_package_version():
     from actop import __version__
 
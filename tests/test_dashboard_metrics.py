@@ -182,7 +182,8 @@ def test_label_avg_is_windowed_and_max_is_session_peak():
         )
     )
     # avg of (50, 70) = 60 — padding zeros must not drag it down; max = 70.
-    assert "avg 60.0W · max 70.0W" in state["pkg_label"]
+    # The session p99 of two readings interpolates between them: 69.8.
+    assert "avg 60.0W · p99 69.8W · max 70.0W" in state["pkg_label"]
 
 
 def test_status_line_reports_cumulative_session_energy():
@@ -0,0 +1,115 @@
+"""@profile_energy: calls are queued with two clock reads and charged the
+energy of the shared sampler's intervals they overlap."""
+
+import asyncio
+
+import pytest
+
+from actop import Profiler, energy_stats, profile_energy
+from actop.energy import (
+    SHARED_INTERVAL_S,
+    _EnergyAccounting,
+    reset_energy_stats,
+    shutdown_energy_sampler,
+)
+from actop.hub import get_hub
+from actop.spans import SPAN_COLUMNS
+
+
+def _row(end, watts, elapsed=1.0):
+    values = dict.fromkeys(SPAN_COLUMNS, 0.0)
+    values.update(monotonic_s=end, elapsed_s=elapsed, package_watts=watts)
+    return tuple(values[name] for name in SPAN_COLUMNS)
+
+
+def _sample(accounting, end, watts):
+    with accounting._lock:
+        accounting._rows.append(_row(end, watts))
+        accounting._covered_until = end
+        accounting._fold()
+
+
+def test_calls_are_charged_once_covered():
+    accounting = _EnergyAccounting()
+    _sample(accounting, 101.0, 10.0)
+    accounting._calls.append(("f", 100.5, 101.5))
+    accounting._calls.append(("f", 101.5, 101.75))
+
+    # Not covered yet: the sample ending at 102 has not arrived.
+    assert accounting.stats(wait=False) == {}
+
+    _sample(accounting, 102.0, 20.0)
+    stats = accounting.stats(wait=False)["f"]
+
+    assert stats["calls"] == 2
+    assert stats["total_s"] == pytest.approx(1.25)
+    # 0.5 s at 10 W + 0.5 s at 20 W, then 0.25 s at 20 W.
+    assert stats["total_joules"] == pytest.approx(20.0)
+    assert stats["joules_per_call"] == pytest.approx(10.0)
+    assert stats["avg_watts"] == pytest.approx(16.0)
+    # Two calls: the exact interpolated p95 of (15 J, 5 J).
+    assert stats["p95_joules"] == pytest.approx(14.5)
+
+
+def test_only_the_overlapping_samples_are_indexed():
+    accounting = _EnergyAccounting(window=4)
+    for n in range(1, 9):
+        _sample(accounting, 100.0 + n, float(n))
+    accounting._calls.append(("g", 106.5, 108.0))
+    _sample(accounting, 109.0, 9.0)
+
+    stats = accounting.stats(wait=False)["g"]
+    assert stats["total_joules"] == pytest.approx(0.5 * 7 + 8.0)
+    assert stats["covered_s"] == pytest.approx(1.5)
+
+
+def test_decorator_records_sync_and_async_calls(replay):
+    reset_energy_stats()
+
+    @profile_energy
+    def prefill(n):
+        return sum(range(n))
+
+    @profile_energy(name="decode")
+    async def decode():
+        return "token"
+
+    try:
+        assert prefill(1000) == sum(range(1000))
+        assert prefill.__name__ == "prefill"
+        assert asyncio.run(decode()) == "token"
+
+        stats = energy_stats()
+    finally:
+        shutdown_energy_sampler()
+        reset_energy_stats()
+
+    assert (
+        stats[
+            prefill.__module__
+            + ".test_decorator_records_sync_and_async_calls.<locals>.prefill"
+        ]["calls"]
+        == 1
+    )
+    assert stats["decode"]["calls"] == 1
+    assert stats["decode"]["total_joules"] >= 0.0
+
+
+def test_decorator_joins_a_running_profilers_sampler(replay):
+    reset_energy_stats()
+
+    @profile_energy(name="step")
+    def step():
+        return None
+
+    try:
+        with Profiler(interval_s=1):
+            step()
+            stats = energy_stats()
+            assert get_hub(1.0).subscriber_count == 2
+            assert not get_hub(SHARED_INTERVAL_S).running
+    finally:
+        shutdown_energy_sampler()
+        reset_energy_stats()
+
+    assert stats["step"]["calls"] == 1
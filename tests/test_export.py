@@ -1,4 +1,4 @@
-"""Export-backend tests: NDJSON and Prometheus formats + run loops.
+"""Export-backend tests: NDJSON, binary and Prometheus formats + run loops.
 
 The format functions are validated cross-platform against a real SystemSnapshot
 (the public model type) — these are the external observability contracts. The
@@ -9,17 +9,25 @@ import io
 import json
 import subprocess
 import sys
+import threading
 import time
 
 import pytest
 
 from actop.export import (
+    BinaryReader,
+    BinaryWriter,
+    RecordWriter,
+    run_binary_stream,
     run_json_stream,
     snapshot_to_dict,
     snapshot_to_json,
+    snapshot_to_openmetrics,
     snapshot_to_prometheus,
 )
 from actop.models import CoreSample, SystemSnapshot
+from actop.stats import QuantileTracker
+from actop.store import SampleStore
 
 
 def _sample_snapshot() -> SystemSnapshot:
@@ -87,6 +95,311 @@ def test_prometheus_exposition_is_well_formed():
         float(parts[1])  # value parses as a number
 
 
+def test_percentiles_are_published_when_tracked():
+    snapshot = _sample_snapshot()
+    quantiles = QuantileTracker(("package_watts", "bandwidth_gbps"), (0.5, 0.99))
+    quantiles.update(snapshot)
+    snapshot.package_watts = 20.0
+    quantiles.update(snapshot)
+
+    lines = snapshot_to_prometheus(snapshot, quantiles).strip().splitlines()
+    assert "# TYPE actop_package_power_watts_session summary" in lines
+    assert 'actop_package_power_watts_session{quantile="0.5"} 18' in lines
+    assert "actop_package_power_watts_session_sum 36" in lines
+    assert "actop_package_power_watts_session_count 2" in lines
+    assert 'actop_memory_bandwidth_gbps_session{quantile="0.99"} 42' in lines
+
+    record = json.loads(snapshot_to_json(snapshot, quantiles))
+    assert record["percentiles"]["package_watts"]["p50"] == 18.0
+    assert record["percentiles"]["bandwidth_gbps"] == {"p50": 42.0, "p99": 42.0}
+    # Without a tracker the record is exactly the snapshot.
+    assert "percentiles" not in json.loads(snapshot_to_json(snapshot))
+
+
+def test_openmetrics_exposition_adds_energy_counters():
+    from actop.export import _ExpositionCache
+
+    cache = _ExpositionCache(openmetrics=True)
+    first, second = _sample_snapshot(), _sample_snapshot()
+    first.elapsed_s = second.elapsed_s = 2.0
+    second.pcpu_residency_pct = {"idle": 10, "low": 20, "mid": 40, "high": 30}
+    second.timestamp += 2.0
+    cache.update(first)
+    cache.update(second)
+
+    assert cache.latest().content_type.startswith("text/plain")
+    rendered = cache.latest(openmetrics=True)
+    assert rendered.content_type.startswith("application/openmetrics-text")
+    text = rendered.body.decode()
+    lines = text.splitlines()
+
+    assert lines[-1] == "# EOF"
+    assert "# TYPE actop_cpu_energy_joules counter" in lines
+    assert "# UNIT actop_cpu_energy_joules joules" in lines
+    # 12.5 W over 2 x 2 s, with the latest sample's share as exemplar.
+    assert 'actop_cpu_energy_joules_total 50 # {elapsed_s="2"} 25 1700000002' in lines
+    assert "actop_sampled_seconds_total 4" in lines
+    assert "actop_samples_total 2" in lines
+    assert 'actop_dvfs_residency_percent{cluster="pcpu",state="high"} 30' in lines
+    assert 'actop_dvfs_residency_percent{cluster="gpu",state="idle"} 0' in lines
+    # Every family is declared once, its samples contiguous.
+    families = [line.split()[2] for line in lines if line.startswith("# TYPE")]
+    assert len(families) == len(set(families))
+    # Everything in the Prometheus text is in the OpenMetrics one.
+    assert set(snapshot_to_prometheus(second).splitlines()) <= set(lines)
+    assert snapshot_to_openmetrics(second, cache.energy) == text
+
+
+def test_metrics_handler_serves_cached_gzip_and_not_modified():
+    import gzip
+    import http.client
+    from http.server import ThreadingHTTPServer
+
+    from actop.export import _make_prometheus_handler, _RenderedMetrics
+
+    rendered = _RenderedMetrics(snapshot_to_prometheus(_sample_snapshot()))
+    latest = [None]
+    server = ThreadingHTTPServer(
+        ("127.0.0.1", 0), _make_prometheus_handler(lambda openmetrics: latest[0])
+    )
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    def get(headers=None, path="/metrics"):
+        conn = http.client.HTTPConnection("127.0.0.1", server.server_port, timeout=5)
+        try:
+            conn.request("GET", path, headers=headers or {})
+            response = conn.getresponse()
+            return response.status, dict(response.getheaders()), response.read()
+        finally:
+            conn.close()
+
+    try:
+        assert get()[0] == 503
+        latest[0] = rendered
+
+        status, headers, body = get()
+        assert status == 200
+        assert body == rendered.body
+        assert headers["ETag"] == rendered.etag
+        assert "Content-Encoding" not in headers
+
+        status, headers, body = get({"Accept-Encoding": "deflate, gzip;q=0.5"})
+        assert headers["Content-Encoding"] == "gzip"
+        assert gzip.decompress(body) == rendered.body
+        # A different coding is a different representation, so another tag;
+        # either one revalidates.
+        assert headers["ETag"] == rendered.gzip_etag != rendered.etag
+        assert get({"If-None-Match": rendered.gzip_etag})[0] == 304
+        # Compressed once, then reused.
+        assert rendered.gzipped() is rendered.gzipped()
+        assert "Content-Encoding" not in get({"Accept-Encoding": "gzip;q=0"})[1]
+
+        status, headers, body = get({"If-None-Match": 'W/"x", ' + rendered.etag})
+        assert (status, body) == (304, b"")
+        assert headers["ETag"] == rendered.etag
+        # A new snapshot with different text changes the tag.
+        latest[0] = _RenderedMetrics(rendered.body.decode() + "# changed\n")
+        assert get({"If-None-Match": rendered.etag})[0] == 200
+        assert get(path="/other")[0] == 404
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def _binary_series():
+    snapshots = []
+    for n in range(6):
+        snapshot = _sample_snapshot()
+        snapshot.timestamp += n
+        snapshot.cpu_watts += n % 2
+        snapshot.elapsed_s = 1.0
+        snapshot.interval_max = {"cpu_watts": 20.0 + n}
+        snapshots.append(snapshot)
+    snapshots[3].thermal_state = "Fair"
+    snapshots[4].p_cores = []  # the layout keeps the first snapshot's cores
+    return snapshots
+
+
+@pytest.mark.parametrize("delta", [False, True])
+def test_binary_stream_round_trips_like_the_sample_store(delta):
+    snapshots = _binary_series()
+    out = io.BytesIO()
+    writer = BinaryWriter(out, delta=delta)
+    for snapshot in snapshots:
+        writer.write(snapshot)
+    store = SampleStore()
+    for snapshot in snapshots:
+        store.append(snapshot)
+
+    assert writer.records == 6
+    # Same columns as the store, so the same values come back.
+    assert list(BinaryReader(io.BytesIO(out.getvalue()))) == list(store)
+    columns = BinaryReader(io.BytesIO(out.getvalue())).columns()
+    assert columns == store.columns()
+    assert columns["thermal_state"][3] == "Fair"
+    assert columns["p_core4_active_pct"].tolist() == [80, 80, 80, 80, 0, 80]
+
+    def records_size(data):  # past the magic and the schema header
+        return len(data) - 12 - int.from_bytes(data[8:12], "little")
+
+    full = io.BytesIO()
+    writer = BinaryWriter(full)
+    for snapshot in snapshots:
+        writer.write(snapshot)
+    json_size = sum(len(snapshot_to_json(s)) + 1 for s in snapshots)
+    assert records_size(full.getvalue()) * 2 < json_size
+    if delta:
+        # Only the timestamp, CPU power and its interval max change.
+        assert records_size(out.getvalue()) * 3 < records_size(full.getvalue())
+
+
+def test_binary_reader_rejects_foreign_and_truncated_input():
+    out = io.BytesIO()
+    BinaryWriter(out).write(_sample_snapshot())
+    data = out.getvalue()
+
+    assert list(BinaryReader(io.BytesIO(b""))) == []
+    assert BinaryReader(io.BytesIO(b"")).columns() == {}
+    with pytest.raises(ValueError, match="not an actop binary stream"):
+        BinaryReader(io.BytesIO(b'{"cpu_watts": 1}\n'))
+    with pytest.raises(ValueError, match="truncated"):
+        list(BinaryReader(io.BytesIO(data[:-3])))
+    with pytest.raises(ValueError, match="version"):
+        BinaryReader(io.BytesIO(data.replace(b'"version":1', b'"version":9')))
+
+
+def test_run_binary_stream_writes_replayed_snapshots(replay):
+    out = io.BytesIO()
+
+    assert run_binary_stream(1, 1, out=out, max_samples=4, delta=True) == 4
+
+    reader = BinaryReader(io.BytesIO(out.getvalue()))
+    assert reader.schema["delta"] is True
+    watts = [snapshot.cpu_watts for snapshot in reader]
+    assert len(watts) == 4 and set(watts) <= {5.0, 6.0}
+
+
+class _GatedStream:
+    """Sink whose write() blocks until `gate` is set, like a stalled pipe."""
+
+    def __init__(self, fail=False):
+        self.records = []
+        self.flushes = 0
+        self.entered = threading.Event()
+        self.gate = threading.Event()
+        self.fail = fail
+
+    def write(self, record):
+        self.entered.set()
+        self.gate.wait(5)
+        if self.fail:
+            raise BrokenPipeError("consumer went away")
+        self.records.append(record)
+
+    def flush(self):
+        self.flushes += 1
+
+
+def test_record_writer_batches_flushes():
+    stream = _GatedStream()
+    stream.gate.set()
+    writer = RecordWriter(stream, flush_every=4, flush_interval_s=60)
+    for n in range(10):
+        writer.write(n)
+    writer.close()
+
+    assert stream.records == list(range(10))
+    # After records 4 and 8, then the last two on close.
+    assert (writer.written, writer.flushes, stream.flushes) == (10, 3, 3)
+
+    stream = _GatedStream()
+    stream.gate.set()
+    with RecordWriter(stream, flush_every=1000, flush_interval_s=0.02) as writer:
+        writer.write("late")
+        deadline = time.monotonic() + 5.0
+        while not stream.flushes and time.monotonic() < deadline:
+            time.sleep(0.005)
+        # Flushed by the interval, well before 1000 records.
+        assert stream.flushes == 1
+
+
+def test_record_writer_drops_oldest_for_a_stalled_sink():
+    stream = _GatedStream()
+    writer = RecordWriter(stream, maxsize=2)
+    writer.write(1)
+    assert stream.entered.wait(5)  # the thread is stuck writing record 1
+    for n in (2, 3, 4, 5):
+        writer.write(n)  # never waits
+
+    assert writer.dropped == 2
+    stream.gate.set()
+    writer.close()
+    assert stream.records == [1, 4, 5]
+
+
+def test_record_writer_block_policy_waits_for_the_sink():
+    stream = _GatedStream()
+    writer = RecordWriter(stream, maxsize=1, backpressure="block")
+    writer.write(1)
+    assert stream.entered.wait(5)
+    writer.write(2)
+    producer = threading.Thread(target=writer.write, args=(3,))
+    producer.start()
+    producer.join(0.1)
+    assert producer.is_alive()  # the queue is full
+
+    stream.gate.set()
+    producer.join(5)
+    writer.close()
+    assert stream.records == [1, 2, 3]
+    assert writer.dropped == 0
+
+
+def test_record_writer_reraises_sink_errors():
+    stream = _GatedStream(fail=True)
+    stream.gate.set()
+    writer = RecordWriter(stream)
+    writer.write("x")
+    with pytest.raises(BrokenPipeError):
+        writer.close()
+    with pytest.raises(BrokenPipeError):
+        writer.write("y")
+    with pytest.raises(ValueError, match="backpressure must be one of"):
+        RecordWriter(stream, backpressure="spill")
+
+
+def test_run_json_stream_buffers_replayed_records(replay):
+    buffer = io.StringIO()
+
+    count = run_json_stream(1, 1, out=buffer, max_samples=5, flush_every=2)
+
+    assert count == 5
+    records = [json.loads(line) for line in buffer.getvalue().splitlines()]
+    assert [record["cpu_watts"] in (5.0, 6.0) for record in records] == [True] * 5
+
+
+def test_run_json_stream_keeps_the_loops_error_over_the_writers(replay, capsys):
+    from actop.alerts import AlertEngine
+
+    stream = _GatedStream(fail=True)
+
+    class FailingEngine(AlertEngine):
+        calls = 0
+
+        def evaluate(self, snapshot):
+            FailingEngine.calls += 1
+            if FailingEngine.calls == 2:
+                stream.gate.set()  # the queued record now fails to write
+                raise RuntimeError("boom")
+            return super().evaluate(snapshot)
+
+    with pytest.raises(RuntimeError, match="boom"):
+        run_json_stream(1, 1, out=stream, alerts=FailingEngine())
+
+    assert "BrokenPipeError" in capsys.readouterr().err
+
+
 @pytest.mark.local
 def test_run_json_stream_emits_parseable_records():
     buffer = io.StringIO()
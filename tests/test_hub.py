@@ -0,0 +1,175 @@
+"""Sampler hub: one sampler per configuration, fanned out to queue, callback
+and async subscribers with per-subscriber decimation, stopped with its last
+subscriber."""
+
+import asyncio
+import queue
+import time
+
+import pytest
+
+from actop import Profiler
+from actop.hub import get_hub, shared_hub
+
+
+def _wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+
+def test_one_hub_per_configuration():
+    assert get_hub(1.0) is get_hub(1)
+    assert get_hub(0.001) is get_hub(0.05)  # clamped to MIN_INTERVAL_S
+    assert get_hub(1.0) is not get_hub(1.0, subsamples=2)
+
+
+def test_subscribers_share_one_sampler_with_decimation(replay):
+    hub = get_hub(1.0)
+    every = []
+    third = []
+    with hub.subscribe_callback(every.append):
+        with hub.subscribe_callback(third.append, every=3):
+            assert hub.subscriber_count == 2
+            _wait_for(lambda: len(third) >= 5)
+        assert hub.running
+
+    assert not hub.running
+    assert hub.subscriber_count == 0
+    # The same snapshot objects reach both: one sampler, not two.
+    assert set(map(id, third)) <= set(map(id, every))
+    assert len(third) >= 5
+    assert third[1] is every[every.index(third[0]) + 3]
+
+
+def test_queue_drops_the_oldest_when_full(replay):
+    hub = get_hub(1.0)
+    with hub.subscribe_queue(maxsize=2) as subscription:
+        _wait_for(lambda: subscription.dropped > 0)
+        first = subscription.get(timeout=1)
+        second = subscription.get(timeout=1)
+
+    assert subscription.dropped > 0
+    assert first.monotonic_s < second.monotonic_s
+    with pytest.raises(ValueError, match="every"):
+        hub.subscribe_queue(every=0)
+
+
+def test_a_raising_callback_does_not_stop_the_others(replay):
+    hub = get_hub(1.0)
+    received = []
+
+    def broken(snapshot):
+        raise RuntimeError("consumer bug")
+
+    with hub.subscribe_callback(broken) as bad, hub.subscribe_callback(received.append):
+        _wait_for(lambda: len(received) >= 3)
+
+    assert bad.errors >= 1
+    assert len(received) >= 3
+
+
+def test_async_subscription_iterates_snapshots(replay):
+    async def collect():
+        got = []
+        async with get_hub(1.0).subscribe_async(every=2) as subscription:
+            async for snapshot in subscription:
+                got.append(snapshot)
+                if len(got) == 3:
+                    break
+        return got
+
+    snapshots = asyncio.run(collect())
+
+    assert len(snapshots) == 3
+    assert not get_hub(1.0).running
+
+
+def test_profilers_with_the_same_interval_share_the_hub(replay):
+    hub = get_hub(1.0)
+    with Profiler(interval_s=1) as first, Profiler(interval_s=1) as second:
+        assert hub.subscriber_count == 2
+        _wait_for(lambda: len(first._samples) >= 3 and len(second._samples) >= 3)
+
+    assert not hub.running
+    # Both stored snapshots from the one sampler's timeline.
+    times = {s.monotonic_s for s in first.samples}
+    assert times & {s.monotonic_s for s in second.samples}
+
+
+def test_a_closed_queue_subscription_no_longer_fills(replay):
+    hub = get_hub(1.0)
+    with hub.subscribe_callback(lambda snapshot: None):
+        subscription = hub.subscribe_queue(maxsize=1000)
+        _wait_for(lambda: subscription._queue.qsize() > 0)
+        subscription.close()
+        size = subscription._queue.qsize()
+        time.sleep(0.05)
+        assert subscription._queue.qsize() == size
+    while size:
+        subscription.get(timeout=0)
+        size -= 1
+    with pytest.raises(queue.Empty):
+        subscription.get(timeout=0)
+
+
+def test_shared_hub_joins_the_fastest_running_hub(replay):
+    assert shared_hub(0.1, 1.0) is get_hub(0.1)  # nothing running
+    with get_hub(2.0).subscribe_queue(), get_hub(0.5).subscribe_queue():
+        assert shared_hub(0.1, 1.0) is get_hub(0.5)
+        assert shared_hub(0.1, 0.25) is get_hub(0.1)  # running ones too slow
+
+
+def test_a_sampler_error_reaches_every_subscriber_and_restarts(replay, monkeypatch):
+    from actop.api import Monitor
+
+    real = Monitor.get_snapshot
+    failing = [True]
+
+    def get_snapshot(self, stop_event=None):
+        if failing[0]:
+            raise RuntimeError("IOReport went away")
+        return real(self, stop_event)
+
+    monkeypatch.setattr(Monitor, "get_snapshot", get_snapshot)
+    hub = get_hub(1.0)
+
+    async def iterate():
+        subscription = hub.subscribe_async()
+        with pytest.raises(RuntimeError, match="went away"):
+            async for _ in subscription:
+                pass
+
+    subscription = hub.subscribe_queue()
+    with pytest.raises(RuntimeError, match="went away"):
+        subscription.get(timeout=5)
+    with pytest.raises(RuntimeError):
+        subscription.get(timeout=0)  # and on every later get()
+    assert not hub.running and hub.subscriber_count == 0
+    assert isinstance(hub.error, RuntimeError)
+    subscription.close()
+    asyncio.run(iterate())
+
+    failing[0] = False
+    with hub.subscribe_queue() as subscription:
+        assert subscription.get(timeout=5).cpu_watts in (5.0, 6.0)
+        assert hub.error is None
+    assert not hub.running
+
+
+def test_closing_the_last_subscriber_does_not_wait_out_the_interval(
+    replay, monkeypatch
+):
+    from actop.api import Monitor
+
+    # Pace with Monitor's own deadline wait (replay normally skips it).
+    monkeypatch.setattr(Monitor, "manages_timing", property(lambda self: False))
+    hub = get_hub(5.0)
+    subscription = hub.subscribe_queue()
+    time.sleep(0.1)  # the hub thread is now in its 5 s deadline wait
+
+    started = time.monotonic()
+    subscription.close()
+
+    assert time.monotonic() - started < 1.0
+    assert not hub.running
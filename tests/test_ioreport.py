@@ -1,6 +1,12 @@
 import pytest
 
-from actop.ioreport import cf_release, cfstr, from_cfstr, IOReportSubscription
+from actop.ioreport import (
+    cf_release,
+    cfstr,
+    from_cfstr,
+    IOReportSubscription,
+    residency_pairs,
+)
 
 pytestmark = pytest.mark.local
 
@@ -22,3 +28,66 @@ def test_subscription_sample_returns_ref():
         cf_release(sample)
     finally:
         sub.close()
+
+
+def test_delta_channel_metadata_is_stable_across_samples():
+    # The channel table is resolved once per subscription and reused; every
+    # delta must still report the same channels, in the same order, with
+    # the extract_states filter applied consistently.
+    sub = IOReportSubscription([("Energy Model", None), ("PMP", "DCS BW")])
+
+    def keep(group, subgroup, channel):
+        return group != "PMP" or channel.startswith("AMCC")
+
+    samples = [sub.sample() for _ in range(3)]
+    try:
+        first = sub.delta(samples[0], samples[1], keep)
+        second = sub.delta(samples[1], samples[2], keep)
+    finally:
+        for sample in samples:
+            cf_release(sample)
+        sub.close()
+
+    assert first, "delta returned no channels"
+    assert [(i.group, i.subgroup, i.channel, i.unit) for i in first] == [
+        (i.group, i.subgroup, i.channel, i.unit) for i in second
+    ]
+    for item in second:
+        if item.group == "PMP" and not item.channel.startswith("AMCC"):
+            assert item.state_residencies == []
+
+
+def test_delta_reuses_interned_state_names_per_channel():
+    sub = IOReportSubscription([("CPU Stats", "CPU Core Performance States")])
+    samples = [sub.sample() for _ in range(3)]
+    try:
+        first = sub.delta(samples[0], samples[1])
+        second = sub.delta(samples[1], samples[2])
+    finally:
+        for sample in samples:
+            cf_release(sample)
+        sub.close()
+
+    assert first, "delta returned no CPU state channels"
+    for before, after in zip(first, second):
+        assert after.state_names is before.state_names
+        assert [name for name, _ in after.state_residencies] == list(after.state_names)
+        assert all(isinstance(ns, int) for _, ns in after.state_residencies)
+
+
+def test_delta_array_residencies_align_with_state_names():
+    sub = IOReportSubscription([("CPU Stats", "CPU Core Performance States")])
+    s1 = sub.sample()
+    s2 = sub.sample()
+    try:
+        pairs = sub.delta(s1, s2)
+        arrays = sub.delta(s1, s2, residency_format="array")
+    finally:
+        cf_release(s1)
+        cf_release(s2)
+        sub.close()
+
+    assert arrays, "delta returned no CPU state channels"
+    for pair_item, array_item in zip(pairs, arrays):
+        assert array_item.state_residencies.typecode == "q"
+        assert residency_pairs(array_item) == pair_item.state_residencies
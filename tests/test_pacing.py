@@ -0,0 +1,146 @@
+"""Deadline pacing: ticks land on start + k·interval regardless of the work done
+between them, and the overrun policy decides what a slow tick costs.
+
+A fake clock whose sleep() advances time makes every schedule exact.
+"""
+
+import threading
+
+import pytest
+
+from actop.pacing import DeadlineTicker, PacingStats
+
+
+class FakeClock:
+    def __init__(self, start=100.0):
+        self.now = start
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+def _ticker(interval_s, overrun="skip", start=100.0):
+    clock = FakeClock(start)
+    return DeadlineTicker(interval_s, overrun, clock=clock, sleep=clock.sleep), clock
+
+
+def test_work_between_ticks_does_not_drift_the_schedule():
+    ticker, clock = _ticker(1.0)
+    wakeups = []
+
+    for _ in range(5):
+        ticker.wait()
+        wakeups.append(clock.now)
+        clock.now += 0.3  # sampling + formatting time
+
+    assert wakeups == [101.0, 102.0, 103.0, 104.0, 105.0]
+    assert clock.sleeps == pytest.approx([1.0, 0.7, 0.7, 0.7, 0.7])
+    assert ticker.stats == PacingStats(5, 0, 0, 0.0, 0.0)
+
+
+def test_skip_drops_missed_deadlines_and_keeps_phase():
+    ticker, clock = _ticker(1.0, "skip")
+    ticker.wait()  # 101.0
+    clock.now += 2.5  # the tick overran by two and a half intervals
+
+    ticker.wait()  # late for 102.0: fires immediately at 103.5
+    assert clock.now == 103.5
+    ticker.wait()  # 103.0 was missed, so the next deadline is 104.0
+    assert clock.now == 104.0
+
+    stats = ticker.stats
+    assert stats.ticks == 3
+    assert stats.overruns == 1
+    assert stats.skipped == 1
+    assert stats.max_jitter_s == pytest.approx(1.5)
+    assert stats.mean_jitter_s == pytest.approx(0.5)
+
+
+def test_catch_up_fires_missed_deadlines_back_to_back():
+    ticker, clock = _ticker(1.0, "catch-up")
+    ticker.wait()  # 101.0
+    clock.now += 2.5
+
+    wakeups = []
+    for _ in range(3):
+        ticker.wait()
+        wakeups.append(clock.now)
+
+    # 102.0 and 103.0 are both owed: they fire at once, then 104.0 on time.
+    assert wakeups == [103.5, 103.5, 104.0]
+    assert ticker.stats.overruns == 2
+    assert ticker.stats.skipped == 0
+
+
+def test_wait_returns_early_when_the_stop_event_fires():
+    ticker, _ = _ticker(60.0)
+    stop = threading.Event()
+    stop.set()
+
+    assert ticker.wait(stop) is False
+    assert ticker.stats.ticks == 0
+
+
+def test_reset_restarts_the_schedule_from_now():
+    ticker, clock = _ticker(1.0)
+    clock.now += 10.0
+
+    ticker.reset()
+    ticker.wait()
+
+    assert clock.now == 111.0
+    assert ticker.stats.overruns == 0
+
+
+@pytest.mark.parametrize(
+    "interval_s, overrun, match",
+    [(0, "skip", "interval_s"), (1.0, "drop", "overrun")],
+)
+def test_invalid_arguments_are_rejected(interval_s, overrun, match):
+    with pytest.raises(ValueError, match=match):
+        DeadlineTicker(interval_s, overrun)
+
+
+def test_wait_async_keeps_the_same_schedule():
+    import asyncio
+
+    ticker, clock = _ticker(1.0)
+    wakeups = []
+
+    async def run():
+        for _ in range(3):
+            clock.now += 1.3  # the step overran: no sleep, counted
+            await ticker.wait_async()
+            wakeups.append(clock.now)
+
+    asyncio.run(run())
+
+    assert wakeups == pytest.approx([101.3, 102.6, 103.9])
+    stats = ticker.stats
+    assert (stats.ticks, stats.overruns) == (3, 3)
+    assert stats.max_jitter_s == pytest.approx(0.9)
+
+
+def test_concurrent_async_waits_hold_no_threads():
+    import asyncio
+    from concurrent.futures import ThreadPoolExecutor
+
+    tickers = [DeadlineTicker(0.1) for _ in range(50)]
+
+    async def run():
+        loop = asyncio.get_running_loop()
+        # A one-thread default executor would serialize blocking waits.
+        loop.set_default_executor(ThreadPoolExecutor(max_workers=1))
+        start = loop.time()
+        await asyncio.gather(*(ticker.wait_async() for ticker in tickers))
+        return loop.time() - start
+
+    elapsed = asyncio.run(run())
+
+    assert elapsed < 1.0  # 50 sequential 0.1 s waits would take 5 s
+    assert all(ticker.stats.ticks == 1 for ticker in tickers)
@@ -0,0 +1,338 @@
+"""Record/replay backend: a capture written by `SampleRecorder` drives the real
+conversion path and public API off-device.
+
+The frames are synthetic but shaped like a real M-series capture (Energy Model
+nJ counters, per-core DVFS residencies, the AMCC bandwidth histogram); the code
+under test — `ReplaySampler`, `IOReportSampler._convert` via `Monitor`, and
+`SystemSnapshot` assembly — is the production path. Runs on every platform.
+"""
+
+import subprocess
+import sys
+import textwrap
+from array import array
+from pathlib import Path
+
+import pytest
+
+from actop import AsyncMonitor, Monitor, SystemSnapshot
+from actop.ioreport import IOReportItem
+from actop.replay import ReplaySampler, SampleRecorder, load_recording
+from actop.sampler import create_sampler
+
+
+def test_recording_round_trips_items_and_side_readings(
+    tmp_path, write_capture, frame_items, capture_dvfs
+):
+    path = write_capture(tmp_path / "capture.jsonl.gz")
+
+    recording = load_recording(path)
+
+    assert recording.header["dvfs"] == capture_dvfs
+    assert len(recording.frames) == 2
+    frame = recording.frames[0]
+    assert frame.elapsed_s == 1.0
+    assert frame.cpu_temp_c == 50.0
+    assert frame.thermal_pressure == "Fair"
+    assert [item._replace(state_names=None) for item in frame.items] == (
+        frame_items(5_000_000_000)
+    )
+    # Each channel's state names come back as one tuple shared across frames,
+    # like the interned names of a live subscription.
+    assert (
+        recording.frames[1].items[3].state_names
+        is recording.frames[0].items[3].state_names
+    )
+
+
+def test_monitor_runs_end_to_end_on_a_replayed_capture(
+    tmp_path, monkeypatch, write_capture
+):
+    path = write_capture(tmp_path / "capture.jsonl.gz")
+    monkeypatch.setenv("ACTOP_REPLAY", str(path))
+
+    with Monitor(interval_s=1) as monitor:
+        assert monitor.manages_timing is True
+        first = monitor.get_snapshot()
+        second = monitor.get_snapshot()
+
+    assert isinstance(first, SystemSnapshot)
+    assert first.cpu_watts == pytest.approx(5.0)
+    assert second.cpu_watts == pytest.approx(6.0)
+    assert first.gpu_watts == pytest.approx(2.0)
+    assert first.package_watts == pytest.approx(7.0)
+    # ECPU000: 50% active, half at the 600 MHz floor and half at 2064 MHz.
+    assert first.ecpu_util_pct == 50.0
+    assert first.ecpu_freq_mhz == (600 + 2064) // 2
+    assert first.pcpu_freq_mhz == 3200
+    assert first.gpu_util_pct == 40.0
+    assert first.gpu_freq_mhz == 1300
+    assert first.bandwidth_available is True
+    assert first.bandwidth_gbps == pytest.approx(48.0)
+    assert first.cpu_temp_c == 50.0
+    assert second.cpu_temp_c == 51.0
+    assert first.thermal_state == "Fair"
+    assert [core.index for core in first.e_cores] == [0]
+
+
+def test_async_monitor_streams_a_replayed_capture(replay):
+    import asyncio
+
+    async def collect():
+        with AsyncMonitor(interval_s=1) as monitor:
+            return [snap async for snap in monitor.stream(count=4)]
+
+    snapshots = asyncio.run(collect())
+
+    assert [s.cpu_watts for s in snapshots] == pytest.approx([5.0, 6.0, 5.0, 6.0])
+    ends = [s.monotonic_s for s in snapshots]
+    assert ends == sorted(ends)
+
+
+def test_create_sampler_selects_replay_backend(tmp_path, write_capture):
+    path = write_capture(tmp_path / "capture.jsonl.gz")
+
+    sampler, backend = create_sampler(1, replay_path=str(path))
+    try:
+        assert backend == "replay"
+        assert sampler.sample() is None  # primes, like the live sampler
+        assert sampler.sample() is not None
+    finally:
+        sampler.close()
+
+
+def test_replay_loops_by_default_and_stops_when_asked(tmp_path, write_capture):
+    recording = load_recording(write_capture(tmp_path / "capture.jsonl.gz"))
+
+    looping = ReplaySampler(recording)
+    looping.sample()
+    results = [looping.sample() for _ in range(5)]
+    assert all(result is not None for result in results)
+
+    once = ReplaySampler(recording, loop=False)
+    once.sample()
+    once.sample()
+    once.sample()
+    with pytest.raises(EOFError):
+        once.sample()
+
+
+def test_replay_averages_subsamples_without_sleeping(tmp_path, write_capture):
+    recording = load_recording(write_capture(tmp_path / "capture.jsonl.gz"))
+
+    sampler = ReplaySampler(recording, interval=1, subsamples=2)
+    assert sampler.sample() is None
+    result = sampler.sample()
+
+    # Mean of the 5 J and 6 J frames, each over a 1 s interval.
+    assert result.cpu_metrics["cpu_W"] == pytest.approx(5.5)
+    assert result.cpu_temp_c == 51.0
+    assert result.interval_min["cpu_w"] == pytest.approx(5.0)
+    assert result.interval_max["cpu_w"] == pytest.approx(6.0)
+    assert result.elapsed_s == pytest.approx(2.0)
+
+
+def test_snapshot_reports_subsample_extremes(replay):
+    with Monitor(interval_s=2, subsamples=2) as monitor:
+        snapshot = monitor.get_snapshot()
+    with Monitor(interval_s=1) as monitor:
+        single = monitor.get_snapshot()
+
+    # Each 1 s frame is rescaled to the 2 s interval: 10 J and 12 J -> 5/6 W.
+    assert snapshot.cpu_watts == pytest.approx(5.5)
+    assert snapshot.interval_min["cpu_watts"] == pytest.approx(5.0)
+    assert snapshot.interval_max["cpu_watts"] == pytest.approx(6.0)
+    assert snapshot.interval_max["gpu_util_pct"] == 40.0
+    assert snapshot.interval_max["bandwidth_gbps"] == pytest.approx(48.0)
+    # A single-shot sample is its own min and max.
+    assert single.interval_min["cpu_watts"] == single.cpu_watts
+    assert single.interval_max["package_watts"] == single.package_watts
+
+
+def test_power_comes_from_the_measured_elapsed_time(
+    tmp_path, monkeypatch, frame_items, capture_dvfs
+):
+    # A 50 ms interval whose second tick woke late and covered 150 ms: watts
+    # are energy over each delta's own elapsed time, not the nominal interval.
+    path = tmp_path / "capture.jsonl.gz"
+    recorder = SampleRecorder(path, 0.05, capture_dvfs, {"p_count": 1, "e_count": 1})
+    for elapsed_s, cpu_nj in ((0.05, 250_000_000), (0.15, 600_000_000)):
+        recorder.write_frame(elapsed_s, frame_items(cpu_nj))
+    recorder.close()
+    monkeypatch.setenv("ACTOP_REPLAY", str(path))
+
+    with Monitor(interval_s=0.05) as monitor:
+        on_time = monitor.get_snapshot()
+        late = monitor.get_snapshot()
+    with Monitor(interval_s=0.1, subsamples=2) as monitor:
+        folded = monitor.get_snapshot()
+
+    assert on_time.elapsed_s == pytest.approx(0.05)
+    assert on_time.cpu_watts == pytest.approx(5.0)
+    assert late.elapsed_s == pytest.approx(0.15)
+    assert late.cpu_watts == pytest.approx(4.0)
+    # Subsamples fold to total energy over total time: 0.85 J / 0.2 s.
+    assert folded.elapsed_s == pytest.approx(0.2)
+    assert folded.cpu_watts == pytest.approx(4.25)
+    assert folded.interval_max["cpu_watts"] == pytest.approx(5.0)
+
+
+def test_load_recording_rejects_foreign_files(tmp_path):
+    import gzip
+
+    path = tmp_path / "other.gz"
+    with gzip.open(path, "wt") as fp:
+        fp.write('{"hello": 1}\n')
+
+    with pytest.raises(ValueError, match="not an actop recording"):
+        load_recording(path)
+
+
+def test_recording_survives_a_crash_that_skips_close(tmp_path, frame_items):
+    # The recorder is still referenced from a sampler thread when the process
+    # dies, so nothing calls close(); the capture must still be loadable.
+    path = tmp_path / "crash.jsonl.gz"
+    script = textwrap.dedent(
+        """
+        import sys, threading
+        sys.path.insert(0, {root!r})
+        from actop.ioreport import IOReportItem
+        from actop.replay import SampleRecorder
+
+        items = [IOReportItem(*fields) for fields in {items!r}]
+        recorded = threading.Event()
+
+        def run():
+            recorder = SampleRecorder({path!r}, 1, {{}}, {{"e_count": 1}})
+            recorder.write_frame(1.0, items)
+            recorded.set()
+            threading.Event().wait()
+
+        threading.Thread(target=run, daemon=True).start()
+        recorded.wait()
+        raise RuntimeError("sampler crashed")
+        """
+    ).format(
+        root=str(Path(__file__).resolve().parents[1]),
+        items=[tuple(item) for item in frame_items(5_000_000_000)],
+        path=str(path),
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", script], capture_output=True, text=True, check=False
+    )
+
+    assert "sampler crashed" in result.stderr
+    assert len(load_recording(path).frames) == 1
+
+
+def test_state_set_change_mid_capture_is_picked_up(tmp_path, capture_dvfs):
+    # A channel whose DVFS state list changes between frames must be
+    # re-resolved, not read through the previous frame's state mapping.
+    path = tmp_path / "capture.jsonl.gz"
+    recorder = SampleRecorder(path, 1, capture_dvfs, {"p_count": 0, "e_count": 1})
+    for states in (
+        [("IDLE", 0), ("V0P0", 1000)],
+        [("IDLE", 0), ("V1P0", 500), ("V4P0", 500)],
+    ):
+        recorder.write_frame(
+            1.0,
+            [
+                IOReportItem(
+                    "CPU Stats",
+                    "CPU Core Performance States",
+                    "ECPU000",
+                    "ns",
+                    0,
+                    states,
+                )
+            ],
+        )
+    recorder.close()
+
+    sampler = ReplaySampler(load_recording(path), loop=False)
+    sampler.sample()
+    first = sampler.sample()
+    second = sampler.sample()
+
+    assert first.cpu_metrics["E-Cluster_freq_MHz"] == 600
+    assert second.cpu_metrics["E-Cluster_freq_MHz"] == (972 + 2064) // 2
+    assert second.cpu_metrics["E-Cluster_residency_pct"] == {
+        "idle": 0,
+        "low": 0,
+        "mid": 50,
+        "high": 50,
+    }
+
+
+@pytest.mark.parametrize("residency_format", ["array", "numpy"])
+def test_array_residencies_match_the_tuple_path(
+    tmp_path, residency_format, write_capture
+):
+    if residency_format == "numpy":
+        pytest.importorskip("numpy")
+    path = write_capture(tmp_path / "capture.jsonl.gz")
+
+    def run(fmt):
+        sampler = ReplaySampler(path, loop=False, residency_format=fmt)
+        sampler.sample()
+        return [sampler.sample(), sampler.sample()]
+
+    expected = run("tuples")
+    actual = run(residency_format)
+
+    assert load_recording(path, "array").frames[0].items[3].state_residencies == (
+        array("q", [500, 250, 250])
+    )
+    for want, got in zip(expected, actual):
+        assert got.cpu_metrics == want.cpu_metrics
+        assert got.gpu_metrics == want.gpu_metrics
+        assert got.bandwidth_metrics == pytest.approx(want.bandwidth_metrics)
+
+
+def test_array_items_record_like_tuple_items(tmp_path, frame_items, capture_dvfs):
+    # A live array-format capture must write the same (name, ns) pairs.
+    path = tmp_path / "capture.jsonl.gz"
+    recorder = SampleRecorder(path, 1, capture_dvfs, {"p_count": 1, "e_count": 1})
+    items = [
+        item._replace(
+            state_residencies=array("q", [ns for _, ns in item.state_residencies]),
+            state_names=tuple(name for name, _ in item.state_residencies),
+        )
+        for item in frame_items(5_000_000_000)
+    ]
+    recorder.write_frame(1.0, items)
+    recorder.close()
+
+    frame = load_recording(path).frames[0]
+    assert [item._replace(state_names=None) for item in frame.items] == (
+        frame_items(5_000_000_000)
+    )
+
+
+def test_unknown_residency_format_is_rejected(tmp_path, write_capture):
+    path = write_capture(tmp_path / "capture.jsonl.gz")
+
+    with pytest.raises(ValueError, match="residency_format"):
+        ReplaySampler(path, residency_format="columns")
+
+
+def test_sample_result_keeps_the_legacy_metric_dicts(tmp_path, write_capture):
+    sampler = ReplaySampler(write_capture(tmp_path / "capture.jsonl.gz"))
+    sampler.sample()
+    result = sampler.sample()
+
+    assert result.e_core_index == (0,)
+    assert list(result.e_core_active_pct) == [50]
+    cpu = result.cpu_metrics
+    assert cpu is result.cpu_metrics  # built once
+    assert cpu["e_core"] == [0]
+    assert cpu["E-Cluster0_active"] == 50
+    assert cpu["E-Cluster0_freq_MHz"] == (600 + 2064) // 2
+    assert cpu["P-Cluster_freq_MHz"] == 3200
+    assert cpu["cpu_W"] == pytest.approx(5.0)
+    assert result.gpu_metrics["active"] == 40
+    assert result.bandwidth_metrics == {"total_gbps": 48.0, "_available": True}
+
+    hotter = result._replace(cpu_temp_c=80.0)
+    assert hotter.cpu_temp_c == 80.0
+    assert hotter.cpu_metrics == cpu
@@ -0,0 +1,197 @@
+"""Asyncio HTTP exporter against a replayed sampler: keep-alive requests,
+every endpoint, the event stream and many concurrent clients on one loop."""
+
+import asyncio
+import gzip
+import json
+
+from actop.server import MetricsServer
+
+
+async def _request(reader, writer, path, headers=()):
+    """One request on an open connection; returns (status, headers, body)."""
+    lines = ["GET {} HTTP/1.1".format(path), "Host: test"]
+    lines += ["{}: {}".format(name, value) for name, value in headers]
+    writer.write(("\r\n".join(lines) + "\r\n\r\n").encode())
+    await writer.drain()
+    head = (await reader.readuntil(b"\r\n\r\n")).decode().split("\r\n")
+    status = int(head[0].split(" ")[1])
+    fields = dict(line.split(": ", 1) for line in head[1:] if line)
+    body = await reader.readexactly(int(fields.get("Content-Length", 0)))
+    return status, fields, body
+
+
+async def _wait_for_sample(server):
+    for _ in range(500):
+        if server._samples:
+            return
+        await asyncio.sleep(0.01)
+    raise AssertionError("no snapshot published")
+
+
+def test_endpoints_share_one_keep_alive_connection(replay):
+    async def scenario():
+        server = await MetricsServer(interval_s=1).start("127.0.0.1", 0)
+        try:
+            await _wait_for_sample(server)
+            reader, writer = await asyncio.open_connection("127.0.0.1", server.port)
+
+            status, headers, body = await _request(reader, writer, "/healthz")
+            assert status == 200
+            assert json.loads(body)["status"] == "ok"
+
+            status, headers, body = await _request(reader, writer, "/snapshot")
+            assert status == 200
+            assert headers["Content-Type"] == "application/json"
+            assert json.loads(body)["cpu_watts"] in (5.0, 6.0)
+
+            status, headers, body = await _request(
+                reader, writer, "/metrics", [("Accept-Encoding", "gzip")]
+            )
+            assert status == 200
+            assert "actop_cpu_power_watts" in gzip.decompress(body).decode()
+            etag = headers["ETag"]
+            assert etag.endswith('-gz"')
+
+            status, _, _ = await _request(
+                reader, writer, "/metrics", [("If-None-Match", etag)]
+            )
+            assert status in (200, 304)  # 200 only if a new snapshot landed
+            assert (await _request(reader, writer, "/nope"))[0] == 404
+            writer.close()
+        finally:
+            await server.close()
+
+    asyncio.run(scenario())
+
+
+def test_event_stream_delivers_successive_snapshots(replay):
+    async def scenario():
+        server = await MetricsServer(interval_s=1).start("127.0.0.1", 0)
+        try:
+            reader, writer = await asyncio.open_connection("127.0.0.1", server.port)
+            writer.write(b"GET /stream HTTP/1.1\r\nHost: test\r\n\r\n")
+            head = await reader.readuntil(b"\r\n\r\n")
+            assert b"text/event-stream" in head
+            events = []
+            while len(events) < 3:
+                line = await asyncio.wait_for(reader.readline(), 5)
+                if line.startswith(b"data: "):
+                    events.append(json.loads(line[6:]))
+            stamps = [event["monotonic_s"] for event in events]
+            assert stamps == sorted(stamps) and len(set(stamps)) == 3
+            writer.close()
+        finally:
+            await server.close()
+        # Closing the server ends the stream.
+        await asyncio.wait_for(reader.read(), 5)
+        assert reader.at_eof()
+
+    asyncio.run(scenario())
+
+
+def test_a_sampler_error_ends_the_streams_and_fails_healthz(replay, monkeypatch):
+    from actop.api import Monitor
+
+    real = Monitor.get_snapshot
+    failing = [False]
+
+    def get_snapshot(self, stop_event=None):
+        if failing[0]:
+            raise RuntimeError("IOReport went away")
+        return real(self, stop_event)
+
+    monkeypatch.setattr(Monitor, "get_snapshot", get_snapshot)
+
+    async def scenario():
+        server = await MetricsServer(interval_s=1).start("127.0.0.1", 0)
+        try:
+            reader, writer = await asyncio.open_connection("127.0.0.1", server.port)
+            writer.write(b"GET /stream HTTP/1.1\r\nHost: test\r\n\r\n")
+            await reader.readuntil(b"\r\n\r\n")
+            await asyncio.wait_for(reader.readline(), 5)
+            failing[0] = True
+            await asyncio.wait_for(reader.read(), 5)
+            assert reader.at_eof()
+            writer.close()
+
+            reader, writer = await asyncio.open_connection("127.0.0.1", server.port)
+            status, _, body = await _request(reader, writer, "/healthz")
+            writer.close()
+        finally:
+            await server.close()
+        assert status == 503
+        assert "went away" in json.loads(body)["error"]
+        assert isinstance(server.error, RuntimeError)
+
+    asyncio.run(scenario())
+
+
+def test_hundreds_of_concurrent_clients_on_one_thread(replay):
+    async def client(port):
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        try:
+            statuses = [
+                (await _request(reader, writer, "/metrics"))[0] for _ in range(3)
+            ]
+        finally:
+            writer.close()
+        return statuses
+
+    async def scenario():
+        server = await MetricsServer(interval_s=1).start("127.0.0.1", 0)
+        try:
+            await _wait_for_sample(server)
+            results = await asyncio.wait_for(
+                asyncio.gather(*(client(server.port) for _ in range(300))), 30
+            )
+        finally:
+            await server.close()
+        assert all(statuses == [200, 200, 200] for statuses in results)
+
+    asyncio.run(scenario())
+
+
+def test_metrics_negotiates_openmetrics_from_accept(replay):
+    async def scenario():
+        server = await MetricsServer(interval_s=1, openmetrics=True).start(
+            "127.0.0.1", 0
+        )
+        try:
+            await _wait_for_sample(server)
+            reader, writer = await asyncio.open_connection("127.0.0.1", server.port)
+            accept = "application/openmetrics-text;version=1.0.0,text/plain;q=0.5"
+            status, headers, body = await _request(
+                reader, writer, "/metrics", [("Accept", accept)]
+            )
+            assert status == 200
+            assert headers["Content-Type"].startswith("application/openmetrics-text")
+            assert headers["Vary"] == "Accept, Accept-Encoding"
+            assert "actop_cpu_energy_joules_total" in body.decode()
+            assert body.endswith(b"# EOF\n")
+
+            _, headers, body = await _request(
+                reader, writer, "/metrics", [("Accept", "text/plain")]
+            )
+            assert headers["Content-Type"].startswith("text/plain")
+            assert b"# EOF" not in body
+            writer.close()
+        finally:
+            await server.close()
+
+    asyncio.run(scenario())
+
+
+def test_parse_request_heads():
+    parse = MetricsServer._parse
+
+    assert parse(b"GET /metrics/?x=1 HTTP/1.1\r\nHost: a\r\n\r\n") == (
+        "GET",
+        "/metrics",
+        {"host": "a"},
+        True,
+    )
+    assert parse(b"GET / HTTP/1.0\r\n\r\n")[3] is False
+    assert parse(b"GET / HTTP/1.1\r\nConnection: close\r\n\r\n")[3] is False
+    assert parse(b"garbage\r\n\r\n") is None
+    assert parse(b"GET / SPDY/3\r\n\r\n") is None
@@ -0,0 +1,127 @@
+"""Code-region spans: energy and averages are attributed from the samples'
+monotonic intervals, with partial overlap interpolated at both ends."""
+
+import time
+
+import pytest
+
+from actop import Profiler
+from actop.spans import SPAN_COLUMNS, SpanIndex, spans_from_marks
+
+
+def _columns(rows):
+    """SPAN_COLUMNS from (monotonic_s, elapsed_s, package_watts) rows."""
+    columns = {name: [] for name in SPAN_COLUMNS}
+    for end, elapsed, watts in rows:
+        for name in SPAN_COLUMNS:
+            columns[name].append(0.0)
+        columns["monotonic_s"][-1] = end
+        columns["elapsed_s"][-1] = elapsed
+        columns["package_watts"][-1] = watts
+        columns["cpu_watts"][-1] = watts / 2
+        columns["pcpu_util_pct"][-1] = watts
+    return columns
+
+
+def test_partial_overlap_is_interpolated():
+    # 10 W over [100, 101], 20 W over [101, 102], 30 W over [102, 103].
+    index = SpanIndex(
+        _columns([(101.0, 1.0, 10.0), (102.0, 1.0, 20.0), (103.0, 1.0, 30.0)])
+    )
+
+    row = index.attribute(100.5, 102.5)
+
+    assert row["covered_s"] == pytest.approx(2.0)
+    assert row["package_joules"] == pytest.approx(5.0 + 20.0 + 15.0)
+    assert row["cpu_joules"] == pytest.approx(20.0)
+    assert row["avg_package_watts"] == pytest.approx(20.0)
+    assert row["avg_pcpu_util_pct"] == pytest.approx(20.0)
+    # Inside a single sample: a fraction of its energy at its power.
+    inner = index.attribute(101.25, 101.75)
+    assert inner["package_joules"] == pytest.approx(10.0)
+    assert inner["avg_package_watts"] == pytest.approx(20.0)
+
+
+def test_uncovered_time_is_reported_not_averaged_in():
+    index = SpanIndex(_columns([(101.0, 1.0, 10.0)]))
+
+    row = index.attribute(100.0, 104.0)
+    assert row["covered_s"] == pytest.approx(1.0)
+    assert row["avg_package_watts"] == pytest.approx(10.0)
+
+    empty = index.attribute(200.0, 201.0)
+    assert empty["covered_s"] == 0.0
+    assert empty["avg_package_watts"] == 0.0
+
+
+def test_unplaced_and_overlapping_samples_do_not_double_count():
+    # No clock (0.0), then a sample reaching back over its predecessor.
+    index = SpanIndex(
+        _columns([(0.0, 1.0, 99.0), (101.0, 1.0, 10.0), (101.5, 1.0, 20.0)])
+    )
+
+    assert len(index) == 2
+    row = index.attribute(99.0, 102.0)
+    assert row["covered_s"] == pytest.approx(1.5)
+    assert row["package_joules"] == pytest.approx(10.0 + 10.0)
+
+
+def test_many_short_spans_add_up_to_the_whole():
+    rows = [(1000.0 + n, 1.0, float(n % 7)) for n in range(1, 301)]
+    index = SpanIndex(_columns(rows))
+    whole = index.attribute(1000.0, 1300.0)["package_joules"]
+
+    step = 300.0 / 4000
+    parts = [
+        index.attribute(1000.0 + k * step, 1000.0 + (k + 1) * step)["package_joules"]
+        for k in range(4000)
+    ]
+
+    assert whole == pytest.approx(sum(n % 7 for n in range(1, 301)))
+    assert sum(parts) == pytest.approx(whole)
+
+
+def test_marks_run_until_the_next_mark():
+    spans = spans_from_marks([("decode", 5.0), ("prefill", 2.0)], 9.0)
+
+    assert [(s.name, s.start_s, s.end_s) for s in spans] == [
+        ("prefill", 2.0, 5.0),
+        ("decode", 5.0, 9.0),
+    ]
+
+
+def test_profiler_attributes_spans_to_its_samples(replay):
+    with Profiler(interval_s=1) as profiler:
+        with profiler.span("setup"):
+            pass
+        profiler.mark("decode_start")
+        deadline = time.monotonic() + 5.0
+        while len(profiler._samples) < 6 and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+    samples = profiler.samples[:6]
+    # The replay clock advances by each frame's recorded elapsed time.
+    ends = [s.monotonic_s for s in samples]
+    assert all(
+        b - a == pytest.approx(s.elapsed_s)
+        for a, b, s in zip(ends, ends[1:], samples[1:])
+    )
+    profiler.add_span("frames_2_to_4", ends[1], ends[4])
+
+    rows = {row["name"]: row for row in profiler.get_spans()}
+
+    assert set(rows) == {"setup", "decode_start", "frames_2_to_4"}
+    assert rows["setup"]["end_s"] >= rows["setup"]["start_s"]
+    assert rows["decode_start"]["end_s"] == pytest.approx(profiler._stopped_at)
+    frames = rows["frames_2_to_4"]
+    assert frames["covered_s"] == pytest.approx(frames["duration_s"])
+    expected = sum(s.cpu_watts * s.elapsed_s for s in samples[2:5])
+    assert frames["cpu_joules"] == pytest.approx(expected, rel=1e-5)
+
+    with pytest.raises(ValueError, match="ends before it starts"):
+        profiler.add_span("backwards", 2.0, 1.0)
+
+    pd = pytest.importorskip("pandas")
+    df = profiler.spans_to_pandas()
+    assert isinstance(df, pd.DataFrame)
+    assert len(df) == 3
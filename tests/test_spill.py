@@ -0,0 +1,132 @@
+"""Spill files: chunks written by the background writer read back lazily and
+in order, a torn tail is ignored, and a spilling Profiler reports the whole
+session while holding only a bounded tail in memory."""
+
+import time
+
+import pytest
+
+from actop import Profiler
+from actop.spill import SpillFile, SpillWriter, read_chunk_index
+from actop.store import SampleStore
+
+
+def _spill(make_snapshot, path, chunks):
+    writer = SpillWriter(path)
+    n = 0
+    for size in chunks:
+        store = SampleStore()
+        for _ in range(size):
+            store.append(make_snapshot(n, thermal_state="Fair" if n % 3 else "Nominal"))
+            n += 1
+        writer.submit(store.columns(), store.core_indices)
+    writer.close()
+    return writer
+
+
+def test_chunks_read_back_in_order(tmp_path, make_snapshot):
+    path = tmp_path / "session.spill"
+    writer = _spill(make_snapshot, path, [3, 2])
+
+    spilled = SpillFile(path)
+
+    assert spilled.chunks == writer.chunks
+    assert len(spilled) == 5
+    assert list(spilled.iter_samples()) == [
+        make_snapshot(n, thermal_state="Fair" if n % 3 else "Nominal") for n in range(5)
+    ]
+    (first, columns), _ = list(spilled.iter_chunks(names={"cpu_watts"}))
+    assert first.count == 3
+    assert list(columns) == ["cpu_watts"]
+    assert list(columns["cpu_watts"]) == [1.5, 2.5, 3.5]
+
+
+def test_to_numpy_copies_out_of_the_mapping(tmp_path, make_snapshot):
+    np = pytest.importorskip("numpy")
+    path = tmp_path / "session.spill"
+    _spill(make_snapshot, path, [3, 2])
+
+    parts = SpillFile(path).to_numpy()
+
+    assert [count for count, _ in parts] == [3, 2]
+    _, columns = parts[1]
+    assert list(columns["timestamp"]) == [1_700_000_003.0, 1_700_000_004.0]
+    assert list(columns["thermal_state"]) == ["Nominal", "Fair"]
+    assert columns["bandwidth_available"].dtype == np.bool_
+
+
+def test_torn_final_chunk_is_ignored(tmp_path, make_snapshot):
+    path = tmp_path / "session.spill"
+    _spill(make_snapshot, path, [3, 2])
+    data = path.read_bytes()
+    path.write_bytes(data[:-16])
+
+    assert [chunk.count for chunk in read_chunk_index(path)] == [3]
+
+
+@pytest.mark.filterwarnings("ignore::pytest.PytestUnhandledThreadExceptionWarning")
+def test_writer_thread_closes_the_file_when_it_dies(
+    tmp_path, make_snapshot, monkeypatch
+):
+    path = tmp_path / "session.spill"
+    store = SampleStore()
+    for n in range(3):
+        store.append(make_snapshot(n))
+    writer = SpillWriter(path)
+    writer.submit(store.columns(), store.core_indices)
+    writer.flush()
+
+    def die(self, columns, cores):
+        raise SystemExit
+
+    monkeypatch.setattr(SpillWriter, "_write", die)
+    writer.submit(store.columns(), store.core_indices)
+    writer._thread.join(timeout=5)
+
+    assert not writer._thread.is_alive()
+    assert writer._fp.closed
+    assert [chunk.count for chunk in read_chunk_index(path)] == [3]
+
+
+def test_foreign_files_are_rejected(tmp_path):
+    path = tmp_path / "other.bin"
+    path.write_bytes(b"hello world")
+
+    with pytest.raises(ValueError, match="not an actop spill file"):
+        SpillFile(path)
+
+
+def test_profiler_spills_all_but_a_bounded_tail(tmp_path, replay):
+    path = tmp_path / "session.spill"
+
+    with Profiler(interval_s=1, spill_path=str(path), max_in_memory=4) as profiler:
+        deadline = time.monotonic() + 5.0
+        while len(profiler._spill.chunks) < 3 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        with profiler._lock:  # not mid-handoff between append and clear
+            resident = len(profiler._samples)
+
+    samples = profiler.samples
+    spilled = SpillFile(path)
+    assert resident < 4
+    assert len(spilled) >= 12
+    assert len(samples) == len(spilled) + len(profiler._samples)
+    assert list(spilled.iter_samples()) == samples[: len(spilled)]
+    timestamps = [s.timestamp for s in samples]
+    assert timestamps == sorted(timestamps)
+
+    summary = profiler.get_summary()
+    assert summary["sample_count"] == len(samples)
+    assert summary["peak_cpu_watts"] == pytest.approx(6.0)
+    columns = profiler.to_columns()
+    assert list(columns["cpu_watts"]) == [s.cpu_watts for s in samples]
+
+    pytest.importorskip("numpy")
+    arrays = profiler.to_numpy()
+    assert list(arrays["cpu_watts"]) == list(columns["cpu_watts"])
+    assert list(arrays["thermal_state"]) == columns["thermal_state"]
+
+
+def test_capacity_and_spill_are_exclusive(tmp_path, replay):
+    with pytest.raises(ValueError, match="mutually exclusive"):
+        Profiler(capacity=10, spill_path=str(tmp_path / "s.spill"))
@@ -0,0 +1,170 @@
+"""Incremental session summary: energy integrates power over each snapshot's
+measured elapsed time, so uneven spacing and the first interval count; P²
+percentiles track the exact ones without keeping the samples."""
+
+import random
+import tracemalloc
+
+import pytest
+
+from actop.stats import EnergyCounters, P2Quantile, QuantileTracker, SessionSummary
+
+
+@pytest.fixture
+def sample(make_snapshot):
+    def _sample(n, watts, elapsed_s, peak=None):
+        snapshot = make_snapshot(n)
+        snapshot.cpu_watts = watts
+        snapshot.package_watts = watts + 1.0
+        snapshot.elapsed_s = elapsed_s
+        snapshot.interval_max = {"cpu_watts": peak if peak is not None else watts}
+        return snapshot
+
+    return _sample
+
+
+def test_energy_integrates_over_measured_elapsed_time(sample):
+    summary = SessionSummary()
+    # 10 W for 1 s, then a late 4 W tick covering 3 s.
+    summary.update(sample(0, 10.0, 1.0, peak=14.0))
+    summary.update(sample(1, 4.0, 3.0))
+
+    result = summary.summary()
+
+    assert result["sample_count"] == 2
+    assert result["duration_s"] == pytest.approx(4.0)
+    assert result["total_cpu_joules"] == pytest.approx(22.0)
+    assert result["total_package_joules"] == pytest.approx(26.0)
+    # Time-weighted, not the 7 W mean of the two readings.
+    assert result["avg_cpu_watts"] == pytest.approx(5.5)
+    assert result["peak_cpu_watts"] == 14.0
+    assert result["peak_package_watts"] == 11.0
+
+
+def test_snapshots_without_elapsed_time_use_timestamp_spacing(sample):
+    summary = SessionSummary()
+    for n in (0, 2, 3):
+        summary.update(sample(n, 2.0, 0.0))
+
+    result = summary.summary()
+
+    # Timestamps 0, +2 s, +1 s: the first sample covers no known time.
+    assert result["duration_s"] == pytest.approx(3.0)
+    assert result["total_cpu_joules"] == pytest.approx(6.0)
+
+
+def test_energy_counters_only_grow(sample):
+    energy = EnergyCounters()
+    energy.update(sample(0, 10.0, 1.0))
+    energy.update(sample(1, 4.0, 3.0))
+    # A bogus negative reading adds nothing rather than running backwards.
+    energy.update(sample(2, -5.0, 1.0))
+
+    assert energy.count == 3
+    assert energy.covered_s == pytest.approx(5.0)
+    assert energy.joules["cpu"] == pytest.approx(22.0)
+    assert energy.joules["package"] == pytest.approx(26.0)
+    assert energy.last_joules["cpu"] == 0.0
+
+
+def test_reset_and_empty_summary(sample):
+    summary = SessionSummary()
+    assert summary.summary() == {}
+    summary.update(sample(0, 1.0, 1.0))
+    summary.reset()
+    assert summary.summary() == {}
+
+
+def _exact(values, p):
+    ordered = sorted(values)
+    pos = p * (len(ordered) - 1)
+    lo = int(pos)
+    hi = min(lo + 1, len(ordered) - 1)
+    return ordered[lo] + (ordered[hi] - ordered[lo]) * (pos - lo)
+
+
+@pytest.mark.parametrize("p", [0.5, 0.9, 0.99])
+def test_p2_estimate_tracks_the_exact_quantile(p):
+    rng = random.Random(7)
+    # A skewed, power-like distribution: an idle floor with bursts.
+    values = [rng.expovariate(1 / 8.0) + 2.0 for _ in range(20_000)]
+    estimator = P2Quantile(p)
+    for value in values:
+        estimator.add(value)
+
+    assert estimator.count == len(values)
+    assert estimator.value() == pytest.approx(_exact(values, p), rel=0.02)
+
+
+def test_p2_is_exact_for_the_first_five_values():
+    estimator = P2Quantile(0.9)
+    assert estimator.value() == 0.0
+    for value in (5.0, 1.0, 3.0):
+        estimator.add(value)
+
+    assert estimator.value() == pytest.approx(_exact([5.0, 1.0, 3.0], 0.9))
+
+
+def test_p2_rejects_out_of_range_quantiles():
+    with pytest.raises(ValueError, match="between 0 and 1"):
+        P2Quantile(1.0)
+
+
+def test_tracker_skips_missing_readings(make_snapshot):
+    tracker = QuantileTracker(("bandwidth_gbps", "cpu_temp_c"), (0.5,))
+    snapshot = make_snapshot(0)
+    snapshot.bandwidth_available = False
+    snapshot.cpu_temp_c = 0.0
+    tracker.update(snapshot)
+
+    assert tracker.counts == {"bandwidth_gbps": 0, "cpu_temp_c": 0}
+    assert tracker.results() == {}
+
+
+def test_summary_reports_flat_percentile_keys(sample):
+    summary = SessionSummary()
+    for n in range(100):
+        summary.update(sample(n, float(n), 1.0))
+
+    result = summary.summary()
+
+    assert result["p50_cpu_watts"] == pytest.approx(49.5, rel=0.05)
+    assert result["p99_cpu_watts"] == pytest.approx(98.0, rel=0.05)
+    assert result["p90_package_watts"] == pytest.approx(90.1, rel=0.05)
+    assert "p99_bandwidth_gbps" in result
+
+
+def test_summary_percentiles_match_a_tracker_fed_directly(sample):
+    summary = SessionSummary()
+    tracker = QuantileTracker()
+    rng = random.Random(3)
+    for n in range(1000):  # several buffered batches, the last one partial
+        snapshot = sample(n, rng.uniform(0.0, 40.0), 1.0)
+        summary.update(snapshot)
+        tracker.update(snapshot)
+
+    assert summary.quantiles.results() == tracker.results()
+    assert summary.summary()["p99_cpu_watts"] == tracker.quantile("cpu_watts", 0.99)
+
+
+def test_summary_memory_stays_flat(make_snapshot):
+    snapshots = [make_snapshot(n % 50) for n in range(6000)]
+    summary = SessionSummary()
+    for snapshot in snapshots[:1000]:
+        summary.update(snapshot)
+    summary.summary()
+
+    tracemalloc.start()
+    try:
+        before, _ = tracemalloc.get_traced_memory()
+        for snapshot in snapshots[1000:]:
+            summary.update(snapshot)
+        result = summary.summary()
+        after, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    assert result["sample_count"] == 6000
+    # Marker floats are replaced, not accumulated; 5000 more updates must not
+    # cost more than a few KiB (the result dict itself included).
+    assert after - before < 16 * 1024
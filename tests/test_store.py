@@ -0,0 +1,122 @@
+"""Columnar snapshot store: round-trips snapshots, keeps ring order once full,
+and backs Profiler's summary and DataFrame without per-row objects."""
+
+import time
+
+import pytest
+
+from actop import Profiler
+from actop.models import CoreSample
+from actop.store import SampleStore
+
+
+def test_snapshots_round_trip_through_the_columns(make_snapshot):
+    store = SampleStore()
+    store.append(make_snapshot(0))
+    store.append(make_snapshot(1, thermal_state="Fair"))
+
+    assert len(store) == 2
+    first, second = store
+    assert first == make_snapshot(0)
+    assert second == make_snapshot(1, thermal_state="Fair")
+    assert store[-1] == second
+
+
+def test_rebuilt_snapshots_keep_full_float_precision(make_snapshot):
+    snapshot = make_snapshot(0)
+    snapshot.cpu_watts = 12.3
+    snapshot.ram_used_gb = 21.4
+    snapshot.interval_max = dict(snapshot.interval_max, cpu_watts=12.3)
+    store = SampleStore(capacity=2)
+    store.append(snapshot)
+
+    assert store[0] == snapshot
+    assert store.columns()["ram_used_gb"][0] == 21.4
+
+
+def test_snapshot_without_extremes_is_its_own_min_and_max(make_snapshot):
+    snapshot = make_snapshot(0)
+    snapshot.interval_min = {}
+    snapshot.interval_max = {}
+    store = SampleStore()
+    store.append(snapshot)
+
+    assert store[0].interval_max["cpu_watts"] == snapshot.cpu_watts
+    assert list(store.column("interval_min_package_watts")) == [3.75]
+
+
+def test_capacity_makes_a_ring_of_the_latest_samples(make_snapshot):
+    store = SampleStore(capacity=3)
+    for n in range(5):
+        store.append(make_snapshot(n))
+
+    assert len(store) == 3
+    assert store.dropped == 2
+    assert [s.timestamp for s in store] == [1_700_000_002.0 + n for n in range(3)]
+    columns = store.columns()
+    assert list(columns["cpu_watts"]) == [3.5, 4.5, 5.5]
+    assert list(columns["p_core4_active_pct"]) == [22, 23, 24]
+    assert columns["thermal_state"] == ["Nominal"] * 3
+    with pytest.raises(IndexError):
+        store[3]
+
+
+def test_per_core_columns_follow_the_first_snapshots_cores(make_snapshot):
+    store = SampleStore(capacity=4)
+    store.append(make_snapshot(0))
+    store.append(
+        make_snapshot(1, p_cores=[CoreSample(index=5, active_pct=7, freq_mhz=1)])
+    )
+
+    assert store.core_indices == {"e": (0,), "p": (4, 5)}
+    assert [core.active_pct for core in store[1].p_cores] == [0, 7]
+
+
+def test_capacity_must_be_positive():
+    with pytest.raises(ValueError, match="capacity"):
+        SampleStore(capacity=0)
+
+
+def test_profiler_keeps_a_bounded_store(replay):
+    # Replays run at full speed, so the ring fills and wraps almost at once.
+    with Profiler(interval_s=1, capacity=4) as profiler:
+        deadline = time.monotonic() + 5.0
+        while profiler._samples.dropped < 4 and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+    samples = profiler.samples
+    summary = profiler.get_summary()
+    assert len(samples) == 4
+    # The summary covers the whole session, not just the ring's contents.
+    assert summary["sample_count"] == 4 + profiler._samples.dropped
+    # The capture alternates 5 W and 6 W CPU frames.
+    assert 5.0 < summary["avg_cpu_watts"] < 6.0
+    assert summary["peak_cpu_watts"] == pytest.approx(6.0)
+
+    pd = pytest.importorskip("pandas")
+    df = profiler.to_pandas()
+    assert isinstance(df.index, pd.DatetimeIndex)
+    assert len(df) == 4
+    assert list(df["cpu_watts"]) == [s.cpu_watts for s in samples]
+    assert df["bandwidth_available"].dtype == bool
+    assert "e_core0_active_pct" in df.columns
+
+
+@pytest.mark.parametrize("capacity", [None, 3])
+def test_to_numpy_matches_the_array_columns(capacity, make_snapshot):
+    np = pytest.importorskip("numpy")
+    store = SampleStore(capacity)
+    for n in range(5):
+        store.append(make_snapshot(n, thermal_state="Fair" if n % 2 else "Nominal"))
+
+    arrays = store.to_numpy()
+    columns = store.columns()
+
+    assert arrays.keys() == columns.keys()
+    for name, values in columns.items():
+        assert list(arrays[name]) == list(values), name
+    assert arrays["bandwidth_available"].dtype == np.bool_
+    assert arrays["p_core5_freq_mhz"].dtype == np.int32
+    # The copies do not pin the live buffers: the store keeps appending.
+    store.append(make_snapshot(5))
+    assert len(arrays["timestamp"]) == len(columns["timestamp"])